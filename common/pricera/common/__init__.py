@@ -5,10 +5,28 @@ __all__ = [
     "load_file_from_sub_folder",
     "ensure_list",
     "get_mongo_client",
+    "ObjectStore",
+    "get_object_store",
+    "MongoWriteBuffer",
 ]
 
+from importlib import import_module
 
-from .collectors import BaseCollector, FileBasedMessageConsumer, RabbitMQ
-from .testing_utilities import load_file_from_sub_folder
-from .utilities import ensure_list
-from .mongodb import get_mongo_client
+# exports are imported on first use, so a worker importing one submodule doesn't load boto3, pymongo and pika
+_EXPORT_TO_MODULE = {
+    "RabbitMQ": ".collectors",
+    "FileBasedMessageConsumer": ".collectors",
+    "BaseCollector": ".collectors",
+    "load_file_from_sub_folder": ".testing_utilities",
+    "ensure_list": ".utilities",
+    "get_mongo_client": ".mongodb",
+    "ObjectStore": ".object_store",
+    "get_object_store": ".object_store",
+    "MongoWriteBuffer": ".mongo_write_buffer",
+}
+
+
+def __getattr__(name: str):
+    if name in _EXPORT_TO_MODULE:
+        return getattr(import_module(_EXPORT_TO_MODULE[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,340 @@
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+from scrapy import signals
+
+from pricera.common.benchmarks.parser_benchmark import get_benchmark_cases, get_percentile, load_fixture_documents
+from pricera.common.benchmarks.stand_in_server import FaultConfig, StandInServer
+from pricera.common.logger import set_logger
+from pricera.common.object_store import LocalObjectStore, set_object_store
+from pricera.models import HashedURL
+
+logger = logging.getLogger("crawl_load_benchmark")
+
+DEFAULT_CONCURRENCY = [1, 8, 32]
+DEFAULT_URLS = 500
+DEFAULT_LATENCY_MS = 50
+SCRAPY_DOWNLOAD_HANDLERS = {
+    "http": "scrapy.core.downloader.handlers.http11.HTTP11DownloadHandler",
+    "https": "scrapy.core.downloader.handlers.http11.HTTP11DownloadHandler",
+}
+
+
+@dataclass
+class LoadTestCase:
+    """A spider, the start urls it crawls from the stand-in server and its extra arguments."""
+
+    name: str
+    get_spider_cls: Callable[[], type]
+    get_start_urls: Callable[[str, int], list[HashedURL]]
+    get_spider_kwargs: Callable[[str], dict] = lambda server_url: {}
+
+
+@dataclass
+class LoadTestResult:
+    spider: str
+    concurrency: int
+    urls: int
+    requests: int
+    responses: int
+    items: int
+    retries: int
+    elapsed_seconds: float
+    requests_per_second: float
+    p50_ms: float
+    p90_ms: float
+    p99_ms: float
+    # resident memory of the process sampled during the run, None where /proc is not available
+    peak_rss_mb: Optional[float]
+    # growth of the resident memory over the run, the memory the concurrency setting costs
+    rss_increase_mb: Optional[float]
+    status_counts: dict[str, int] = field(default_factory=dict)
+
+
+class LatencyRecorder:
+    """Scrapy extension recording the time between a request reaching the downloader and its response."""
+
+    SENT_AT_KEY = "load_test_sent_at"
+    STATS_KEY = "load_test/latencies"
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+        self.latencies: list[float] = []
+
+    @classmethod
+    def from_crawler(cls, crawler) -> "LatencyRecorder":
+        extension = cls(crawler)
+        crawler.signals.connect(extension.request_reached_downloader, signal=signals.request_reached_downloader)
+        crawler.signals.connect(extension.response_received, signal=signals.response_received)
+        crawler.signals.connect(extension.spider_closed, signal=signals.spider_closed)
+        return extension
+
+    def request_reached_downloader(self, request, spider) -> None:
+        request.meta[self.SENT_AT_KEY] = time.perf_counter()
+
+    def response_received(self, response, request, spider) -> None:
+        sent_at = request.meta.get(self.SENT_AT_KEY)
+        if sent_at is not None:
+            self.latencies.append(time.perf_counter() - sent_at)
+
+    def spider_closed(self, spider) -> None:
+        self.crawler.stats.set_value(self.STATS_KEY, self.latencies)
+
+
+def get_load_test_cases() -> dict[str, LoadTestCase]:
+    def get_rozetka_spider_cls() -> type:
+        from pricera.rozetka.spiders.rozetka_product_spider import RozetkaProductSpider
+
+        return RozetkaProductSpider
+
+    def get_hotline_spider_cls() -> type:
+        from pricera.hotline.spiders.hotline_item_card_spider import HotlineItemCardSpider
+
+        return HotlineItemCardSpider
+
+    def get_rozetka_spider_kwargs(server_url: str) -> dict:
+        from pricera.rozetka import RozetkaProductCrawler
+
+        return {"api_base_url": server_url, "ids_per_request": RozetkaProductCrawler.ids_per_request}
+
+    return {
+        "rozetka_product": LoadTestCase(
+            name="rozetka_product",
+            get_spider_cls=get_rozetka_spider_cls,
+            # product pages stay on rozetka.com.ua, only the details api is served by the stand-in
+            get_start_urls=lambda server_url, count: [
+                HashedURL(f"https://rozetka.com.ua/ua/load-test/p{100_000_000 + index}/", marketplace="rozetka")
+                for index in range(count)
+            ],
+            get_spider_kwargs=get_rozetka_spider_kwargs,
+        ),
+        "hotline_item_card": LoadTestCase(
+            name="hotline_item_card",
+            get_spider_cls=get_hotline_spider_cls,
+            get_start_urls=lambda server_url, count: [
+                HashedURL(f"{server_url}/ua/load-test/item-{index}/") for index in range(count)
+            ],
+        ),
+    }
+
+
+def get_rss_mb() -> Optional[float]:
+    """Current resident memory of the process, None off Linux."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024**2
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class RssSampler:
+    """
+    Samples the resident memory of the process on a thread while a run is in flight. The process peak
+    (`ru_maxrss`) never goes down and holds the stand-in server and the fixtures, so every run after the first
+    would report the largest peak so far, the sampled peak and its growth over the start of the run don't.
+    """
+
+    INTERVAL_SECONDS = 0.02
+
+    def __init__(self):
+        self.baseline: Optional[float] = None
+        self.peak: Optional[float] = None
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._sample_until_stopped, name="rss_sampler", daemon=True)
+
+    def __enter__(self) -> "RssSampler":
+        # garbage of the previous run must not count as the baseline of this one
+        gc.collect()
+        self.baseline = self.peak = get_rss_mb()
+        if self.baseline is not None:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self.baseline is None:
+            return
+        self._stopped.set()
+        self._thread.join()
+        self.sample()
+
+    def _sample_until_stopped(self) -> None:
+        while not self._stopped.wait(self.INTERVAL_SECONDS):
+            self.sample()
+
+    def sample(self) -> None:
+        rss = get_rss_mb()
+        if rss is not None:
+            self.peak = max(self.peak, rss)
+
+    @property
+    def increase(self) -> Optional[float]:
+        return None if self.baseline is None else self.peak - self.baseline
+
+
+def run_load_test(
+    case: LoadTestCase,
+    server_url: str,
+    concurrency: int,
+    urls: int,
+    spool_dir: str,
+    extra_settings: Optional[dict] = None,
+) -> LoadTestResult:
+    """Crawl `urls` start urls of the case from the stand-in server on the running CrawlWorker."""
+    from pricera.common.collectors import CrawlWorker
+
+    spider_cls = case.get_spider_cls()
+    load_test_spider_cls = type(
+        f"{spider_cls.__name__}LoadTest",
+        (spider_cls,),
+        {
+            "custom_settings": (spider_cls.custom_settings or {})
+            | {
+                "CONCURRENT_REQUESTS": concurrency,
+                "CONCURRENT_REQUESTS_PER_DOMAIN": concurrency,
+                "S3_SPOOL_DIR": spool_dir,
+                "EXTENSIONS": {LatencyRecorder: 0},
+            }
+            | (extra_settings or {})
+        },
+    )
+
+    crawl_worker = CrawlWorker.start()
+    start_urls = case.get_start_urls(server_url, urls)
+    with RssSampler() as rss:
+        started_at = time.perf_counter()
+        result = crawl_worker.crawl(
+            load_test_spider_cls,
+            start_urls=start_urls,
+            storage_bucket="load_test",
+            storage_prefix=f"{case.name}/{concurrency}/",
+            **case.get_spider_kwargs(server_url),
+        )
+        elapsed = time.perf_counter() - started_at
+    if result.error is not None:
+        raise RuntimeError(f"Load test of {case.name} failed") from result.error
+
+    stats = result.spider.crawler.stats.get_stats()
+    latencies = sorted(stats.get(LatencyRecorder.STATS_KEY) or [0.0])
+    status_prefix = "downloader/response_status_count/"
+    requests = stats.get("downloader/request_count", 0)
+    return LoadTestResult(
+        spider=case.name,
+        concurrency=concurrency,
+        urls=urls,
+        requests=requests,
+        responses=stats.get("downloader/response_count", 0),
+        items=stats.get("item_scraped_count", 0),
+        retries=stats.get("retry/count", 0),
+        elapsed_seconds=round(elapsed, 3),
+        requests_per_second=round(requests / elapsed, 2),
+        p50_ms=round(get_percentile(latencies, 50) * 1000, 3),
+        p90_ms=round(get_percentile(latencies, 90) * 1000, 3),
+        p99_ms=round(get_percentile(latencies, 99) * 1000, 3),
+        peak_rss_mb=None if rss.peak is None else round(rss.peak, 1),
+        rss_increase_mb=None if rss.increase is None else round(rss.increase, 1),
+        status_counts={
+            key[len(status_prefix) :]: value for key, value in stats.items() if key.startswith(status_prefix)
+        },
+    )
+
+
+def get_stand_in_server(faults: FaultConfig) -> StandInServer:
+    fixtures = {name: load_fixture_documents(case.fixtures_dir) for name, case in get_benchmark_cases().items()}
+    return StandInServer(fixtures["rozetka_product"], fixtures["hotline_item_card"], faults=faults)
+
+
+def get_load_test_args() -> argparse.Namespace:
+    cases = list(get_load_test_cases())
+    parser = argparse.ArgumentParser(description="Spider throughput load test against a local stand-in server")
+
+    parser.add_argument("--spiders", nargs="+", choices=cases, default=cases, help="Spiders to load test")
+    parser.add_argument(
+        "--concurrency", nargs="+", type=int, default=DEFAULT_CONCURRENCY, help="CONCURRENT_REQUESTS values to run"
+    )
+    parser.add_argument("--urls", type=int, default=DEFAULT_URLS, help="Number of start urls per run")
+    parser.add_argument("--latency_ms", type=float, default=DEFAULT_LATENCY_MS, help="Response latency of the server")
+    parser.add_argument("--latency_jitter_ms", type=float, default=0, help="Random latency added on top")
+    parser.add_argument("--error_rate", type=float, default=0, help="Fraction of requests answered with 500")
+    parser.add_argument("--throttle_rate", type=float, default=0, help="Fraction of requests answered with 429")
+    parser.add_argument("--retry_after", type=int, default=1, help="Retry-After seconds of the 429 responses")
+    parser.add_argument("--seed", type=int, help="Seed of the injected latency and failures")
+    parser.add_argument(
+        "--scrapy_download_handler",
+        action="store_true",
+        help="Download with the plain Scrapy handler instead of the impersonating one, to tell their costs apart",
+    )
+    parser.add_argument("--output", type=str, help="Path to write the JSON results to")
+    return parser.parse_args()
+
+
+def main() -> int:
+    from pricera.common.collectors import CrawlWorker
+
+    args = get_load_test_args()
+    cases = get_load_test_cases()
+    faults = FaultConfig(
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after_seconds=args.retry_after,
+        seed=args.seed,
+    )
+
+    extra_settings = {"DOWNLOAD_HANDLERS": SCRAPY_DOWNLOAD_HANDLERS} if args.scrapy_download_handler else None
+
+    results = []
+    server = get_stand_in_server(faults).start()
+    with tempfile.TemporaryDirectory() as object_store_dir, tempfile.TemporaryDirectory() as spool_dir:
+        set_object_store(LocalObjectStore(root_dir=object_store_dir))
+        try:
+            for spider_name in args.spiders:
+                for concurrency in sorted(args.concurrency):
+                    result = run_load_test(
+                        cases[spider_name],
+                        server.url,
+                        concurrency=concurrency,
+                        urls=args.urls,
+                        spool_dir=spool_dir,
+                        extra_settings=extra_settings,
+                    )
+                    logger.info(
+                        f"{result.spider} (concurrency {result.concurrency}): {result.requests_per_second} req/s, "
+                        f"p50 {result.p50_ms} ms, p99 {result.p99_ms} ms, RSS +{result.rss_increase_mb} MB"
+                    )
+                    results.append(asdict(result))
+        finally:
+            CrawlWorker.stop()
+            set_object_store(None)
+            server.stop()
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "faults": asdict(faults),
+        "download_handler": "scrapy" if args.scrapy_download_handler else "impersonate",
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Load test results written to {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    set_logger()
+    sys.exit(main())
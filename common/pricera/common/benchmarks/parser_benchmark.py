@@ -0,0 +1,208 @@
+import argparse
+import gzip
+import json
+import logging
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from itertools import cycle, islice
+from typing import Callable, Iterator
+
+from pricera.common.logger import set_logger
+
+logger = logging.getLogger("parser_benchmark")
+
+DEFAULT_CORPUS_SIZES = [1_000]
+DEFAULT_MEMORY_SAMPLE_SIZE = 100
+DEFAULT_TOLERANCE = 0.1
+
+
+@dataclass
+class BenchmarkCase:
+    """A parser and the directory of recorded gzipped JSONL fixtures it is benchmarked on."""
+
+    name: str
+    parse: Callable[[str], dict]
+    fixtures_dir: str
+
+
+@dataclass
+class BenchmarkResult:
+    parser: str
+    documents: int
+    docs_per_second: float
+    p50_ms: float
+    p99_ms: float
+    peak_memory_mb: float
+
+
+def get_benchmark_cases() -> dict[str, BenchmarkCase]:
+    from pricera.hotline.parsers import HotlineItemCardParser
+    from pricera.rozetka.parsers import RozetkaProductParser
+    import pricera.hotline
+    import pricera.rozetka
+
+    return {
+        "hotline_item_card": BenchmarkCase(
+            name="hotline_item_card",
+            parse=HotlineItemCardParser.parse,
+            fixtures_dir=os.path.join(os.path.dirname(pricera.hotline.__file__), "tests", "test_cases"),
+        ),
+        "rozetka_product": BenchmarkCase(
+            name="rozetka_product",
+            parse=RozetkaProductParser.parse,
+            fixtures_dir=os.path.join(os.path.dirname(pricera.rozetka.__file__), "tests", "test_cases"),
+        ),
+    }
+
+
+def load_fixture_documents(fixtures_dir: str) -> list[str]:
+    documents = []
+    for filename in sorted(os.listdir(fixtures_dir)):
+        if not filename.endswith(".jsonl.gz"):
+            continue
+        with gzip.open(os.path.join(fixtures_dir, filename), mode="rt", encoding="utf-8") as gz_file:
+            documents.extend(line for line in gz_file if line.strip())
+
+    if not documents:
+        raise FileNotFoundError(f"No .jsonl.gz fixtures found in {fixtures_dir}")
+    return documents
+
+
+def iter_corpus(documents: list[str], size: int) -> Iterator[str]:
+    """
+    Synthetic corpus of the given size made of the fixture documents repeated in a cycle.
+    Documents are yielded lazily, so a 100k corpus costs no more memory than the fixtures.
+    """
+    return islice(cycle(documents), size)
+
+
+def get_percentile(sorted_values: list[float], percentile: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(percentile / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure_peak_memory_mb(case: BenchmarkCase, documents: list[str], sample_size: int) -> float:
+    """Peak traced memory of parsing a sample of the corpus, measured apart since tracing slows parsing down."""
+    tracemalloc.start()
+    try:
+        for document in iter_corpus(documents, sample_size):
+            case.parse(document)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024 / 1024
+
+
+def run_benchmark(case: BenchmarkCase, size: int, memory_sample_size: int) -> BenchmarkResult:
+    documents = load_fixture_documents(case.fixtures_dir)
+    # warm up imports and compiled expressions, so they don't count as the first document latency
+    case.parse(documents[0])
+
+    latencies = []
+    started_at = time.perf_counter()
+    for document in iter_corpus(documents, size):
+        document_started_at = time.perf_counter()
+        case.parse(document)
+        latencies.append(time.perf_counter() - document_started_at)
+    elapsed = time.perf_counter() - started_at
+
+    latencies.sort()
+    return BenchmarkResult(
+        parser=case.name,
+        documents=size,
+        docs_per_second=round(size / elapsed, 2),
+        p50_ms=round(get_percentile(latencies, 50) * 1000, 3),
+        p99_ms=round(get_percentile(latencies, 99) * 1000, 3),
+        peak_memory_mb=round(measure_peak_memory_mb(case, documents, min(size, memory_sample_size)), 3),
+    )
+
+
+def find_regressions(results: list[dict], baseline: list[dict], tolerance: float) -> list[str]:
+    """
+    Compare results with a baseline run of the same parser and corpus size.
+    A metric regresses when it is worse than the baseline by more than the tolerance (a fraction).
+    """
+    baseline_by_key = {(result["parser"], result["documents"]): result for result in baseline}
+    regressions = []
+
+    for result in results:
+        previous = baseline_by_key.get((result["parser"], result["documents"]))
+        if previous is None:
+            continue
+
+        label = f"{result['parser']} ({result['documents']} docs)"
+        if result["docs_per_second"] < previous["docs_per_second"] * (1 - tolerance):
+            regressions.append(
+                f"{label}: throughput {previous['docs_per_second']} -> {result['docs_per_second']} docs/s"
+            )
+        for metric in ["p50_ms", "p99_ms", "peak_memory_mb"]:
+            if result[metric] > previous[metric] * (1 + tolerance):
+                regressions.append(f"{label}: {metric} {previous[metric]} -> {result[metric]}")
+
+    return regressions
+
+
+def get_benchmark_args() -> argparse.Namespace:
+    cases = list(get_benchmark_cases())
+    parser = argparse.ArgumentParser(description="Parser throughput benchmark over the recorded fixtures")
+
+    parser.add_argument("--parsers", nargs="+", choices=cases, default=cases, help="Parsers to benchmark")
+    parser.add_argument("--documents", nargs="+", type=int, default=DEFAULT_CORPUS_SIZES, help="Synthetic corpus sizes")
+    parser.add_argument(
+        "--memory_sample_size",
+        type=int,
+        default=DEFAULT_MEMORY_SAMPLE_SIZE,
+        help="Number of documents parsed with memory tracing enabled",
+    )
+    parser.add_argument("--output", type=str, help="Path to write the JSON results to")
+    parser.add_argument("--baseline", type=str, help="Path to the JSON results of a previous run to compare with")
+    parser.add_argument(
+        "--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed relative slowdown before flagging"
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = get_benchmark_args()
+    cases = get_benchmark_cases()
+
+    results = []
+    for parser_name in args.parsers:
+        for size in args.documents:
+            result = run_benchmark(cases[parser_name], size=size, memory_sample_size=args.memory_sample_size)
+            logger.info(
+                f"{result.parser} ({result.documents} docs): {result.docs_per_second} docs/s, "
+                f"p50 {result.p50_ms} ms, p99 {result.p99_ms} ms, peak memory {result.peak_memory_mb} MB"
+            )
+            results.append(asdict(result))
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Benchmark results written to {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = find_regressions(results, json.load(f)["results"], tolerance=args.tolerance)
+        for regression in regressions:
+            logger.error(f"Regression: {regression}")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    set_logger()
+    sys.exit(main())
@@ -0,0 +1,174 @@
+__all__ = ["FaultConfig", "StandInServer"]
+
+import json
+import logging
+import random
+import threading
+import time
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+
+from pricera.common.utilities import parse_line
+
+logger = logging.getLogger("stand_in_server")
+
+ROZETKA_DETAILS_PATH = "/v1/api/product/details"
+
+
+@dataclass
+class FaultConfig:
+    """Latency and failures injected into the stand-in responses, the rates are fractions of the requests."""
+
+    latency_ms: float = 0
+    latency_jitter_ms: float = 0
+    error_rate: float = 0
+    throttle_rate: float = 0
+    retry_after_seconds: int = 1
+    seed: Optional[int] = None
+
+
+class StandInServer:
+    """
+    Local HTTP server replaying recorded marketplace responses, so the spiders can be load tested offline.
+
+    `product/details` requests get the recorded Rozetka products of the requested ids, any other path gets
+    a recorded Hotline item card page. Ids and paths missing from the recordings are answered with a recorded
+    document picked by their checksum, Rozetka products get the requested id, so every request has a response.
+    The FaultConfig adds latency, 500 responses and 429 responses with a Retry-After header.
+
+    Usage:
+        with StandInServer(rozetka_documents, hotline_documents, faults=FaultConfig(latency_ms=50)) as server:
+            spider_kwargs = {"api_base_url": server.url}
+    """
+
+    def __init__(
+        self,
+        rozetka_documents: list[str],
+        hotline_documents: list[str],
+        faults: Optional[FaultConfig] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.faults = faults or FaultConfig()
+        self.rozetka_products = [product for document in rozetka_documents for product in self.get_products(document)]
+        self.id_to_product = {str(product["id"]): product for product in self.rozetka_products}
+        self.hotline_pages = [parse_line(document) for document in hotline_documents]
+        self.path_to_page = {urlsplit(page.url).path: page.text for page in self.hotline_pages}
+        self.status_counts: Counter = Counter()
+        self._random = random.Random(self.faults.seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self.get_handler_cls())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def get_products(document: str) -> list[dict]:
+        line = parse_line(document)
+        if line.status != 200:
+            return []
+        return [product for product in line.raw_data.get("data") or [] if "id" in product]
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StandInServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stand_in_server", daemon=True)
+        self._thread.start()
+        logger.info(f"Stand-in server listening on {self.url}")
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "StandInServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.stop()
+
+    def draw_fault(self) -> tuple[float, Optional[int]]:
+        """Latency in seconds and the injected status code of the next response, None for a normal one."""
+        with self._lock:
+            latency = self.faults.latency_ms + self._random.uniform(0, self.faults.latency_jitter_ms)
+            draw = self._random.random()
+        if draw < self.faults.throttle_rate:
+            return latency / 1000, 429
+        if draw < self.faults.throttle_rate + self.faults.error_rate:
+            return latency / 1000, 500
+        return latency / 1000, None
+
+    def get_response(self, path: str) -> tuple[int, str, str]:
+        """Status, content type and body of the recorded response to the path."""
+        parts = urlsplit(path)
+        if parts.path == ROZETKA_DETAILS_PATH:
+            ids = (parse_qs(parts.query).get("ids") or [""])[0]
+            products = [self.get_product(product_id) for product_id in ids.split(",") if product_id]
+            return 200, "application/json", json.dumps({"data": products, "errors": None}, ensure_ascii=False)
+
+        text = self.path_to_page.get(parts.path)
+        if text is None and self.hotline_pages:
+            text = self.hotline_pages[zlib.crc32(parts.path.encode()) % len(self.hotline_pages)].text
+        if text is None:
+            return 404, "text/plain", "Not found"
+        return 200, "text/html; charset=utf-8", text
+
+    def get_product(self, product_id: str) -> dict:
+        product = self.id_to_product.get(product_id)
+        if product is not None:
+            return product
+        if not self.rozetka_products:
+            return {"id": int(product_id)}
+        product = self.rozetka_products[zlib.crc32(product_id.encode()) % len(self.rozetka_products)]
+        return product | {"id": int(product_id)}
+
+    def record_status(self, status: int) -> None:
+        with self._lock:
+            self.status_counts[status] += 1
+
+    def get_handler_cls(self) -> type[BaseHTTPRequestHandler]:
+        server = self
+
+        class StandInHandler(BaseHTTPRequestHandler):
+            # keep-alive, as the marketplaces do, so the load test doesn't measure connection setup
+            protocol_version = "HTTP/1.1"
+            # headers and body are written apart, Nagle's algorithm would hold the body back for a delayed ack
+            disable_nagle_algorithm = True
+
+            def do_GET(self) -> None:
+                latency, fault_status = server.draw_fault()
+                if latency:
+                    time.sleep(latency)
+
+                headers = {}
+                if fault_status == 429:
+                    status, content_type, body = 429, "text/plain", "Too many requests"
+                    headers["Retry-After"] = str(server.faults.retry_after_seconds)
+                elif fault_status is not None:
+                    status, content_type, body = fault_status, "text/plain", "Internal server error"
+                else:
+                    status, content_type, body = server.get_response(self.path)
+
+                server.record_status(status)
+                encoded = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(encoded)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(encoded)
+
+            def log_message(self, format, *args) -> None:
+                # one line per request would drown the load test report
+                pass
+
+        return StandInHandler
@@ -1,4 +1,28 @@
-__all__ = ["BaseCollector", "FileBasedMessageConsumer", "RabbitMQ"]
+__all__ = [
+    "BaseCollector",
+    "BatchPublisher",
+    "CrawlWorker",
+    "ParseExecutor",
+    "FileBasedMessageConsumer",
+    "RabbitMQ",
+    "RecrawlScheduler",
+]
 
-from .base_collector import BaseCollector
-from .consumers import FileBasedMessageConsumer, RabbitMQ
+from importlib import import_module
+
+# collectors are imported on first use, the crawl worker e.g. pulls in Scrapy and Twisted, the consumers pika
+_EXPORT_TO_MODULE = {
+    "BaseCollector": ".base_collector",
+    "BatchPublisher": ".publisher",
+    "CrawlWorker": ".crawl_worker",
+    "ParseExecutor": ".parse_executor",
+    "FileBasedMessageConsumer": ".consumers",
+    "RabbitMQ": ".consumers",
+    "RecrawlScheduler": ".recrawl_scheduler",
+}
+
+
+def __getattr__(name: str):
+    if name in _EXPORT_TO_MODULE:
+        return getattr(import_module(_EXPORT_TO_MODULE[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
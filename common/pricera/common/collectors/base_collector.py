@@ -1,21 +1,51 @@
-from typing import Union, List, ClassVar
-from scrapy import signals
-from scrapy.crawler import CrawlerProcess
-from scrapy.utils.project import get_project_settings
-import boto3
-import io
+import time
+from contextlib import closing
+from datetime import datetime, timezone
+from typing import Iterator, Optional, Union, List, ClassVar
 import gzip
-from botocore.exceptions import ClientError
-from pricera.models import HashedURL
+from pricera.models import HashedURL, InvalidURLError
+from pricera.common import metrics
+from pricera.common.mongo_write_buffer import MongoWriteBuffer
+from pricera.common.object_store import get_object_store
+from pricera.common.utilities import get_nested_value, iter_stream_lines
 import logging
-from twisted.python.failure import Failure
+from pymongo import UpdateOne
+from pymongo.collection import Collection
 
 logger = logging.getLogger("base_collector")
 
+# stands for a field missing from a stored document, so a stored None still counts as a value
+_MISSING = object()
+
+
+def measure_download(lines: Iterator[str], open_seconds: float) -> Iterator[str]:
+    """
+    Count the lines into the download metrics as they are consumed, so a partly read chain counts partly.
+    The download time is the opening and the reads, not the time the consumer spends between the lines.
+    """
+    if not metrics.is_enabled():
+        return lines
+    return _iter_measured_lines(lines, open_seconds)
+
+
+def _iter_measured_lines(lines: Iterator[str], seconds: float) -> Iterator[str]:
+    try:
+        while True:
+            started_at = time.perf_counter()
+            line = next(lines, None)
+            seconds += time.perf_counter() - started_at
+            if line is None:
+                return
+            metrics.inc("pricera_s3_download_bytes_total", len(line.encode("utf-8")))
+            yield line
+    finally:
+        metrics.observe("pricera_s3_download_seconds", seconds)
+
 
 class ScrapyConfigurationMixin:
     def __init__(self):
         self.spider_instance = None
+        self.spider_error = None
 
     def process_scrapy_spider(
         self,
@@ -26,13 +56,31 @@ class ScrapyConfigurationMixin:
         proxy_config=None,
         **kwargs,
     ):
+        # Scrapy and Twisted are only imported by crawls, the parse workers don't need them
+        from scrapy import signals
+        from scrapy.crawler import CrawlerProcess
+        from scrapy.utils.project import get_project_settings
+
+        from pricera.common.collectors.crawl_worker import CrawlWorker
+
+        # a long-lived worker owns the reactor, so the spider has to be scheduled on it
+        if CrawlWorker.is_running():
+            return self.process_scrapy_spider_in_worker(
+                spider_cls,
+                start_urls=start_urls,
+                storage_bucket=storage_bucket,
+                storage_prefix=storage_prefix,
+                proxy_config=proxy_config,
+                **kwargs,
+            )
+
         process = CrawlerProcess(get_project_settings())
         crawler = process.create_crawler(spider_cls)
 
         def handle_spider_opened(spider):
             self.spider_instance = spider
 
-        def handle_spider_error(failure: Failure, response, spider):
+        def handle_spider_error(failure, response, spider):
             self.spider_error = failure.value
             logger.error(
                 "Spider error occurred",
@@ -59,20 +107,227 @@ class ScrapyConfigurationMixin:
 
         return self.spider_instance
 
+    def process_scrapy_spider_in_worker(
+        self,
+        spider_cls,
+        start_urls: list[HashedURL],
+        storage_bucket: str,
+        storage_prefix: str,
+        proxy_config=None,
+        **kwargs,
+    ):
+        from pricera.common.collectors.crawl_worker import CrawlWorker
+
+        try:
+            result = CrawlWorker.get_instance().crawl(
+                spider_cls,
+                start_urls=start_urls,
+                proxy_config=proxy_config,
+                storage_bucket=storage_bucket,
+                storage_prefix=storage_prefix,
+                **kwargs,
+            )
+        except Exception as e:
+            logger.exception("Crawl worker failed to schedule spider")
+            self.spider_error = e
+            return self.spider_instance
+
+        self.spider_instance = result.spider
+        if result.error is not None:
+            self.spider_error = result.error
+        return self.spider_instance
+
 
 class BaseCollector(ScrapyConfigurationMixin):
     storage_bucket: ClassVar[str] = "pricera-crawled-data"
     is_synchronous: ClassVar[bool] = True
+    # batch collectors get payloads split into chunks of at most this many values, None means unbounded
+    max_batch_size: ClassVar[Optional[int]] = None
     db_name: ClassVar[str] = "pricera"
 
-    @staticmethod
-    def get_storage_file_name_from_url(url: str) -> str:
-        url_with_hash = HashedURL.from_value(url)
+    # set by the marketplace mixins, it picks the canonicalizer urls are deduplicated and hashed by
+    marketplace: ClassVar[str]
+
+    @classmethod
+    def get_storage_file_name_from_url(cls, url: str) -> str:
+        url_with_hash = HashedURL.from_value(url, marketplace=cls.marketplace)
         return f"{url_with_hash.hash}.jsonl.gz"
 
+    @classmethod
+    def get_legacy_storage_file_name_from_url(cls, url: str) -> str:
+        """Name the chain was stored under before the urls were canonicalized, the hash of the url itself."""
+        return f"{HashedURL.get_hash(str(url))}.jsonl.gz"
+
+    @classmethod
+    def get_object_key(cls, url_hash: str) -> str:
+        return f"{cls.storage_bucket}/{cls.storage_prefix}/{url_hash}.jsonl.gz"
+
+    @classmethod
+    def group_urls(cls, urls: list[str]) -> tuple[dict[str, list[HashedURL]], list[str]]:
+        """
+        Group the urls by the hash of their canonical key, keeping the order they were first seen in,
+        and set apart the urls the marketplace canonicalizer rejects.
+        """
+        hash_to_urls: dict[str, list[HashedURL]] = {}
+        invalid_urls: list[str] = []
+
+        for url in urls:
+            try:
+                url_with_hash = HashedURL.from_value(url, marketplace=cls.marketplace)
+            except InvalidURLError as e:
+                logger.warning(f"Skipping invalid url: {e}")
+                invalid_urls.append(url)
+                continue
+            hash_to_urls.setdefault(url_with_hash.hash, []).append(url_with_hash)
+
+        return hash_to_urls, invalid_urls
+
     @classmethod
     def prepare_urls(cls, urls: list[str]) -> list[HashedURL]:
-        return HashedURL.from_values(urls)
+        """Valid urls deduplicated by their canonical key, the first url of every key is kept."""
+        hash_to_urls, _ = cls.group_urls(urls)
+        return [same_urls[0] for same_urls in hash_to_urls.values()]
+
+    def quarantine_invalid_urls(self, invalid_urls: list[str]) -> None:
+        """Mark the urls the canonicalizer rejects, so they are not crawled again until fixed."""
+        if not invalid_urls:
+            return
+
+        crawl_status = {f"pricera.{self.collector_name}.crawl_status": "invalid"}
+        bulk_requests = [
+            UpdateOne(filter={self.db_url_field: url}, update={"$set": crawl_status}, upsert=True)
+            for url in invalid_urls
+        ]
+        try:
+            self.bulk_write(bulk_requests)
+            logger.info(f"Quarantined {len(invalid_urls)} invalid urls")
+        except Exception as e:
+            logger.error("Failed during the bulk updating of invalid urls", exc_info=e)
+            # the message must not be acknowledged without its writes
+            raise
+
+    def bulk_write(self, bulk_requests: list[UpdateOne], collection: Optional[Collection] = None) -> None:
+        """
+        Unordered bulk write to the collection of the collector (or the given one), coalesced with the writes
+        of other messages when the MongoWriteBuffer is running. Returns once the operations are written either way.
+        """
+        collection = self.db_collection if collection is None else collection
+        if MongoWriteBuffer.is_running():
+            MongoWriteBuffer.get_instance().write(collection, bulk_requests)
+        else:
+            with metrics.timer("pricera_mongo_bulk_write_seconds", collection=collection.name):
+                collection.bulk_write(bulk_requests, ordered=False)
+
+    def find_parsed_states(self, urls: list[str], fields: list[str]) -> dict[str, dict]:
+        """Stored documents of the urls, limited to the given (dotted) fields."""
+        documents = self.db_collection.find(
+            filter={self.db_url_field: {"$in": list(urls)}},
+            projection={"_id": 0, self.db_url_field: 1} | {field: 1 for field in fields},
+        )
+        return {document[self.db_url_field]: document for document in documents}
+
+    def write_parsed_updates(self, url_to_update: dict[str, dict]) -> None:
+        """
+        Write parse results as change-only updates: a document only gets the fields differing from
+        its stored state, an unchanged document isn't written at all. Changes of the `history_fields`
+        declared by the collector are appended to the monthly bucket of the product in its history collection.
+        """
+        if not url_to_update:
+            return
+
+        history_fields = getattr(self, "history_fields", [])
+        fields = {field for update in url_to_update.values() for field in update} | set(history_fields)
+        url_to_previous = self.find_parsed_states(list(url_to_update), sorted(fields))
+        now = datetime.now(timezone.utc)
+
+        bulk_requests: list[UpdateOne] = []
+        history_requests: list[UpdateOne] = []
+        for url, update in url_to_update.items():
+            previous = url_to_previous.get(url, {})
+            changes = {
+                field: value for field, value in update.items() if get_nested_value(previous, field, _MISSING) != value
+            }
+            if changes:
+                bulk_requests.append(UpdateOne(filter={self.db_url_field: url}, update={"$set": changes}, upsert=True))
+            if history_fields and (history_request := self.get_history_request(url, previous, update, now)):
+                history_requests.append(history_request)
+
+        logger.info(f"{len(bulk_requests)} of {len(url_to_update)} parsed documents changed")
+        if bulk_requests:
+            self.bulk_write(bulk_requests)
+        if history_requests:
+            history_collection = self.mongo_client[self.db_name][self.history_collection_name]
+            self.bulk_write(history_requests, collection=history_collection)
+
+    def get_history_request(self, url: str, previous: dict, update: dict, now: datetime) -> Optional[UpdateOne]:
+        """Append the history fields of a successful parse to the product's bucket of the month, if they changed."""
+        if not all(field in update for field in self.history_fields):
+            return None
+
+        entry = {field: update[field] for field in self.history_fields}
+        if all(get_nested_value(previous, field, _MISSING) == value for field, value in entry.items()):
+            return None
+
+        return UpdateOne(
+            filter={self.db_url_field: url, "month": now.strftime("%Y-%m")},
+            update={"$push": {"changes": {"at": now} | entry}},
+            upsert=True,
+        )
+
+    @classmethod
+    def get_hot_queries(cls) -> dict[str, dict]:
+        """Filters of the queries run for every url, each one is expected to use an index."""
+        sample_url = "https://example.com/"
+        return {
+            "write by url": {cls.db_url_field: sample_url},
+            "urls with crawl status": {
+                cls.db_url_field: {"$in": [sample_url]},
+                f"pricera.{cls.collector_name}.crawl_status": "unchanged",
+            },
+            "known content hashes": {
+                cls.db_url_field: {"$in": [sample_url]},
+                f"pricera.{cls.collector_name}.parse_status": "success",
+                f"pricera.{cls.collector_name}.content_hash": {"$exists": True},
+            },
+        }
+
+    def find_known_content_hashes(self, urls: list[HashedURL]) -> dict[str, str]:
+        """
+        Content hashes of the chains already stored and successfully parsed, keyed by the url hash.
+        Chains stored under another object key, e.g. the legacy key of the raw url, don't count,
+        so an unchanged chain is uploaded once under its current key.
+        The lookup is an optimization only, so on a database error nothing is reported as known.
+        """
+        content_hash_field = f"pricera.{self.collector_name}.content_hash"
+        object_key_field = f"object_key.{self.collector_name}"
+        url_to_hash = {url: url.hash for url in urls}
+
+        try:
+            documents = self.db_collection.find(
+                filter={
+                    self.db_url_field: {"$in": list(url_to_hash)},
+                    f"pricera.{self.collector_name}.parse_status": "success",
+                    content_hash_field: {"$exists": True},
+                },
+                projection={"_id": 0, self.db_url_field: 1, content_hash_field: 1, object_key_field: 1},
+            )
+            known_content_hashes = {}
+            for document in documents:
+                url_hash = url_to_hash[document[self.db_url_field]]
+                if get_nested_value(document, object_key_field) == self.get_object_key(url_hash):
+                    known_content_hashes[url_hash] = document["pricera"][self.collector_name]["content_hash"]
+            return known_content_hashes
+        except Exception as e:
+            logger.error("Failed to load known content hashes", exc_info=e)
+            return {}
+
+    def find_urls_with_crawl_status(self, urls: list[str], crawl_status: str) -> set[str]:
+        crawl_status_field = f"pricera.{self.collector_name}.crawl_status"
+        documents = self.db_collection.find(
+            filter={self.db_url_field: {"$in": list(urls)}, crawl_status_field: crawl_status},
+            projection={"_id": 0, self.db_url_field: 1},
+        )
+        return {document[self.db_url_field] for document in documents}
 
     def crawl(self):
         raise NotImplementedError
@@ -98,7 +353,7 @@ class BaseCollector(ScrapyConfigurationMixin):
         filename: str,
     ) -> Union[str, List[dict]]:
         """
-        Loads a file from S3 bucket. Supports both regular files and gzipped JSONL files.
+        Loads a file from the object store (S3 by default). Supports both regular files and gzipped JSONL files.
 
         :param bucket: S3 bucket name
         :param prefix: S3 prefix/folder path
@@ -108,32 +363,69 @@ class BaseCollector(ScrapyConfigurationMixin):
 
         key = f"{prefix.rstrip('/')}/{filename}"
 
+        with metrics.timer("pricera_s3_download_seconds"):
+            with closing(get_object_store().open_object(bucket=bucket, key=key)) as body:
+                logger.info("Successfully loaded file from S3", extra={"s3_bucket": bucket, "s3_key": key})
+
+                # Auto-detect gzipped files by extension, decompressed straight from the body
+                if filename.endswith(".gz"):
+                    with gzip.GzipFile(fileobj=body, mode="rb") as gz_file:
+                        data = gz_file.read()
+                else:
+                    data = body.read()
+
+        metrics.inc("pricera_s3_download_bytes_total", len(data))
+        return data.decode("utf-8")
+
+    @classmethod
+    def iter_chain_lines_from_s3(cls, url: str) -> Iterator[str]:
+        """
+        Lazily yields the lines of the stored chain of the url. A chain missing under the key of the canonical url
+        is read from its legacy key, chains crawled before the urls were canonicalized are stored there.
+        """
+        filename = cls.get_storage_file_name_from_url(url)
+        legacy_filename = cls.get_legacy_storage_file_name_from_url(url)
+
+        lines = cls.iter_lines_from_s3(bucket=cls.storage_bucket, prefix=cls.storage_prefix, filename=filename)
         try:
-            s3 = boto3.client("s3")
-            # Download file from S3
-            response = s3.get_object(Bucket=bucket, Key=key)
+            first_line = next(lines, None)
+        except FileNotFoundError:
+            if legacy_filename == filename:
+                raise
+            logger.info("Chain is missing under its canonical key, reading its legacy key", extra={"url": url})
+            lines = cls.iter_lines_from_s3(
+                bucket=cls.storage_bucket, prefix=cls.storage_prefix, filename=legacy_filename
+            )
+            first_line = next(lines, None)
 
-            logger.info("Successfully loaded file from S3", extra={"s3_bucket": bucket, "s3_key": key})
+        with closing(lines):
+            if first_line is None:
+                return
+            yield first_line
+            yield from lines
 
-            file_content = response["Body"].read()
+    @staticmethod
+    def iter_lines_from_s3(bucket: str, prefix: str, filename: str) -> Iterator[str]:
+        """
+        Lazily yields the JSONL lines of a file from the object store, decompressing gzipped files on the fly.
+        Peak memory is bounded by the longest line instead of the whole file.
+        The object is opened on the first iteration, so FileNotFoundError/IOError are raised from there.
 
-            # Auto-detect gzipped files by extension
-            if filename.endswith(".gz"):
-                bio = io.BytesIO(file_content)
+        :param bucket: S3 bucket name
+        :param prefix: S3 prefix/folder path
+        :param filename: name of the file (e.g., "20-11-2025-rozetka-product.jsonl.gz")
+        :return: iterator over non-empty lines
+        """
 
-                with gzip.GzipFile(fileobj=bio, mode="rb") as gz_file:
-                    decompressed_data = gz_file.read().decode("utf-8")
-                    return decompressed_data
-            else:
-                return file_content.decode("utf-8")
+        key = f"{prefix.rstrip('/')}/{filename}"
 
-        except ClientError as exception:
-            error_code = exception.response["Error"]["Code"]
-            if error_code == "NoSuchKey":
-                logger.error("File not found in S3", extra={"s3_bucket": bucket, "s3_key": key})
-                raise FileNotFoundError(f"File not found in S3: s3://{bucket}/{key}")
+        started_at = time.perf_counter()
+        with closing(get_object_store().open_object(bucket=bucket, key=key)) as body:
+            open_seconds = time.perf_counter() - started_at
+            logger.info("Streaming file from S3", extra={"s3_bucket": bucket, "s3_key": key})
+
+            if filename.endswith(".gz"):
+                with gzip.GzipFile(fileobj=body, mode="rb") as gz_file:
+                    yield from measure_download(iter_stream_lines(gz_file), open_seconds)
             else:
-                logger.error(
-                    "Error during loading file from s3", exc_info=exception, extra={"s3_bucket": bucket, "s3_key": key}
-                )
-                raise IOError(f"S3 error loading file s3://{bucket}/{key}: {exception}")
+                yield from measure_download(iter_stream_lines(body), open_seconds)
@@ -1,15 +1,27 @@
 __all__ = ["FileBasedMessageConsumer", "RabbitMQ"]
 
 import json
+import logging
 import os
 import ssl
+import time
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Any, Callable, Dict, Generator
+from functools import partial
+from typing import Any, Callable, ClassVar, Dict, Generator
 
 from pika import BlockingConnection, ConnectionParameters, PlainCredentials, SSLOptions
-from pricera.common.utilities import get_rabbitmq_host, get_rabbitmq_password, get_rabbitmq_user
-from pricera.common.collectors.exceptions import MessageFileFormatError, MessageFileNotFoundError
+from pricera.common.utilities import (
+    count_message_urls,
+    get_rabbitmq_host,
+    get_rabbitmq_password,
+    get_rabbitmq_user,
+    merge_message_payloads,
+)
+from pricera.common.collectors.exceptions import MessageFileFormatError, MessageFileNotFoundError, MessageFormatError
+
+logger = logging.getLogger("consumers")
 
 
 class Consumer(ABC):
@@ -70,19 +82,37 @@ class FileBasedMessageConsumer:
 
 @dataclass
 class RabbitMQ:
+    """
+    RabbitMQ client. Messages are consumed concurrently: up to `prefetch_count` unacknowledged
+    deliveries are handed to a pool of `max_workers` threads, while the connection thread keeps
+    dispatching heartbeats. Workers never touch the channel, acks and nacks are scheduled back
+    on the connection thread with `add_callback_threadsafe`.
+
+    A failed message is requeued, so a transient error doesn't lose it, up to `max_deliveries` deliveries.
+    Quorum queues count them in the `x-delivery-count` header, on classic queues a message is only
+    requeued on its first delivery. Messages failing past that, and the ones that aren't valid JSON,
+    are rejected, so the broker drops them or routes them to the dead-letter exchange of the queue policy.
+    """
+
     host: str = get_rabbitmq_host()
     user: str = get_rabbitmq_user()
     password: str = get_rabbitmq_password()
     port: int = 5671
+    prefetch_count: int = 1
+    max_workers: int = 1
+    max_deliveries: int = 3
+    BATCH_POLL_INTERVAL: ClassVar[float] = 0.05
 
     def __post_init__(self):
         self.connection = None
         self.channel = None
+        self.declared_queues: set[str] = set()
+        if self.prefetch_count < self.max_workers:
+            logger.warning("prefetch_count is lower than max_workers, some workers will stay idle")
 
-    def connect(self):
-        """Establish connection to RabbitMQ"""
+    def get_connection_parameters(self) -> ConnectionParameters:
         ssl_options = SSLOptions(ssl.create_default_context(), self.host)
-        connection_params = ConnectionParameters(
+        return ConnectionParameters(
             host=self.host,
             port=self.port,
             credentials=PlainCredentials(self.user, self.password),
@@ -92,42 +122,190 @@ class RabbitMQ:
             connection_attempts=3,
             retry_delay=5,
         )
-        self.connection = BlockingConnection(connection_params)
+
+    def connect(self):
+        """Establish connection to RabbitMQ"""
+        self.connection = BlockingConnection(self.get_connection_parameters())
         self.channel = self.connection.channel()
-        # todo: investigate if we should use this
-        # self.channel.basic_qos(prefetch_count=1)
+        self.channel.basic_qos(prefetch_count=self.prefetch_count)
+        self.declared_queues.clear()
 
     def publish(self, queue: str, message: bytes, durable: bool = True):
-        """Publish message to specified queue"""
+        """Publish message to specified queue, the queue is declared once per connection"""
         if not self.connection or self.connection.is_closed:
             self.connect()
 
-        self.channel.queue_declare(queue=queue, durable=durable)
-        self.channel.basic_qos(prefetch_count=1)
+        if queue not in self.declared_queues:
+            self.channel.queue_declare(queue=queue, durable=durable)
+            self.declared_queues.add(queue)
         self.channel.basic_publish(exchange="", routing_key=queue, body=message)
-        print(f"Message sent to {queue}")
-
-    def consume(self, queue: str, function: Callable):
-        # """Start consuming messages from specified queue with manual acknowledgment"""
-        # if not self.connection or self.connection.is_closed:
-        #     self.connect()
-
-        def wrapped_function(ch, method, properties, body):
-            # Call the user's callback function
-            try:
-                function(body)
-                # Manually acknowledge the message after successful processing
-                ch.basic_ack(delivery_tag=method.delivery_tag)
-            except Exception:
-                print("error during the message processing, acknowledge")
+        logger.debug(f"Message sent to {queue}")
+
+    def consume(self, queue: str, function: Callable[[dict], None]):
+        """
+        Start consuming messages from specified queue with manual acknowledgment.
+
+        Every message body is decoded from JSON and passed to the function on a worker thread.
+        The message is acked when the function returns and nacked when it raises or the body is not valid JSON.
+        """
+        if not self.connection or self.connection.is_closed:
+            self.connect()
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="rabbitmq_consumer")
+
+        def on_message(channel, method, properties, body):
+            requeue = self.should_requeue(method, properties)
+            executor.submit(self._process_message, function, channel, method.delivery_tag, body, requeue)
 
         self.channel.basic_consume(
             queue=queue,
-            on_message_callback=wrapped_function,
+            on_message_callback=on_message,
             auto_ack=False,  # Manual acknowledgment
         )
-        print(f"Waiting for messages on {queue}...")
-        self.channel.start_consuming()
+        logger.info(
+            f"Waiting for messages on {queue} with {self.max_workers} workers and prefetch {self.prefetch_count}..."
+        )
+        try:
+            self.channel.start_consuming()
+        finally:
+            executor.shutdown(wait=True)
+            # deliver the acks scheduled by the last workers
+            if self.connection.is_open:
+                self.connection.process_data_events(time_limit=0)
+
+    def consume_batches(
+        self,
+        queue: str,
+        function: Callable[[dict], None],
+        can_batch: Callable[[str], bool],
+        max_batch_urls: int,
+        max_wait_ms: int,
+    ):
+        """
+        Start consuming messages from specified queue in micro-batches.
+
+        Messages are collected until they carry `max_batch_urls` payload values or `max_wait_ms` passed
+        since the first message of the batch, then their payloads are merged and the function is called
+        once per batch on a worker thread. When the batch fails, its messages are processed one by one,
+        so each source message is acked or nacked according to its own outcome.
+        Only messages whose every payload key passes `can_batch` are batched, the others are processed
+        one by one as they arrive. A batch can't hold more messages than `prefetch_count`, with a lower
+        prefetch the batches are flushed by `max_wait_ms` only.
+        """
+        if not self.connection or self.connection.is_closed:
+            self.connect()
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="rabbitmq_consumer")
+        batch: list[tuple[int, dict, bool]] = []
+        batch_urls = 0
+        deadline = 0.0
+
+        logger.info(f"Waiting for messages on {queue} in batches of {max_batch_urls} urls or {max_wait_ms} ms...")
+        try:
+            # the generator yields (None, None, None) after the poll interval without messages
+            poll_interval = min(max_wait_ms / 1000, self.BATCH_POLL_INTERVAL)
+            for method, properties, body in self.channel.consume(queue, inactivity_timeout=poll_interval):
+                if method is not None:
+                    try:
+                        message = self.decode_message(body)
+                    except MessageFormatError as e:
+                        logger.error("Dropping a message", exc_info=e, extra={"delivery_tag": method.delivery_tag})
+                        self._settle_message(self.channel, method.delivery_tag, success=False, requeue=False)
+                        continue
+
+                    entry = (method.delivery_tag, message, self.should_requeue(method, properties))
+                    if not all(can_batch(payload_key) for payload_key in message.get("payload") or {}):
+                        executor.submit(self._process_batch, function, self.channel, [entry])
+                        continue
+
+                    if not batch:
+                        deadline = time.monotonic() + max_wait_ms / 1000
+                    batch.append(entry)
+                    batch_urls += count_message_urls(message)
+
+                if batch and (batch_urls >= max_batch_urls or time.monotonic() >= deadline):
+                    executor.submit(self._process_batch, function, self.channel, batch)
+                    batch, batch_urls = [], 0
+        finally:
+            # messages of an unfinished batch are requeued by the broker
+            if self.channel.is_open:
+                self.channel.cancel()
+            executor.shutdown(wait=True)
+            if self.connection.is_open:
+                self.connection.process_data_events(time_limit=0)
+
+    def _process_message(
+        self, function: Callable[[dict], None], channel, delivery_tag: int, body: bytes, requeue: bool
+    ) -> None:
+        """Runs on a worker thread, must not use the channel directly."""
+        try:
+            success = self._call(function, self.decode_message(body))
+        except MessageFormatError as e:
+            logger.error("Error during the message decoding", exc_info=e, extra={"delivery_tag": delivery_tag})
+            # a malformed body fails on every delivery
+            success, requeue = False, False
+
+        self.connection.add_callback_threadsafe(partial(self._settle_message, channel, delivery_tag, success, requeue))
+
+    def _process_batch(self, function: Callable[[dict], None], channel, batch: list[tuple[int, dict, bool]]) -> None:
+        """Runs on a worker thread, must not use the channel directly."""
+        merged_message = (
+            batch[0][1] if len(batch) == 1 else merge_message_payloads([message for _, message, _ in batch])
+        )
+
+        if self._call(function, merged_message):
+            outcomes = [(delivery_tag, True, requeue) for delivery_tag, _, requeue in batch]
+        elif len(batch) == 1:
+            outcomes = [(batch[0][0], False, batch[0][2])]
+        else:
+            logger.warning(f"Batch of {len(batch)} messages failed, processing them one by one")
+            outcomes = [
+                (delivery_tag, self._call(function, message), requeue) for delivery_tag, message, requeue in batch
+            ]
+
+        for delivery_tag, success, requeue in outcomes:
+            self.connection.add_callback_threadsafe(
+                partial(self._settle_message, channel, delivery_tag, success, requeue)
+            )
+
+    @staticmethod
+    def _call(function: Callable[[dict], None], message: dict) -> bool:
+        try:
+            function(message)
+            return True
+        except Exception as e:
+            logger.error("Error during the message processing", exc_info=e)
+            return False
+
+    def should_requeue(self, method, properties) -> bool:
+        """Whether the delivery is requeued when it fails, by the deliveries of the message so far."""
+        headers = getattr(properties, "headers", None) or {}
+        delivery_count = headers.get("x-delivery-count")
+        if delivery_count is not None:
+            # quorum queues count the earlier deliveries, the first one has no header or 0
+            return int(delivery_count) + 1 < self.max_deliveries
+        return self.max_deliveries > 1 and not method.redelivered
+
+    def _settle_message(self, channel, delivery_tag: int, success: bool, requeue: bool = False) -> None:
+        """Runs on the connection thread."""
+        if not channel.is_open:
+            # the broker redelivers unacknowledged messages of a closed channel
+            logger.warning("Channel closed before the message was settled", extra={"delivery_tag": delivery_tag})
+            return
+
+        if success:
+            channel.basic_ack(delivery_tag=delivery_tag)
+        else:
+            if not requeue:
+                logger.error("Rejecting a failed message without requeueing", extra={"delivery_tag": delivery_tag})
+            channel.basic_nack(delivery_tag=delivery_tag, requeue=requeue)
+
+    @staticmethod
+    def decode_message(body: bytes) -> dict:
+        try:
+            return json.loads(body)
+        except json.JSONDecodeError as error:
+            raise MessageFormatError(f"Invalid JSON in message body: {error}")
 
     def close(self):
         """Close connection"""
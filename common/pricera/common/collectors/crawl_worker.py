@@ -0,0 +1,147 @@
+__all__ = ["CrawlWorker", "CrawlResult"]
+
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, ClassVar, Optional
+
+from scrapy import signals
+from scrapy.crawler import CrawlerRunner
+from scrapy.settings import Settings
+from scrapy.utils.project import get_project_settings
+from scrapy.utils.reactor import install_reactor, is_reactor_installed
+from twisted.internet.defer import Deferred
+from twisted.internet.threads import blockingCallFromThread
+from twisted.python.failure import Failure
+
+logger = logging.getLogger("crawl_worker")
+
+
+@dataclass
+class CrawlResult:
+    """Outcome of a single spider run scheduled through the CrawlWorker."""
+
+    spider: Any = None
+    custom_status: dict = field(default_factory=dict)
+    error: Optional[BaseException] = None
+
+
+class CrawlWorker:
+    """
+    Long-lived crawl worker that runs one Twisted reactor in a background thread
+    and schedules every spider through a single CrawlerRunner.
+
+    The reactor can only be started once per process, so message consumers that
+    handle more than one crawl message must use this worker instead of CrawlerProcess,
+    and a stopped worker can't be started again.
+
+    Usage:
+        worker = CrawlWorker.start()
+        result = worker.crawl(spider_cls, start_urls=..., storage_bucket=..., storage_prefix=...)
+        CrawlWorker.stop()
+    """
+
+    _instance: ClassVar[Optional["CrawlWorker"]] = None
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+    _stopped: ClassVar[bool] = False
+
+    def __init__(self, settings: Optional[Settings] = None):
+        self.settings: Settings = settings or get_project_settings()
+        self._install_reactor()
+
+        from twisted.internet import reactor
+
+        self.reactor = reactor
+        self.runner = CrawlerRunner(self.settings)
+        self._thread = threading.Thread(
+            target=self.reactor.run,
+            kwargs={"installSignalHandlers": False},
+            name="crawl_worker_reactor",
+            daemon=True,
+        )
+
+    def _install_reactor(self) -> None:
+        reactor_path = self.settings.get("TWISTED_REACTOR")
+        if reactor_path and not is_reactor_installed():
+            install_reactor(reactor_path, self.settings.get("ASYNCIO_EVENT_LOOP"))
+
+    @classmethod
+    def start(cls, settings: Optional[Settings] = None) -> "CrawlWorker":
+        """Start the process-wide worker (idempotent) and return it."""
+        with cls._lock:
+            if cls._instance is None:
+                if cls._stopped:
+                    raise RuntimeError("The crawl worker was stopped, its reactor can't be restarted in this process")
+                worker = cls(settings)
+                worker._thread.start()
+                cls._instance = worker
+                logger.info("Crawl worker reactor started")
+            return cls._instance
+
+    @classmethod
+    def get_instance(cls) -> Optional["CrawlWorker"]:
+        return cls._instance
+
+    @classmethod
+    def is_running(cls) -> bool:
+        return cls._instance is not None and cls._instance._thread.is_alive()
+
+    @classmethod
+    def stop(cls, timeout: float = 60) -> None:
+        """Wait for running crawls to finish and stop the reactor."""
+        with cls._lock:
+            worker, cls._instance = cls._instance, None
+            cls._stopped = cls._stopped or worker is not None
+        if worker is None or not worker._thread.is_alive():
+            return
+
+        try:
+            blockingCallFromThread(worker.reactor, worker.runner.join)
+        finally:
+            worker.reactor.callFromThread(worker.reactor.stop)
+            worker._thread.join(timeout=timeout)
+            logger.info("Crawl worker reactor stopped")
+
+    def crawl(self, spider_cls, **kwargs) -> CrawlResult:
+        """
+        Schedule a spider on the reactor thread and block the calling thread until it finishes.
+
+        Must not be called from the reactor thread itself.
+        """
+        return blockingCallFromThread(self.reactor, self.schedule, spider_cls, **kwargs)
+
+    def schedule(self, spider_cls, **kwargs) -> Deferred:
+        """
+        Schedule a spider run. Must be called on the reactor thread.
+
+        Returns a deferred that fires with the CrawlResult of this run.
+        """
+        crawler = self.runner.create_crawler(spider_cls)
+        result = CrawlResult()
+
+        def handle_spider_opened(spider):
+            result.spider = spider
+
+        def handle_spider_error(failure: Failure, response, spider):
+            result.error = failure.value
+            logger.error(
+                "Spider error occurred",
+                extra={"exception": repr(result.error), "url": getattr(response, "url", None)},
+            )
+
+        # handlers outlive this call, so they must not be connected as weak references
+        crawler.signals.connect(handle_spider_opened, signal=signals.spider_opened, weak=False)
+        crawler.signals.connect(handle_spider_error, signal=signals.spider_error, weak=False)
+
+        def handle_finished(_) -> CrawlResult:
+            result.custom_status = crawler.stats.get_value("custom_status") or {}
+            return result
+
+        def handle_failure(failure: Failure) -> CrawlResult:
+            logger.error("Spider crawl failed", extra={"exception": repr(failure.value)})
+            result.error = failure.value
+            return result
+
+        deferred = self.runner.crawl(crawler, **kwargs)
+        deferred.addCallbacks(handle_finished, handle_failure)
+        return deferred
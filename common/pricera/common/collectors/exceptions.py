@@ -4,3 +4,7 @@ class MessageFileNotFoundError(Exception):
 
 class MessageFileFormatError(Exception):
     ...
+
+
+class MessageFormatError(Exception):
+    ...
@@ -0,0 +1,85 @@
+__all__ = ["ParseExecutor"]
+
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, ClassVar, Optional
+
+from pricera.common.logger import set_logger
+
+logger = logging.getLogger("parse_executor")
+
+
+class ParseExecutor:
+    """
+    Process-wide executor splitting parsing work by its bottleneck:
+    S3 fetches and Mongo writes run on an I/O thread pool, while the CPU-bound
+    `*.parsers.*.parse` calls run on a process pool, so a parser worker uses several cores.
+
+    Functions submitted to the process pool and their arguments must be picklable,
+    module-level functions and classmethods of module-level classes are.
+
+    Usage:
+        executor = ParseExecutor.start(parse_workers=4, io_workers=16)
+        future = executor.submit_parse(RozetkaProductParser.parse_file, line)
+        ParseExecutor.stop()
+    """
+
+    DEFAULT_IO_WORKERS: ClassVar[int] = 16
+    _instance: ClassVar[Optional["ParseExecutor"]] = None
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+
+    def __init__(self, parse_workers: Optional[int] = None, io_workers: Optional[int] = None):
+        self.parse_workers: int = parse_workers or os.cpu_count() or 1
+        self.io_workers: int = io_workers or self.DEFAULT_IO_WORKERS
+        self.io_pool = ThreadPoolExecutor(max_workers=self.io_workers, thread_name_prefix="parse_io")
+        # forking a process that already runs I/O threads may copy held locks, so workers are started clean
+        self.process_pool = ProcessPoolExecutor(
+            max_workers=self.parse_workers,
+            mp_context=multiprocessing.get_context(self.get_start_method()),
+            initializer=set_logger,
+        )
+
+    @staticmethod
+    def get_start_method() -> str:
+        return "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+    @classmethod
+    def start(cls, parse_workers: Optional[int] = None, io_workers: Optional[int] = None) -> "ParseExecutor":
+        """Start the process-wide executor (idempotent) and return it."""
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = cls(parse_workers=parse_workers, io_workers=io_workers)
+                logger.info(
+                    f"Parse executor started with {cls._instance.parse_workers} parse workers "
+                    f"and {cls._instance.io_workers} I/O workers"
+                )
+            return cls._instance
+
+    @classmethod
+    def get_instance(cls) -> Optional["ParseExecutor"]:
+        return cls._instance
+
+    @classmethod
+    def is_running(cls) -> bool:
+        return cls._instance is not None
+
+    @classmethod
+    def stop(cls) -> None:
+        """Wait for the submitted work to finish and shut both pools down."""
+        with cls._lock:
+            executor, cls._instance = cls._instance, None
+        if executor is None:
+            return
+
+        executor.io_pool.shutdown(wait=True)
+        executor.process_pool.shutdown(wait=True)
+        logger.info("Parse executor stopped")
+
+    def submit_io(self, function: Callable, *args, **kwargs) -> Future:
+        return self.io_pool.submit(function, *args, **kwargs)
+
+    def submit_parse(self, function: Callable, *args, **kwargs) -> Future:
+        return self.process_pool.submit(function, *args, **kwargs)
@@ -0,0 +1,170 @@
+__all__ = ["BatchPublisher", "PublishResult", "build_messages"]
+
+import json
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, Optional
+
+from pika import BasicProperties, ConnectionParameters, SelectConnection
+from pika.spec import Basic
+
+from pricera.common.utilities import iter_chunks
+
+logger = logging.getLogger("batch_publisher")
+
+PERSISTENT_DELIVERY_MODE = 2
+
+
+@dataclass
+class PublishResult:
+    published: int = 0
+    failed: int = 0
+    # the messages nacked for good, so the caller can tell which ones were published
+    failed_messages: list[dict] = field(default_factory=list)
+
+
+def build_messages(urls: Iterable[str], payload_key: str, urls_per_message: int) -> Iterator[dict]:
+    """Lazily chunk a stream of urls into crawl messages of `urls_per_message` urls each."""
+    for chunk in iter_chunks(urls, urls_per_message):
+        yield {"payload": {payload_key: chunk}}
+
+
+class BatchPublisher:
+    """
+    Bulk publisher with publisher confirms on an asynchronous SelectConnection.
+
+    The queue is declared once, then messages are streamed from the iterable while at most
+    `confirm_window` of them wait for a broker confirmation. Confirmations (including the
+    `multiple` ones) free the window, nacked messages are republished up to
+    `max_publish_attempts` times before being counted as failed.
+
+    Usage:
+        result = BatchPublisher(RabbitMQ().get_connection_parameters(), queue="crawler_queue").publish(messages)
+    """
+
+    DEFAULT_CONFIRM_WINDOW = 1000
+    DEFAULT_MAX_PUBLISH_ATTEMPTS = 3
+
+    def __init__(
+        self,
+        connection_parameters: ConnectionParameters,
+        queue: str,
+        confirm_window: int = DEFAULT_CONFIRM_WINDOW,
+        max_publish_attempts: int = DEFAULT_MAX_PUBLISH_ATTEMPTS,
+        durable: bool = True,
+    ):
+        if confirm_window < 1:
+            raise ValueError(f"Confirm window must be positive, got {confirm_window}")
+
+        self.connection_parameters = connection_parameters
+        self.queue = queue
+        self.confirm_window = confirm_window
+        self.max_publish_attempts = max_publish_attempts
+        self.durable = durable
+        self.properties = BasicProperties(content_type="application/json", delivery_mode=PERSISTENT_DELIVERY_MODE)
+
+        self._reset()
+
+    def _reset(self) -> None:
+        self.connection: Optional[SelectConnection] = None
+        self.channel = None
+        self.error: Optional[BaseException] = None
+        self.result = PublishResult()
+        self._messages: Iterator[bytes] = iter(())
+        self._exhausted = False
+        self._delivery_tag = 0
+        # delivery tag -> (body, attempt number) of the messages waiting for a confirmation
+        self._outstanding: dict[int, tuple[bytes, int]] = {}
+        self._retries: deque[tuple[bytes, int]] = deque()
+
+    def publish(self, messages: Iterable[dict]) -> PublishResult:
+        """
+        Publish every message and block until all of them are confirmed, nacked for good or the connection fails.
+        Every call opens its own connection, so one publisher can be reused.
+        """
+        self._reset()
+        self._messages = (json.dumps(message).encode("utf-8") for message in messages)
+        self.connection = SelectConnection(
+            parameters=self.connection_parameters,
+            on_open_callback=self._on_connection_open,
+            on_open_error_callback=self._on_connection_error,
+            on_close_callback=self._on_connection_closed,
+        )
+        self.connection.ioloop.start()
+
+        if self.error is not None:
+            raise ConnectionError(f"Publishing to {self.queue} failed: {self.error}") from self.error
+
+        logger.info(f"Published {self.result.published} messages to {self.queue}, {self.result.failed} failed")
+        return self.result
+
+    def _on_connection_open(self, connection) -> None:
+        connection.channel(on_open_callback=self._on_channel_open)
+
+    def _on_connection_error(self, connection, error) -> None:
+        self.error = error
+        connection.ioloop.stop()
+
+    def _on_connection_closed(self, connection, reason) -> None:
+        connection.ioloop.stop()
+
+    def _on_channel_open(self, channel) -> None:
+        self.channel = channel
+        channel.add_on_close_callback(self._on_channel_closed)
+        channel.confirm_delivery(ack_nack_callback=self._on_delivery_confirmation)
+        channel.queue_declare(queue=self.queue, durable=self.durable, callback=self._on_queue_declared)
+
+    def _on_channel_closed(self, channel, reason) -> None:
+        if not self._is_done():
+            self.error = reason
+        if self.connection.is_open:
+            self.connection.close()
+
+    def _on_queue_declared(self, method_frame) -> None:
+        self._publish_next()
+
+    def _publish_next(self) -> None:
+        """Fill the confirm window with retried messages first, then with new ones."""
+        while len(self._outstanding) < self.confirm_window:
+            if self._retries:
+                body, attempt = self._retries.popleft()
+            else:
+                body = next(self._messages, None)
+                if body is None:
+                    self._exhausted = True
+                    break
+                attempt = 1
+
+            self.channel.basic_publish(exchange="", routing_key=self.queue, body=body, properties=self.properties)
+            self._delivery_tag += 1
+            self._outstanding[self._delivery_tag] = (body, attempt)
+
+        if self._is_done() and self.channel.is_open:
+            self.channel.close()
+
+    def _on_delivery_confirmation(self, method_frame) -> None:
+        method = method_frame.method
+        if method.multiple:
+            delivery_tags = [tag for tag in self._outstanding if tag <= method.delivery_tag]
+        else:
+            delivery_tags = [method.delivery_tag]
+
+        for delivery_tag in delivery_tags:
+            if delivery_tag not in self._outstanding:
+                continue
+
+            body, attempt = self._outstanding.pop(delivery_tag)
+            if isinstance(method, Basic.Ack):
+                self.result.published += 1
+            elif attempt < self.max_publish_attempts:
+                self._retries.append((body, attempt + 1))
+            else:
+                self.result.failed += 1
+                self.result.failed_messages.append(json.loads(body))
+                logger.error(f"Message was nacked {attempt} times, giving up", extra={"queue": self.queue})
+
+        self._publish_next()
+
+    def _is_done(self) -> bool:
+        return self._exhausted and not self._outstanding and not self._retries
@@ -0,0 +1,255 @@
+__all__ = ["RecrawlPolicy", "RequestBudget", "MongoRequestBudget", "RecrawlScheduler"]
+
+import hashlib
+import json
+import logging
+import math
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterable, Optional
+
+from pymongo import ASCENDING, MongoClient, UpdateOne
+from pymongo.collection import Collection
+from pymongo.errors import DuplicateKeyError
+
+from pricera.common.collectors.publisher import PublishResult, build_messages
+
+logger = logging.getLogger("recrawl_scheduler")
+
+
+@dataclass
+class RecrawlPolicy:
+    """
+    Multiplicative recrawl interval: it grows while the tracked fields of a product stay the same
+    and shrinks when they change, bounded by the minimum and maximum intervals.
+    """
+
+    initial_interval: timedelta = timedelta(days=1)
+    min_interval: timedelta = timedelta(hours=1)
+    max_interval: timedelta = timedelta(days=30)
+    increase_factor: float = 1.5
+    decrease_factor: float = 0.5
+
+    def get_next_interval(self, interval_seconds: Optional[float], changed: Optional[bool]) -> float:
+        """Next interval in seconds, `changed` is None when the last crawl gave nothing to compare."""
+        interval = interval_seconds or self.initial_interval.total_seconds()
+        if changed is True:
+            interval *= self.decrease_factor
+        elif changed is False:
+            interval *= self.increase_factor
+        return min(max(interval, self.min_interval.total_seconds()), self.max_interval.total_seconds())
+
+
+class RequestBudget:
+    """Token bucket of crawl requests refilled at `requests_per_hour`, holding at most `burst_seconds` of them."""
+
+    def __init__(
+        self, requests_per_hour: float, burst_seconds: float = 60, clock: Callable[[], float] = time.monotonic
+    ):
+        if requests_per_hour <= 0:
+            raise ValueError(f"Requests per hour must be positive, got {requests_per_hour}")
+
+        self.rate = requests_per_hour / 3600
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated_at = clock()
+
+    def get_available(self) -> int:
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        return int(self.tokens)
+
+    def take(self, requests: int) -> None:
+        self.tokens -= requests
+
+
+class MongoRequestBudget(RequestBudget):
+    """
+    Token bucket of crawl requests kept in a Mongo document, so it carries over between the runs
+    of a cron-scheduled scheduler and is shared by concurrent ones.
+
+    The document holds the `tokens` left at `updated_at`, a refill is written only if no other scheduler
+    changed the document since it was read, the requests taken are decremented atomically.
+    Concurrent schedulers may overspend a refill together, the tokens go negative then and the debt
+    is paid back by the next refills, so the hourly rate holds on average.
+    """
+
+    MAX_REFILL_ATTEMPTS = 5
+
+    def __init__(
+        self,
+        collection: Collection,
+        requests_per_hour: float,
+        burst_seconds: float = 60,
+        name: str = "recrawl_request_budget",
+        clock: Callable[[], datetime] = lambda: datetime.now(timezone.utc),
+    ):
+        super().__init__(requests_per_hour=requests_per_hour, burst_seconds=burst_seconds)
+        self.collection = collection
+        self.name = name
+        self.clock = clock
+
+    def get_state(self) -> dict:
+        state = self.collection.find_one({"_id": self.name})
+        if state is not None:
+            return state
+
+        # the first run starts with a full bucket
+        try:
+            self.collection.update_one(
+                {"_id": self.name},
+                {"$setOnInsert": {"tokens": self.capacity, "updated_at": self.clock(), "version": 0}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            pass
+        return self.collection.find_one({"_id": self.name})
+
+    def get_available(self) -> int:
+        for _ in range(self.MAX_REFILL_ATTEMPTS):
+            state, now = self.get_state(), self.clock()
+            updated_at = state["updated_at"]
+            if updated_at.tzinfo is None:
+                updated_at = updated_at.replace(tzinfo=timezone.utc)
+
+            elapsed = max(0.0, (now - updated_at).total_seconds())
+            tokens = min(self.capacity, state["tokens"] + elapsed * self.rate)
+            result = self.collection.update_one(
+                {"_id": self.name, "version": state["version"]},
+                {"$set": {"tokens": tokens, "updated_at": now}, "$inc": {"version": 1}},
+            )
+            if result.modified_count:
+                return max(0, int(tokens))
+
+        logger.warning("Request budget kept changing under concurrent schedulers, skipping this run")
+        return 0
+
+    def take(self, requests: int) -> None:
+        self.collection.update_one({"_id": self.name}, {"$inc": {"tokens": -requests, "version": 1}})
+
+
+@dataclass
+class RecrawlScheduler:
+    """
+    Publishes the urls of the products due for a recrawl and learns a recrawl interval per product.
+
+    Every collector with `tracked_fields` is scheduled from its collection: products never scheduled
+    or whose `next_crawl_at` passed are published to the crawler queue, most overdue first, within the
+    request budget shared by all collectors. When a product comes due again, the tracked fields are compared
+    with their snapshot taken at the previous scheduling to tell whether the product changed in between,
+    which feeds the RecrawlPolicy. A failed crawl or a product not crawled since gives no observation.
+
+    Usage:
+        scheduler = RecrawlScheduler(mongo_client, [RozetkaProductCrawler], publish=publisher.publish, budget=budget)
+        scheduler.run_once()
+    """
+
+    mongo_client: MongoClient
+    collector_classes: Iterable[type]
+    publish: Callable[[Iterable[dict]], PublishResult]
+    budget: RequestBudget
+    policy: RecrawlPolicy = field(default_factory=RecrawlPolicy)
+    urls_per_message: int = 100
+
+    def run_once(self, now: Optional[datetime] = None) -> int:
+        """Publish the due urls of every collector the budget allows and return their number."""
+        now = now or datetime.now(timezone.utc)
+        published = 0
+        for collector_cls in self.collector_classes:
+            if getattr(collector_cls, "tracked_fields", None):
+                published += self.schedule_collector(collector_cls, now=now)
+        return published
+
+    def schedule_collector(self, collector_cls: type, now: datetime) -> int:
+        ids_per_request = getattr(collector_cls, "ids_per_request", 1)
+        max_urls = self.budget.get_available() * ids_per_request
+        if not max_urls:
+            logger.info(f"Request budget is exhausted, {collector_cls.payload_key} is not scheduled")
+            return 0
+
+        fields = self.get_schedule_fields(collector_cls)
+        collection = self.mongo_client[collector_cls.db_name][collector_cls.collection_name]
+        documents = list(
+            collection.find(
+                filter={
+                    fields["crawl_status"]: {"$ne": "invalid"},
+                    "$or": [{fields["next_crawl_at"]: {"$lte": now}}, {fields["next_crawl_at"]: None}],
+                },
+                projection=["_id", collector_cls.db_url_field, f"pricera.{collector_cls.collector_name}"]
+                + list(collector_cls.tracked_fields),
+                sort=[(fields["next_crawl_at"], ASCENDING)],
+                limit=max_urls,
+            )
+        )
+        if not documents:
+            return 0
+
+        urls = [document[collector_cls.db_url_field] for document in documents]
+        result = self.publish(build_messages(urls, collector_cls.payload_key, urls_per_message=self.urls_per_message))
+        if result.failed:
+            # the schedule of the failed urls is left as is, so they are published again on the next run
+            logger.error(f"{result.failed} messages of {collector_cls.payload_key} could not be published")
+            failed_urls = {
+                url for message in result.failed_messages for url in message["payload"][collector_cls.payload_key]
+            }
+            documents = [document for document in documents if document[collector_cls.db_url_field] not in failed_urls]
+        if not documents:
+            return 0
+
+        self.budget.take(math.ceil(len(documents) / ids_per_request))
+        collection.bulk_write(
+            [
+                UpdateOne(
+                    filter={"_id": document["_id"]},
+                    update={"$set": self.get_schedule_update(collector_cls, document, now)},
+                )
+                for document in documents
+            ],
+            ordered=False,
+        )
+        logger.info(f"Scheduled {len(documents)} {collector_cls.payload_key} urls for a recrawl")
+        return len(documents)
+
+    @staticmethod
+    def get_schedule_fields(collector_cls: type) -> dict[str, str]:
+        prefix = f"pricera.{collector_cls.collector_name}"
+        return {
+            name: f"{prefix}.{name}"
+            for name in ["crawl_status", "next_crawl_at", "recrawl_interval", "scheduled_at", "tracked_snapshot"]
+        }
+
+    @staticmethod
+    def get_tracked_snapshot(collector_cls: type, document: dict) -> str:
+        values = [document.get(tracked_field) for tracked_field in collector_cls.tracked_fields]
+        return hashlib.sha256(json.dumps(values, default=str, sort_keys=True).encode()).hexdigest()
+
+    @classmethod
+    def has_changed(cls, collector_cls: type, document: dict) -> Optional[bool]:
+        """Whether the tracked fields changed since the previous scheduling, None without a crawl to tell."""
+        state = document.get("pricera", {}).get(collector_cls.collector_name, {})
+        scheduled_at, crawled_at = state.get("scheduled_at"), state.get("crawled_at")
+        if scheduled_at is None or crawled_at is None or crawled_at < scheduled_at:
+            return None
+
+        crawl_status = state.get("crawl_status")
+        if crawl_status == "unchanged":
+            return False
+        if crawl_status != "success" or "tracked_snapshot" not in state:
+            return None
+        return cls.get_tracked_snapshot(collector_cls, document) != state["tracked_snapshot"]
+
+    def get_schedule_update(self, collector_cls: type, document: dict, now: datetime) -> dict:
+        state = document.get("pricera", {}).get(collector_cls.collector_name, {})
+        interval = self.policy.get_next_interval(
+            state.get("recrawl_interval"), self.has_changed(collector_cls, document)
+        )
+        fields = self.get_schedule_fields(collector_cls)
+        return {
+            fields["recrawl_interval"]: interval,
+            fields["next_crawl_at"]: now + timedelta(seconds=interval),
+            fields["scheduled_at"]: now,
+            fields["tracked_snapshot"]: self.get_tracked_snapshot(collector_cls, document),
+        }
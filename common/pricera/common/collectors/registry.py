@@ -0,0 +1,91 @@
+__all__ = ["CollectorRegistry"]
+
+import logging
+import threading
+from collections.abc import Mapping
+from importlib import import_module
+from importlib.metadata import entry_points
+from typing import Callable, Iterator, Optional
+
+logger = logging.getLogger("collector_registry")
+
+
+class CollectorRegistry(Mapping):
+    """
+    Read-only mapping of payload keys to collector classes, importing every collector on first use of its key.
+
+    Collectors are declared as `payload_key = "module:ClassName"` entry points of the `group`,
+    e.g. in the package's pyproject:
+
+        [tool.poetry.plugins."pricera.crawlers"]
+        rozetka_product = "pricera.rozetka.rozetka_product_crawler:RozetkaProductCrawler"
+
+    so adding a marketplace means installing its package. Declarations given as `specs` take precedence
+    over the entry points. A worker only imports the collectors, and their dependencies, of the payload keys
+    it receives, iterating over the values imports all of them.
+
+    Usage:
+        registry = CollectorRegistry("pricera.crawlers")
+        crawler_cls = registry.get("rozetka_product")
+    """
+
+    def __init__(self, group: str, specs: Optional[dict[str, str]] = None):
+        self.group = group
+        self._specs = specs or {}
+        self._declared: Optional[dict[str, str]] = None
+        self._loaded: dict[str, type] = {}
+        self._load_callbacks: list[Callable[[type], None]] = []
+        self._lock = threading.RLock()
+
+    def get_specs(self) -> dict[str, str]:
+        """Payload key -> `module:ClassName` of every declared collector, the entry points are read once."""
+        with self._lock:
+            if self._declared is None:
+                entry_point_specs = {
+                    entry_point.name: entry_point.value for entry_point in entry_points(group=self.group)
+                }
+                self._declared = entry_point_specs | self._specs
+                if not self._declared:
+                    logger.warning(
+                        f"No collectors are declared for {self.group}, is any marketplace package installed?"
+                    )
+            return self._declared
+
+    def __getitem__(self, payload_key: str) -> type:
+        loaded = self._loaded.get(payload_key)
+        if loaded is not None:
+            return loaded
+
+        with self._lock:
+            if payload_key not in self._loaded:
+                spec = self.get_specs()[payload_key]
+                collector_cls = self.load(spec)
+                # a collector serving several payload keys is announced once
+                if collector_cls not in self._loaded.values():
+                    for callback in self._load_callbacks:
+                        callback(collector_cls)
+                self._loaded[payload_key] = collector_cls
+                logger.debug(f"Loaded {spec} for {payload_key}")
+            return self._loaded[payload_key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.get_specs())
+
+    def __len__(self) -> int:
+        return len(self.get_specs())
+
+    @staticmethod
+    def load(spec: str) -> type:
+        module_name, _, attribute = spec.partition(":")
+        return getattr(import_module(module_name), attribute)
+
+    def add_load_callback(self, callback: Callable[[type], None]) -> None:
+        """Call `callback` with every collector class on its import, and with the ones imported already."""
+        with self._lock:
+            self._load_callbacks.append(callback)
+            for collector_cls in dict.fromkeys(self._loaded.values()):
+                callback(collector_cls)
+
+    def remove_load_callback(self, callback: Callable[[type], None]) -> None:
+        with self._lock:
+            self._load_callbacks.remove(callback)
@@ -0,0 +1,177 @@
+__all__ = [
+    "MetricsRegistry",
+    "start_metrics_server",
+    "stop_metrics_server",
+    "is_enabled",
+    "inc",
+    "observe",
+    "timer",
+]
+
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import ContextManager, Optional
+
+logger = logging.getLogger("metrics")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# name -> (type, help) of every metric, observing an undeclared one is a programming error
+METRICS = {
+    "pricera_messages_consumed_total": ("counter", "Messages processed by the pipelines"),
+    "pricera_urls_crawled_total": ("counter", "Urls handed to the crawlers"),
+    "pricera_responses_total": ("counter", "Crawl responses by status code"),
+    "pricera_s3_upload_seconds": ("histogram", "Duration of object store uploads"),
+    "pricera_s3_upload_bytes_total": ("counter", "Bytes uploaded to the object store"),
+    "pricera_s3_download_seconds": ("histogram", "Duration of object store downloads"),
+    "pricera_s3_download_bytes_total": ("counter", "Bytes downloaded from the object store, decompressed"),
+    "pricera_parse_seconds": ("histogram", "Duration of parsing one payload chunk"),
+    "pricera_mongo_bulk_write_seconds": ("histogram", "Duration of Mongo bulk writes"),
+}
+
+Labels = tuple[tuple[str, str], ...]
+
+
+class MetricsRegistry:
+    """Thread-safe counters and histograms rendered in the Prometheus text exposition format."""
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters: dict[tuple[str, Labels], float] = {}
+        # (name, labels) -> [count per bucket..., count of the +Inf bucket, sum]
+        self._histograms: dict[tuple[str, Labels], list[float]] = {}
+
+    @staticmethod
+    def get_key(name: str, labels: dict) -> tuple[str, Labels]:
+        if name not in METRICS:
+            raise KeyError(f"Unknown metric: {name}")
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def inc(self, name: str, amount: float = 1, **labels) -> None:
+        key = self.get_key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = self.get_key(name, labels)
+        bucket_index = bisect_left(self.buckets, value)
+        with self._lock:
+            histogram = self._histograms.setdefault(key, [0] * (len(self.buckets) + 2))
+            histogram[bucket_index] += 1
+            histogram[-1] += value
+
+    @staticmethod
+    def format_labels(labels: Labels, extra: Labels = ()) -> str:
+        labels = labels + extra
+        if not labels:
+            return ""
+        escaped = ((key, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for key, value in labels)
+        return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+    def render(self) -> str:
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: list(values) for key, values in self._histograms.items()}
+
+        lines = []
+        for name, (metric_type, help_text) in METRICS.items():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+            for (metric_name, labels), value in counters.items():
+                if metric_name == name:
+                    lines.append(f"{name}{self.format_labels(labels)} {value}")
+
+            for (metric_name, labels), values in histograms.items():
+                if metric_name != name:
+                    continue
+                cumulative = 0
+                for upper_bound, count in zip([*self.buckets, "+Inf"], values[:-1]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{self.format_labels(labels, (('le', str(upper_bound)),))} {cumulative}")
+                lines.append(f"{name}_sum{self.format_labels(labels)} {values[-1]}")
+                lines.append(f"{name}_count{self.format_labels(labels)} {cumulative}")
+
+        return "\n".join(lines) + "\n"
+
+
+class _Timer:
+    def __init__(self, registry: MetricsRegistry, name: str, labels: dict):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self) -> "_Timer":
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.registry.observe(self.name, time.perf_counter() - self.started_at, **self.labels)
+
+
+_registry: Optional[MetricsRegistry] = None
+_server: Optional[ThreadingHTTPServer] = None
+_NULL_TIMER = nullcontext()
+
+
+def is_enabled() -> bool:
+    return _registry is not None
+
+
+def inc(name: str, amount: float = 1, **labels) -> None:
+    if _registry is not None:
+        _registry.inc(name, amount, **labels)
+
+
+def observe(name: str, value: float, **labels) -> None:
+    if _registry is not None:
+        _registry.observe(name, value, **labels)
+
+
+def timer(name: str, **labels) -> ContextManager:
+    """Observe the duration of the block into a histogram, a shared no-op context manager when disabled."""
+    if _registry is None:
+        return _NULL_TIMER
+    return _Timer(_registry, name, labels)
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> MetricsRegistry:
+    """Enable the metrics and serve them on http://host:port/metrics from a daemon thread."""
+    global _registry, _server
+
+    registry = MetricsRegistry()
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args) -> None:
+            # scrapes every few seconds would flood the worker logs
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics_server", daemon=True).start()
+    _registry, _server = registry, server
+    logger.info(f"Serving metrics on http://{host}:{server.server_address[1]}/metrics")
+    return registry
+
+
+def stop_metrics_server() -> None:
+    global _registry, _server
+
+    server, _server, _registry = _server, None, None
+    if server is not None:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+__all__ = ["MongoWriteBuffer"]
+
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, ClassVar, Optional
+
+if TYPE_CHECKING:
+    from pymongo import UpdateOne
+    from pymongo.collection import Collection
+
+from pricera.common import metrics
+
+logger = logging.getLogger("mongo_write_buffer")
+
+
+@dataclass
+class PendingWrite:
+    collection: Collection
+    operations: list[UpdateOne]
+    future: Future = field(default_factory=Future)
+    submitted_at: float = field(default_factory=time.monotonic)
+
+
+class MongoWriteBuffer:
+    """
+    Process-wide write-behind buffer coalescing the bulk writes of concurrently processed messages.
+
+    Operations submitted by any collector are queued per collection and flushed by a background thread
+    as one unordered `bulk_write` when `max_batch_size` operations are pending or the oldest of them waited
+    `max_latency_ms`. Every submission gets a future resolved once its operations are flushed, `write` blocks
+    on it and raises the error of a failed flush, which fails every submission of that collection's batch.
+    The collectors let the error fail their message, so it is only acknowledged after its writes reached Mongo.
+    A failed message is requeued up to the `max_deliveries` of the consumer, the writes are upserts,
+    so the redelivered message redoes them.
+
+    Usage:
+        buffer = MongoWriteBuffer.start(max_batch_size=1000, max_latency_ms=200)
+        buffer.write(collection, bulk_requests)
+        MongoWriteBuffer.stop()
+    """
+
+    DEFAULT_MAX_BATCH_SIZE: ClassVar[int] = 1000
+    DEFAULT_MAX_LATENCY_MS: ClassVar[int] = 200
+    _instance: ClassVar[Optional["MongoWriteBuffer"]] = None
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+
+    def __init__(self, max_batch_size: int = DEFAULT_MAX_BATCH_SIZE, max_latency_ms: int = DEFAULT_MAX_LATENCY_MS):
+        if max_batch_size < 1 or max_latency_ms < 0:
+            raise ValueError(f"Invalid write buffer limits: {max_batch_size} operations, {max_latency_ms} ms")
+
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000
+        self._condition = threading.Condition()
+        self._pending: list[PendingWrite] = []
+        self._pending_operations = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="mongo_write_buffer", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def start(
+        cls, max_batch_size: int = DEFAULT_MAX_BATCH_SIZE, max_latency_ms: int = DEFAULT_MAX_LATENCY_MS
+    ) -> "MongoWriteBuffer":
+        """Start the process-wide buffer (idempotent) and return it."""
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = cls(max_batch_size=max_batch_size, max_latency_ms=max_latency_ms)
+                logger.info(
+                    f"Mongo write buffer started, flushing every {max_batch_size} operations or {max_latency_ms} ms"
+                )
+            return cls._instance
+
+    @classmethod
+    def get_instance(cls) -> Optional["MongoWriteBuffer"]:
+        return cls._instance
+
+    @classmethod
+    def is_running(cls) -> bool:
+        return cls._instance is not None
+
+    @classmethod
+    def stop(cls) -> None:
+        """Flush the pending operations and stop the flushing thread."""
+        with cls._lock:
+            buffer, cls._instance = cls._instance, None
+        if buffer is None:
+            return
+
+        buffer.close()
+        logger.info("Mongo write buffer stopped")
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+
+    def submit(self, collection: Collection, operations: list[UpdateOne]) -> Future:
+        """Queue the operations, the returned future is resolved once they are flushed."""
+        pending_write = PendingWrite(collection=collection, operations=list(operations))
+        if not pending_write.operations:
+            pending_write.future.set_result(None)
+            return pending_write.future
+
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Mongo write buffer is stopped")
+
+            self._pending.append(pending_write)
+            self._pending_operations += len(pending_write.operations)
+            if len(self._pending) == 1 or self._pending_operations >= self.max_batch_size:
+                # the thread sleeps without a deadline while nothing is pending
+                self._condition.notify()
+
+        return pending_write.future
+
+    def write(self, collection: Collection, operations: list[UpdateOne]) -> None:
+        """Queue the operations and block until they are flushed, raising the error of a failed flush."""
+        self.submit(collection, operations).result()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._should_flush():
+                    if self._closed and not self._pending:
+                        return
+                    self._condition.wait(timeout=self._get_wait_timeout())
+
+                pending, self._pending, self._pending_operations = self._pending, [], 0
+
+            self._flush(pending)
+
+    def _should_flush(self) -> bool:
+        if not self._pending:
+            return False
+        return (
+            self._closed
+            or self._pending_operations >= self.max_batch_size
+            or time.monotonic() - self._pending[0].submitted_at >= self.max_latency
+        )
+
+    def _get_wait_timeout(self) -> Optional[float]:
+        if not self._pending:
+            return None
+        return max(0.0, self._pending[0].submitted_at + self.max_latency - time.monotonic())
+
+    def _flush(self, pending: list[PendingWrite]) -> None:
+        collection_to_writes: dict[Collection, list[PendingWrite]] = {}
+        for pending_write in pending:
+            collection_to_writes.setdefault(pending_write.collection, []).append(pending_write)
+
+        for collection, pending_writes in collection_to_writes.items():
+            operations = [operation for pending_write in pending_writes for operation in pending_write.operations]
+            try:
+                with metrics.timer("pricera_mongo_bulk_write_seconds", collection=collection.name):
+                    collection.bulk_write(operations, ordered=False)
+            except Exception as e:
+                logger.error(f"Failed to flush {len(operations)} buffered operations", exc_info=e)
+                for pending_write in pending_writes:
+                    pending_write.future.set_exception(e)
+                continue
+
+            logger.debug(f"Flushed {len(operations)} operations of {len(pending_writes)} submissions")
+            for pending_write in pending_writes:
+                pending_write.future.set_result(None)
@@ -1,13 +1,17 @@
 from __future__ import annotations
 
+import logging
 from contextlib import contextmanager
-from typing import Generator, Optional, Dict, Any
+from typing import Generator, Iterable, Optional, Dict, Any
 
-from pymongo import MongoClient
+from pymongo import IndexModel, MongoClient
 from pymongo.database import Database
+from pymongo.errors import PyMongoError
 
 from .utilities import get_env_value
 
+logger = logging.getLogger("mongodb")
+
 
 def _build_mongodb_uri(
     uri: Optional[str] = None,
@@ -150,7 +154,78 @@ def mongo_db(
             yield db
 
 
+def get_collection_indexes(collector_classes: Iterable[type]) -> Dict[tuple[str, str], list[IndexModel]]:
+    """
+    Indexes declared by the collectors in their `indexes` class attribute, keyed by collection name,
+    grouped by the (database, collection) they belong to. Collectors sharing a collection share its indexes,
+    an index declared twice under the same name is kept once.
+    """
+    collection_indexes: Dict[tuple[str, str], Dict[str, IndexModel]] = {}
+    for collector_cls in collector_classes:
+        for collection_name, indexes in (getattr(collector_cls, "indexes", None) or {}).items():
+            name_to_index = collection_indexes.setdefault((collector_cls.db_name, collection_name), {})
+            for index in indexes:
+                name_to_index.setdefault(index.document["name"], index)
+
+    return {key: list(name_to_index.values()) for key, name_to_index in collection_indexes.items()}
+
+
+def ensure_indexes(client: MongoClient, collector_classes: Iterable[type]) -> None:
+    """
+    Create the indexes declared by the collectors. Creating an existing index is a no-op,
+    so this runs on every worker startup. A failure (e.g. an index with the same name and other options,
+    or missing privileges) is logged and doesn't stop the worker, as a missing index only costs performance.
+    """
+    for (db_name, collection_name), indexes in get_collection_indexes(collector_classes).items():
+        try:
+            created = client[db_name][collection_name].create_indexes(indexes)
+            logger.info(f"Ensured indexes of {db_name}.{collection_name}: {', '.join(created)}")
+        except PyMongoError as e:
+            logger.error(f"Failed to ensure indexes of {db_name}.{collection_name}", exc_info=e)
+
+
+def iter_plan_stages(plan: Any) -> Generator[str, None, None]:
+    """Stage names of an explained query plan, whatever the nesting of the planner output."""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from iter_plan_stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from iter_plan_stages(value)
+
+
+def is_index_backed(explain_output: Dict[str, Any]) -> bool:
+    stages = set(iter_plan_stages(explain_output["queryPlanner"]["winningPlan"]))
+    return "COLLSCAN" not in stages
+
+
+def find_unindexed_queries(client: MongoClient, collector_classes: Iterable[type]) -> list[str]:
+    """
+    Explain the hot queries of the collectors declaring indexes and return the ones
+    whose winning plan scans the whole collection.
+    """
+    unindexed_queries = []
+    for collector_cls in collector_classes:
+        if not getattr(collector_cls, "indexes", None):
+            continue
+
+        collection = client[collector_cls.db_name][collector_cls.collection_name]
+        for query_name, query_filter in collector_cls.get_hot_queries().items():
+            label = f"{collector_cls.__name__} {query_name}"
+            if is_index_backed(collection.find(query_filter).explain()):
+                logger.info(f"{label}: index-backed")
+            else:
+                logger.error(f"{label}: collection scan of {collector_cls.db_name}.{collector_cls.collection_name}")
+                unindexed_queries.append(label)
+
+    return unindexed_queries
+
+
 __all__ = [
     "get_mongo_client",
     "mongo_db",
+    "ensure_indexes",
+    "find_unindexed_queries",
 ]
@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import logging
+import os
+import shutil
+import threading
+from abc import ABC, abstractmethod
+from contextlib import closing
+from typing import BinaryIO, ClassVar, Optional
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+from .utilities import get_env_value
+
+logger = logging.getLogger("object_store")
+
+
+class ObjectStore(ABC):
+    """
+    Storage of crawled chains addressed by bucket and key.
+
+    Every backend keeps the S3 key layout, so collectors and pipelines don't depend on where the data lives.
+    """
+
+    @abstractmethod
+    def open_object(self, bucket: str, key: str) -> BinaryIO:
+        """
+        Open the object as a binary stream supporting read(size), the caller is responsible for closing it.
+
+        Raises:
+            FileNotFoundError: If the object does not exist
+            IOError: If the object cannot be read
+        """
+
+    def get_object(self, bucket: str, key: str) -> bytes:
+        """Read the whole object, see open_object for the raised errors."""
+        with closing(self.open_object(bucket, key)) as stream:
+            return stream.read()
+
+    @abstractmethod
+    def upload_file(self, filename: str, bucket: str, key: str, content_type: Optional[str] = None) -> None:
+        """Upload a local file as the object."""
+
+    @abstractmethod
+    def upload_fileobj(self, fileobj: BinaryIO, bucket: str, key: str, content_type: Optional[str] = None) -> None:
+        """Upload the content of a binary file-like object as the object."""
+
+
+class S3ObjectStore(ObjectStore):
+    """
+    S3 backend sharing one client per process.
+
+    boto3 clients are thread-safe, but creating them is not and costs a credentials lookup,
+    so the client is created once under a lock and its connection pool is sized for the
+    upload/download thread pools.
+
+    Environment variables supported:
+      - AWS_ACCESS_KEY_ID
+      - AWS_SECRET_ACCESS_KEY
+      - AWS_REGION_NAME
+      - S3_MAX_POOL_CONNECTIONS (default: 50)
+    """
+
+    DEFAULT_MAX_POOL_CONNECTIONS: ClassVar[int] = 50
+    _client: ClassVar = None
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+
+    @classmethod
+    def get_client(cls):
+        if cls._client is None:
+            with cls._lock:
+                if cls._client is None:
+                    cls._client = cls._create_client()
+        return cls._client
+
+    @classmethod
+    def _create_client(cls):
+        max_pool_connections = int(get_env_value("S3_MAX_POOL_CONNECTIONS") or cls.DEFAULT_MAX_POOL_CONNECTIONS)
+        session = boto3.session.Session(
+            aws_access_key_id=get_env_value("AWS_ACCESS_KEY_ID"),
+            aws_secret_access_key=get_env_value("AWS_SECRET_ACCESS_KEY"),
+            region_name=get_env_value("AWS_REGION_NAME"),
+        )
+        return session.client("s3", config=Config(max_pool_connections=max_pool_connections))
+
+    def open_object(self, bucket: str, key: str) -> BinaryIO:
+        try:
+            response = self.get_client().get_object(Bucket=bucket, Key=key)
+            return response["Body"]
+        except ClientError as exception:
+            raise self._map_client_error(exception, bucket, key)
+
+    def upload_file(self, filename: str, bucket: str, key: str, content_type: Optional[str] = None) -> None:
+        self.get_client().upload_file(filename, bucket, key, ExtraArgs=self._get_extra_args(content_type))
+
+    def upload_fileobj(self, fileobj: BinaryIO, bucket: str, key: str, content_type: Optional[str] = None) -> None:
+        self.get_client().upload_fileobj(fileobj, bucket, key, ExtraArgs=self._get_extra_args(content_type))
+
+    @staticmethod
+    def _get_extra_args(content_type: Optional[str]) -> dict:
+        return {"ContentType": content_type} if content_type else {}
+
+    @staticmethod
+    def _map_client_error(exception: ClientError, bucket: str, key: str) -> Exception:
+        error_code = exception.response["Error"]["Code"]
+        if error_code == "NoSuchKey":
+            logger.error("File not found in S3", extra={"s3_bucket": bucket, "s3_key": key})
+            return FileNotFoundError(f"File not found in S3: s3://{bucket}/{key}")
+
+        logger.error(
+            "Error during loading file from s3", exc_info=exception, extra={"s3_bucket": bucket, "s3_key": key}
+        )
+        return IOError(f"S3 error loading file s3://{bucket}/{key}: {exception}")
+
+
+class LocalObjectStore(ObjectStore):
+    """Local directory backend, objects are stored as <root_dir>/<bucket>/<key>."""
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+
+    def get_path(self, bucket: str, key: str) -> str:
+        return os.path.join(self.root_dir, bucket, *key.split("/"))
+
+    def open_object(self, bucket: str, key: str) -> BinaryIO:
+        path = self.get_path(bucket, key)
+        try:
+            return open(path, "rb")
+        except FileNotFoundError:
+            logger.error("File not found in local object store", extra={"s3_bucket": bucket, "s3_key": key})
+            raise FileNotFoundError(f"File not found in local object store: {path}")
+
+    def upload_file(self, filename: str, bucket: str, key: str, content_type: Optional[str] = None) -> None:
+        path = self._prepare_path(bucket, key)
+        shutil.copyfile(filename, path)
+
+    def upload_fileobj(self, fileobj: BinaryIO, bucket: str, key: str, content_type: Optional[str] = None) -> None:
+        path = self._prepare_path(bucket, key)
+        with open(path, "wb") as file:
+            shutil.copyfileobj(fileobj, file)
+
+    def _prepare_path(self, bucket: str, key: str) -> str:
+        path = self.get_path(bucket, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+
+_object_store: Optional[ObjectStore] = None
+_object_store_lock = threading.Lock()
+
+
+def get_object_store() -> ObjectStore:
+    """
+    Return the process-wide object store.
+
+    Environment variables supported:
+      - PRICERA_OBJECT_STORE: "s3" (default) or "local"
+      - PRICERA_OBJECT_STORE_DIR: root directory of the local backend (default: ./object_store)
+    """
+    global _object_store
+
+    if _object_store is None:
+        with _object_store_lock:
+            if _object_store is None:
+                _object_store = _create_object_store()
+    return _object_store
+
+
+def set_object_store(object_store: Optional[ObjectStore]) -> None:
+    """Replace the process-wide object store, e.g. to run the pipeline against a local directory."""
+    global _object_store
+
+    with _object_store_lock:
+        _object_store = object_store
+
+
+def _create_object_store() -> ObjectStore:
+    backend = get_env_value("PRICERA_OBJECT_STORE") or "s3"
+    if backend == "s3":
+        return S3ObjectStore()
+    if backend == "local":
+        return LocalObjectStore(root_dir=get_env_value("PRICERA_OBJECT_STORE_DIR") or "object_store")
+    raise ValueError(f"Unknown object store backend: {backend}")
+
+
+__all__ = [
+    "ObjectStore",
+    "S3ObjectStore",
+    "LocalObjectStore",
+    "get_object_store",
+    "set_object_store",
+]
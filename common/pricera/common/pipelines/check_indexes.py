@@ -0,0 +1,42 @@
+import argparse
+import logging
+import sys
+
+from pricera.common.logger import set_logger
+from pricera.common import get_mongo_client
+from pricera.common.mongodb import ensure_indexes, find_unindexed_queries
+from pricera.common.pipelines.collector_mapping import PAYLOAD_KEY_TO_CRAWLER, PAYLOAD_KEY_TO_PARSER
+
+logger = logging.getLogger("check_indexes")
+
+
+def get_collector_classes() -> list[type]:
+    return list(dict.fromkeys([*PAYLOAD_KEY_TO_CRAWLER.values(), *PAYLOAD_KEY_TO_PARSER.values()]))
+
+
+def get_check_indexes_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Explain the hot queries of the collectors and fail on collection scans"
+    )
+    parser.add_argument("--create", action="store_true", help="Create the declared indexes before checking")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = get_check_indexes_args()
+    collector_classes = get_collector_classes()
+
+    with get_mongo_client() as mongo_client:
+        if args.create:
+            ensure_indexes(mongo_client, collector_classes)
+        unindexed_queries = find_unindexed_queries(mongo_client, collector_classes)
+
+    if unindexed_queries:
+        logger.error(f"{len(unindexed_queries)} hot queries are not index-backed: {'; '.join(unindexed_queries)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    set_logger()
+    sys.exit(main())
@@ -1,16 +1,7 @@
-from pricera.rozetka import RozetkaProductCrawler, RozetkaProductParser
-from pricera.hotline.hotline_item_card_collector import HotlineItemCardCollector
-from pricera.rozetka.rozetka_product_parser import RozetkaProductParser
+from pricera.common.collectors.registry import CollectorRegistry
 
-DEFAULT_MAPPING = {
-    HotlineItemCardCollector.payload_key: HotlineItemCardCollector,
-}
+# collectors are declared by the marketplace packages as entry points, see CollectorRegistry,
+# and only imported once a message with their payload key arrives:
+PAYLOAD_KEY_TO_CRAWLER = CollectorRegistry("pricera.crawlers")
 
-# explicitly defined payload key to crawler mapping:
-PAYLOAD_KEY_TO_CRAWLER = DEFAULT_MAPPING | {
-    RozetkaProductCrawler.payload_key: RozetkaProductCrawler,
-}
-
-
-# explicitly defined payload key to parser mapping:
-PAYLOAD_KEY_TO_PARSER = DEFAULT_MAPPING | {RozetkaProductParser.payload_key: RozetkaProductParser}
+PAYLOAD_KEY_TO_PARSER = CollectorRegistry("pricera.parsers")
@@ -1,16 +1,31 @@
 from pricera.common.pipelines.collector_mapping import PAYLOAD_KEY_TO_CRAWLER
 from logging import getLogger
-from pricera.common.pipelines.utilities import prepare_message
-from pymongo import MongoClient
+from pricera.common import metrics
+from pricera.common.pipelines.utilities import prepare_message, process_prepared_messages
+from pricera.common.utilities import count_message_urls
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from pymongo import MongoClient
 
 logger = getLogger("crawler_pipeline")
 
 
-def crawler_pipeline(mongo_client: MongoClient, message: dict, trigger_to_cls_mapping=PAYLOAD_KEY_TO_CRAWLER) -> None:
-    for item in prepare_message(message=message, collector_mapping=trigger_to_cls_mapping):
-        if not item:
-            continue
-        crawler_cls, prepared_message = item
+def crawler_pipeline(
+    mongo_client: "MongoClient",
+    message: dict,
+    trigger_to_cls_mapping=PAYLOAD_KEY_TO_CRAWLER,
+    max_parallel_chunks: int = 1,
+) -> None:
+    def crawl_chunk(crawler_cls, prepared_message: dict) -> None:
+        metrics.inc("pricera_urls_crawled_total", count_message_urls(prepared_message), collector=crawler_cls.__name__)
         collector_cls_obj = crawler_cls.get_crawler(message=prepared_message, mongo_client=mongo_client)
         spider_cls_obj = collector_cls_obj.crawl()
         collector_cls_obj.update_crawl_status(spider_cls_obj)
+
+    metrics.inc("pricera_messages_consumed_total", pipeline="crawl")
+    process_prepared_messages(
+        prepare_message(message=message, collector_mapping=trigger_to_cls_mapping),
+        function=crawl_chunk,
+        max_parallel_chunks=max_parallel_chunks,
+    )
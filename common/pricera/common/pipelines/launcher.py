@@ -1,13 +1,23 @@
+from __future__ import annotations
+
 import argparse
 import logging
 from dataclasses import dataclass
-from typing import Callable
-
-from pymongo import MongoClient
+from functools import partial
+from typing import TYPE_CHECKING, Callable, Optional
 
+from pricera.common import metrics
 from pricera.common.logger import set_logger
-from pricera.common import FileBasedMessageConsumer, RabbitMQ, get_mongo_client
+from pricera.common.collectors.parse_executor import ParseExecutor
+from pricera.common.collectors.registry import CollectorRegistry
+from pricera.common.mongo_write_buffer import MongoWriteBuffer
 from pricera.common.pipelines import crawler_pipeline, parser_pipeline
+from pricera.common.pipelines.collector_mapping import PAYLOAD_KEY_TO_CRAWLER, PAYLOAD_KEY_TO_PARSER
+from pricera.common.profiling import PROFILE_DIR_ENV, PROFILE_EVERY_ENV, MessageProfiler
+from pricera.common.proxy_pool import PROXIES_FILE_ENV, ProxyConfig, set_proxy_config
+
+if TYPE_CHECKING:
+    from pymongo import MongoClient
 
 logger = logging.getLogger("launcher")
 
@@ -22,6 +32,11 @@ PIPELINE_TO_FUNCTION = {
     "parse": parser_pipeline,
 }
 
+PIPELINE_TO_COLLECTORS = {
+    "crawl": PAYLOAD_KEY_TO_CRAWLER,
+    "parse": PAYLOAD_KEY_TO_PARSER,
+}
+
 
 def get_launcher_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser()
@@ -35,6 +50,91 @@ def get_launcher_args() -> argparse.Namespace:
         required=True,
         help="Type of pipeline to run",
     )
+    parser.add_argument(
+        "--crawl_worker",
+        action="store_true",
+        help="Reuse one Twisted reactor for all crawl messages (always enabled in RabbitMQ crawl mode)",
+    )
+    parser.add_argument(
+        "--parallel_chunks",
+        type=int,
+        default=1,
+        help="Number of payload chunks of one message processed in parallel (crawls share the crawl worker)",
+    )
+    parser.add_argument(
+        "--prefetch_count",
+        type=int,
+        help=(
+            "Number of unacknowledged messages RabbitMQ delivers to this worker at once "
+            "(RabbitMQ only, default: 1, or --batch_urls per consumer worker with --batch_urls)"
+        ),
+    )
+    parser.add_argument(
+        "--consumer_workers",
+        type=int,
+        default=1,
+        help="Number of messages processed concurrently (RabbitMQ only)",
+    )
+    parser.add_argument(
+        "--max_deliveries",
+        type=int,
+        default=3,
+        help="Deliveries of a failing message before it is rejected instead of requeued (RabbitMQ only)",
+    )
+    parser.add_argument(
+        "--batch_urls",
+        type=int,
+        help="Merge queue messages into batches of up to this many urls for batch-capable collectors (RabbitMQ only)",
+    )
+    parser.add_argument(
+        "--batch_wait_ms",
+        type=int,
+        default=500,
+        help="Maximum time to wait for a batch to fill up, in milliseconds (used with --batch_urls)",
+    )
+    parser.add_argument(
+        "--parse_workers",
+        type=int,
+        default=0,
+        help="Run parsing on a pool of this many processes, with S3 and Mongo I/O on a thread pool (parse only)",
+    )
+    parser.add_argument(
+        "--io_workers",
+        type=int,
+        help=f"Size of the I/O thread pool used with --parse_workers (default: {ParseExecutor.DEFAULT_IO_WORKERS})",
+    )
+    parser.add_argument(
+        "--write_buffer_size",
+        type=int,
+        default=0,
+        help="Coalesce the Mongo writes of concurrent messages, flushing every this many operations (0 disables)",
+    )
+    parser.add_argument(
+        "--write_buffer_ms",
+        type=int,
+        default=MongoWriteBuffer.DEFAULT_MAX_LATENCY_MS,
+        help="Maximum time a buffered Mongo write waits for a flush, in milliseconds (used with --write_buffer_size)",
+    )
+    parser.add_argument(
+        "--metrics_port",
+        type=int,
+        help="Serve Prometheus metrics on http://127.0.0.1:<port>/metrics (disabled by default)",
+    )
+    parser.add_argument(
+        "--profile_every",
+        type=int,
+        help=f"Profile every N-th message with cProfile and tracemalloc (default: ${PROFILE_EVERY_ENV}, disabled)",
+    )
+    parser.add_argument(
+        "--profile_dir",
+        type=str,
+        help=f"Directory of the profiling reports (default: ${PROFILE_DIR_ENV} or ./profiles)",
+    )
+    parser.add_argument(
+        "--proxies_file",
+        type=str,
+        help=f"File with one proxy url per line the crawls go through (default: ${PROXIES_FILE_ENV}, no proxies)",
+    )
     args = parser.parse_args()
     validate_args(args)
     return args
@@ -49,37 +149,151 @@ def validate_args(args: argparse.Namespace) -> None:
         logger.error("You must specify either --file or --rabbitmq.")
         exit(1)
 
+    if (
+        args.parse_workers < 0
+        or args.write_buffer_size < 0
+        or args.write_buffer_ms < 0
+        or (args.prefetch_count is not None and args.prefetch_count < 1)
+        or args.consumer_workers < 1
+        or args.max_deliveries < 1
+        or args.parallel_chunks < 1
+        or args.batch_wait_ms < 1
+        or (args.batch_urls is not None and args.batch_urls < 1)
+        or (args.io_workers is not None and args.io_workers < 1)
+        or (args.profile_every is not None and args.profile_every < 1)
+    ):
+        logger.error("Worker counts, prefetch and batch limits must be positive.")
+        exit(1)
+
+    # a batch can't hold more messages than the unacknowledged deliveries, a message carries at least one url
+    if args.prefetch_count is None:
+        args.prefetch_count = args.batch_urls * args.consumer_workers if args.batch_urls else 1
+    elif args.batch_urls and args.prefetch_count < args.batch_urls:
+        logger.error("--prefetch_count must be at least --batch_urls, a batch can't hold more messages than that.")
+        exit(1)
+
+    if args.parse_workers and args.pipeline_type != "parse":
+        logger.error("--parse_workers can only be used with the parse pipeline.")
+        exit(1)
+
+    if args.proxies_file and args.pipeline_type != "crawl":
+        logger.error("--proxies_file can only be used with the crawl pipeline.")
+        exit(1)
+
 
 @dataclass
 class MessageProcessor:
     pipeline: Callable
     mongo_client: MongoClient
+    max_parallel_chunks: int = 1
+    profiler: Optional[MessageProfiler] = None
 
     def process(self, message: dict) -> None:
-        self.pipeline(message=message, mongo_client=self.mongo_client)
+        if self.profiler is not None:
+            self.profiler.process(self.run_pipeline, message)
+        else:
+            self.run_pipeline(message)
+
+    def run_pipeline(self, message: dict) -> None:
+        self.pipeline(message=message, mongo_client=self.mongo_client, max_parallel_chunks=self.max_parallel_chunks)
+
+
+def should_start_crawl_worker(args: argparse.Namespace) -> bool:
+    # the reactor cannot be restarted, so a queue worker must keep a single one alive between messages
+    # parallel chunks run their spiders concurrently, which only the worker's reactor allows
+    return args.pipeline_type == "crawl" and (args.crawl_worker or args.rabbitmq or args.parallel_chunks > 1)
 
 
 def main() -> None:
     args = get_launcher_args()
 
     pipeline = PIPELINE_TO_FUNCTION[args.pipeline_type]
-    with get_mongo_client() as mongo_client:
-        processor = MessageProcessor(pipeline=pipeline, mongo_client=mongo_client)
+    if args.metrics_port is not None:
+        metrics.start_metrics_server(port=args.metrics_port)
+    if args.proxies_file:
+        set_proxy_config(ProxyConfig.from_env(proxies_file=args.proxies_file))
+    crawl_worker_cls = None
+    if should_start_crawl_worker(args):
+        # imported on demand, so the parse workers don't load Scrapy and Twisted
+        from pricera.common.collectors.crawl_worker import CrawlWorker
+
+        crawl_worker_cls = CrawlWorker
+        crawl_worker_cls.start()
+    if args.parse_workers:
+        ParseExecutor.start(parse_workers=args.parse_workers, io_workers=args.io_workers)
+    if args.write_buffer_size:
+        MongoWriteBuffer.start(max_batch_size=args.write_buffer_size, max_latency_ms=args.write_buffer_ms)
 
-        if args.file:
-            logger.info(f"Starting file consumer for file: {args.file}")
-            consumer = FileBasedMessageConsumer(
-                function=processor.process,
-                file_path=args.file,
+    try:
+        run_consumer(args=args, pipeline=pipeline)
+    finally:
+        if crawl_worker_cls is not None:
+            crawl_worker_cls.stop()
+        ParseExecutor.stop()
+        metrics.stop_metrics_server()
+
+
+def run_consumer(args: argparse.Namespace, pipeline: Callable) -> None:
+    # imported once the arguments are valid, so a wrong invocation fails without loading pika and pymongo
+    from pricera.common.collectors.consumers import FileBasedMessageConsumer, RabbitMQ
+    from pricera.common.mongodb import get_mongo_client
+
+    collector_registry = PIPELINE_TO_COLLECTORS[args.pipeline_type]
+    with get_mongo_client() as mongo_client:
+        # collectors are imported on their first message, their indexes are ensured then
+        ensure_collector_indexes = partial(ensure_indexes_of_collector, mongo_client)
+        collector_registry.add_load_callback(ensure_collector_indexes)
+        try:
+            processor = MessageProcessor(
+                pipeline=pipeline,
+                mongo_client=mongo_client,
+                max_parallel_chunks=args.parallel_chunks,
+                profiler=MessageProfiler.from_env(sample_every=args.profile_every, output_dir=args.profile_dir),
             )
-            consumer.consume()
 
-        else:
-            queue = PIPELINE_TO_QUEUE[args.pipeline_type]
-            logger.info(f"Starting RabbitMQ consumer on queue: {queue}")
+            if args.file:
+                logger.info(f"Starting file consumer for file: {args.file}")
+                consumer = FileBasedMessageConsumer(
+                    function=processor.process,
+                    file_path=args.file,
+                )
+                consumer.consume()
+
+            else:
+                queue = PIPELINE_TO_QUEUE[args.pipeline_type]
+                logger.info(f"Starting RabbitMQ consumer on queue: {queue}")
+
+                consumer = RabbitMQ(
+                    prefetch_count=args.prefetch_count,
+                    max_workers=args.consumer_workers,
+                    max_deliveries=args.max_deliveries,
+                )
+                with consumer:
+                    if args.batch_urls:
+                        consumer.consume_batches(
+                            queue=queue,
+                            function=processor.process,
+                            can_batch=partial(is_batch_payload_key, collector_registry),
+                            max_batch_urls=args.batch_urls,
+                            max_wait_ms=args.batch_wait_ms,
+                        )
+                    else:
+                        consumer.consume(function=processor.process, queue=queue)
+        finally:
+            # buffered writes need the client, so they are flushed before it is closed
+            MongoWriteBuffer.stop()
+            collector_registry.remove_load_callback(ensure_collector_indexes)
+
+
+def is_batch_payload_key(collector_registry: CollectorRegistry, payload_key: str) -> bool:
+    # only batch collectors take the urls of several messages at once
+    return payload_key in collector_registry and not collector_registry[payload_key].is_synchronous
+
+
+def ensure_indexes_of_collector(mongo_client: MongoClient, collector_cls: type) -> None:
+    from pricera.common.mongodb import ensure_indexes
 
-            consumer = RabbitMQ()
-            consumer.consume(function=processor.process, queue=queue)
+    ensure_indexes(mongo_client, [collector_cls])
 
 
 if __name__ == "__main__":
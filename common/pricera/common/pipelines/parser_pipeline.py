@@ -1,15 +1,29 @@
 from pricera.common.pipelines.collector_mapping import PAYLOAD_KEY_TO_PARSER
 from logging import getLogger
-from pricera.common.pipelines.utilities import prepare_message
-from pymongo import MongoClient
+from pricera.common import metrics
+from pricera.common.pipelines.utilities import prepare_message, process_prepared_messages
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from pymongo import MongoClient
 
 logger = getLogger("parser_pipeline")
 
 
-def parser_pipeline(mongo_client: MongoClient, message: dict, trigger_to_cls_mapping=PAYLOAD_KEY_TO_PARSER) -> None:
-    for item in prepare_message(message=message, collector_mapping=trigger_to_cls_mapping):
-        if not item:
-            continue
-        parser_cls, prepared_message = item
+def parser_pipeline(
+    mongo_client: "MongoClient",
+    message: dict,
+    trigger_to_cls_mapping=PAYLOAD_KEY_TO_PARSER,
+    max_parallel_chunks: int = 1,
+) -> None:
+    def parse_chunk(parser_cls, prepared_message: dict) -> None:
         parser_cls_obj = parser_cls.get_parser(message=prepared_message, mongo_client=mongo_client)
-        parser_cls_obj.parse()
+        with metrics.timer("pricera_parse_seconds", collector=parser_cls.__name__):
+            parser_cls_obj.parse()
+
+    metrics.inc("pricera_messages_consumed_total", pipeline="parse")
+    process_prepared_messages(
+        prepare_message(message=message, collector_mapping=trigger_to_cls_mapping),
+        function=parse_chunk,
+        max_parallel_chunks=max_parallel_chunks,
+    )
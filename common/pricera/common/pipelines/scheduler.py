@@ -0,0 +1,84 @@
+import argparse
+import logging
+import time
+from datetime import timedelta
+
+from pricera.common.logger import set_logger
+from pricera.common import RabbitMQ, get_mongo_client
+from pricera.common.collectors import BaseCollector, BatchPublisher, RecrawlScheduler
+from pricera.common.collectors.recrawl_scheduler import MongoRequestBudget, RecrawlPolicy
+from pricera.common.pipelines.collector_mapping import PAYLOAD_KEY_TO_CRAWLER
+
+logger = logging.getLogger("scheduler")
+
+DEFAULT_QUEUE = "crawler_queue"
+SCHEDULER_STATE_COLLECTION = "recrawl_scheduler_state"
+
+
+def get_scheduler_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Publish the products due for a recrawl within a request budget")
+
+    parser.add_argument("--requests_per_hour", type=float, required=True, help="Global crawl request budget")
+    parser.add_argument(
+        "--tick_s",
+        type=float,
+        default=60,
+        help="Seconds between two scheduling runs, with --once the period the runs are scheduled with",
+    )
+    parser.add_argument("--once", action="store_true", help="Run the scheduling once and exit")
+    parser.add_argument("--queue", type=str, default=DEFAULT_QUEUE, help="Queue to publish to")
+    parser.add_argument("--urls_per_message", type=int, default=100, help="Number of urls in one message")
+    parser.add_argument("--initial_interval_h", type=float, default=24, help="Recrawl interval of new products")
+    parser.add_argument("--min_interval_h", type=float, default=1, help="Shortest recrawl interval")
+    parser.add_argument("--max_interval_h", type=float, default=24 * 30, help="Longest recrawl interval")
+    args = parser.parse_args()
+    validate_args(args)
+    return args
+
+
+def validate_args(args: argparse.Namespace) -> None:
+    if args.requests_per_hour <= 0 or args.tick_s <= 0 or args.urls_per_message < 1:
+        logger.error("--requests_per_hour, --tick_s and --urls_per_message must be positive.")
+        exit(1)
+
+    if not 0 < args.min_interval_h <= args.initial_interval_h <= args.max_interval_h:
+        logger.error("Recrawl intervals must satisfy 0 < min <= initial <= max.")
+        exit(1)
+
+
+def main() -> None:
+    args = get_scheduler_args()
+    publisher = BatchPublisher(connection_parameters=RabbitMQ().get_connection_parameters(), queue=args.queue)
+    policy = RecrawlPolicy(
+        initial_interval=timedelta(hours=args.initial_interval_h),
+        min_interval=timedelta(hours=args.min_interval_h),
+        max_interval=timedelta(hours=args.max_interval_h),
+    )
+
+    with get_mongo_client() as mongo_client:
+        # the budget is kept in Mongo, so cron runs with --once and concurrent schedulers share the hourly rate
+        budget = MongoRequestBudget(
+            collection=mongo_client[BaseCollector.db_name][SCHEDULER_STATE_COLLECTION],
+            requests_per_hour=args.requests_per_hour,
+            # a tick worth of requests can be spent at once, the rest of the hour is spread over the next ticks
+            burst_seconds=args.tick_s,
+        )
+        scheduler = RecrawlScheduler(
+            mongo_client=mongo_client,
+            collector_classes=list(PAYLOAD_KEY_TO_CRAWLER.values()),
+            publish=publisher.publish,
+            budget=budget,
+            policy=policy,
+            urls_per_message=args.urls_per_message,
+        )
+
+        while True:
+            scheduler.run_once()
+            if args.once:
+                return
+            time.sleep(args.tick_s)
+
+
+if __name__ == "__main__":
+    set_logger()
+    main()
@@ -0,0 +1,96 @@
+import argparse
+import json
+import logging
+from typing import Iterator
+
+from pymongo import MongoClient
+
+from pricera.common.logger import set_logger
+from pricera.common import RabbitMQ, get_mongo_client
+from pricera.common.collectors import BatchPublisher
+from pricera.common.collectors.publisher import build_messages
+
+logger = logging.getLogger("seeder")
+
+DEFAULT_QUEUE = "crawler_queue"
+
+
+def get_seeder_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Publish crawl messages for a stream of urls")
+
+    parser.add_argument("--payload_key", type=str, required=True, help="Collector payload key, e.g. rozetka_product")
+    parser.add_argument("--file", type=str, help="Path to a file with one url per line")
+    parser.add_argument("--mongo_collection", type=str, help="Collection of the pricera database to read urls from")
+    parser.add_argument("--mongo_filter", type=str, default="{}", help="JSON filter of the Mongo query")
+    parser.add_argument("--mongo_url_field", type=str, default="product_url", help="Document field holding the url")
+    parser.add_argument("--queue", type=str, default=DEFAULT_QUEUE, help="Queue to publish to")
+    parser.add_argument("--urls_per_message", type=int, default=10, help="Number of urls in one message")
+    parser.add_argument(
+        "--confirm_window",
+        type=int,
+        default=BatchPublisher.DEFAULT_CONFIRM_WINDOW,
+        help="Maximum number of messages waiting for a publisher confirm",
+    )
+    args = parser.parse_args()
+    validate_args(args)
+    return args
+
+
+def validate_args(args: argparse.Namespace) -> None:
+    if bool(args.file) == bool(args.mongo_collection):
+        logger.error("You must specify either --file or --mongo_collection.")
+        exit(1)
+
+    if args.urls_per_message < 1 or args.confirm_window < 1:
+        logger.error("--urls_per_message and --confirm_window must be positive.")
+        exit(1)
+
+
+def iter_file_urls(file_path: str) -> Iterator[str]:
+    with open(file_path, "r", encoding="utf-8") as file:
+        for line in file:
+            if url := line.strip():
+                yield url
+
+
+def iter_mongo_urls(mongo_client: MongoClient, collection: str, query_filter: dict, url_field: str) -> Iterator[str]:
+    cursor = mongo_client["pricera"][collection].find(filter=query_filter, projection={"_id": 0, url_field: 1})
+    for document in cursor:
+        if url := document.get(url_field):
+            yield url
+
+
+def publish_urls(args: argparse.Namespace, urls: Iterator[str]) -> None:
+    publisher = BatchPublisher(
+        connection_parameters=RabbitMQ().get_connection_parameters(),
+        queue=args.queue,
+        confirm_window=args.confirm_window,
+    )
+    result = publisher.publish(
+        build_messages(urls, payload_key=args.payload_key, urls_per_message=args.urls_per_message)
+    )
+    if result.failed:
+        logger.error(f"{result.failed} messages could not be published")
+        exit(1)
+
+
+def main() -> None:
+    args = get_seeder_args()
+
+    if args.file:
+        publish_urls(args, iter_file_urls(args.file))
+        return
+
+    with get_mongo_client() as mongo_client:
+        urls = iter_mongo_urls(
+            mongo_client,
+            collection=args.mongo_collection,
+            query_filter=json.loads(args.mongo_filter),
+            url_field=args.mongo_url_field,
+        )
+        publish_urls(args, urls)
+
+
+if __name__ == "__main__":
+    set_logger()
+    main()
@@ -1,8 +1,12 @@
-from typing import Iterator, Tuple
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, Optional, Tuple
 import logging
-from copy import deepcopy
-from pricera.common import ensure_list
-from pricera.common.collectors import BaseCollector
+from pricera.common.utilities import ensure_list, iter_chunks
+
+if TYPE_CHECKING:
+    from pricera.common.collectors import BaseCollector
 
 logger = logging.getLogger("pipeline_utilities")
 
@@ -15,6 +19,9 @@ def prepare_message(
         logger.warning("Message payload is empty. Skipping pipeline processing")
         return
 
+    # every prepared message shares the fields of the original one, only the payload is replaced
+    envelope = {key: value for key, value in message.items() if key != "payload"}
+
     for payload_key, payload_values in payload.items():
         collector_cls = collector_mapping.get(payload_key)
         if not collector_cls:
@@ -25,11 +32,43 @@ def prepare_message(
         # if parser/crawler can only handle single messages, yield each payload value separately
         if collector_cls.is_synchronous:
             for payload_value in payload_values:
-                single_message = deepcopy(message)
-                single_message["payload"] = {payload_key: payload_value}
-                yield collector_cls, single_message
-        # else, yield the entire batch
+                yield collector_cls, envelope | {"payload": {payload_key: payload_value}}
+        # else, yield the batch in chunks of at most max_batch_size values
         else:
-            batch_message = deepcopy(message)
-            batch_message["payload"] = {payload_key: payload_values}
-            yield collector_cls, batch_message
+            for chunk in iter_payload_chunks(payload_values, collector_cls.max_batch_size):
+                yield collector_cls, envelope | {"payload": {payload_key: chunk}}
+
+
+def iter_payload_chunks(payload_values: list, max_batch_size: Optional[int]) -> Iterator[list]:
+    if not max_batch_size or len(payload_values) <= max_batch_size:
+        yield payload_values
+        return
+
+    yield from iter_chunks(payload_values, max_batch_size)
+
+
+def process_prepared_messages(
+    prepared_messages: Iterable[Tuple[type[BaseCollector], dict]],
+    function: Callable[[type[BaseCollector], dict], None],
+    max_parallel_chunks: int = 1,
+) -> None:
+    """
+    Call the function for every prepared message, one after another or on up to `max_parallel_chunks` threads.
+    Parallel crawls need the CrawlWorker, the spiders of all chunks then share its reactor.
+    In parallel mode every chunk is processed before the first error is re-raised.
+    """
+    if max_parallel_chunks <= 1:
+        for collector_cls, prepared_message in prepared_messages:
+            function(collector_cls, prepared_message)
+        return
+
+    with ThreadPoolExecutor(max_workers=max_parallel_chunks, thread_name_prefix="pipeline_chunk") as executor:
+        futures = [
+            executor.submit(function, collector_cls, prepared_message)
+            for collector_cls, prepared_message in prepared_messages
+        ]
+
+    errors = [future.exception() for future in futures if future.exception() is not None]
+    if errors:
+        logger.error(f"{len(errors)} of {len(futures)} chunks failed")
+        raise errors[0]
@@ -0,0 +1,192 @@
+__all__ = ["MessageProfiler", "get_message_id"]
+
+import cProfile
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Optional
+
+logger = logging.getLogger("profiling")
+
+PROFILE_EVERY_ENV = "PRICERA_PROFILE_EVERY"
+PROFILE_DIR_ENV = "PRICERA_PROFILE_DIR"
+DEFAULT_PROFILE_DIR = "profiles"
+
+UNSAFE_FILE_NAME_CHARACTERS = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def get_message_id(message: dict) -> str:
+    """Id of the message when it has one, otherwise a short hash of its content."""
+    message_id = message.get("message_id") or message.get("id")
+    if message_id is not None:
+        return str(message_id)
+    return hashlib.sha1(json.dumps(message, sort_keys=True, default=str).encode()).hexdigest()[:12]
+
+
+@dataclass
+class MessageProfiler:
+    """
+    Profiles every `sample_every`-th processed message with cProfile and tracemalloc.
+
+    For a sampled message two reports tagged with its payload keys and id are written to `output_dir`:
+    `<tag>.pstats` with the CPU profile, loadable with `pstats` or snakeviz, and `<tag>.allocations.txt`
+    with the peak traced memory and the lines that allocated the most memory while the message was processed.
+
+    Only one message is profiled at a time, as both profilers are process-wide. A sampled message arriving
+    while another one is profiled is processed without profiling. tracemalloc sees the allocations of all
+    threads, and since Python 3.12 so does cProfile. Before that it only sees the calling thread, so the reactor
+    thread of the CrawlWorker, where the spiders of crawl messages run, is profiled on its own into
+    `<tag>.reactor.pstats`. Parsing on the ParseExecutor's process pool is never profiled, the report notes it.
+
+    Usage:
+        profiler = MessageProfiler(sample_every=100, output_dir="profiles")
+        profiler.process(pipeline_function, message)
+    """
+
+    sample_every: int
+    output_dir: str = DEFAULT_PROFILE_DIR
+    top_allocations: int = 30
+    traceback_frames: int = 1
+    _processed: int = field(default=0, init=False, repr=False)
+    _counter_lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+    _profile_lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.sample_every < 1:
+            raise ValueError(f"Profiling sample rate must be positive, got {self.sample_every}")
+
+    @classmethod
+    def from_env(
+        cls, sample_every: Optional[int] = None, output_dir: Optional[str] = None
+    ) -> Optional["MessageProfiler"]:
+        """Profiler configured by the arguments or the environment variables, None when profiling is off."""
+        sample_every = sample_every or int(os.getenv(PROFILE_EVERY_ENV) or 0)
+        if not sample_every:
+            return None
+        return cls(
+            sample_every=sample_every, output_dir=output_dir or os.getenv(PROFILE_DIR_ENV) or DEFAULT_PROFILE_DIR
+        )
+
+    def should_profile(self) -> bool:
+        with self._counter_lock:
+            # the first message is profiled, so a short run gives a report too
+            sampled = self._processed % self.sample_every == 0
+            self._processed += 1
+            return sampled
+
+    def process(self, function: Callable[[dict], None], message: dict) -> None:
+        if not self.should_profile() or not self._profile_lock.acquire(blocking=False):
+            function(message)
+            return
+
+        try:
+            self.profile(function, message)
+        finally:
+            self._profile_lock.release()
+
+    def profile(self, function: Callable[[dict], None], message: dict) -> None:
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(self.traceback_frames)
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot()
+        profiler = cProfile.Profile()
+        reactor_profiler = self.start_reactor_profiler()
+        started_at = time.perf_counter()
+
+        try:
+            profiler.runcall(function, message)
+        finally:
+            duration = time.perf_counter() - started_at
+            if reactor_profiler is not None:
+                self.stop_reactor_profiler(reactor_profiler)
+            _, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+            if started_tracing:
+                tracemalloc.stop()
+            self.write_reports(
+                message, profiler, before, after, peak=peak, duration=duration, reactor_profiler=reactor_profiler
+            )
+
+    @staticmethod
+    def get_crawl_worker():
+        """The running CrawlWorker, looked up without importing it, so the parse pipeline doesn't load Scrapy."""
+        crawl_worker = sys.modules.get("pricera.common.collectors.crawl_worker")
+        if crawl_worker is None or not crawl_worker.CrawlWorker.is_running():
+            return None
+        return crawl_worker.CrawlWorker.get_instance()
+
+    def start_reactor_profiler(self) -> Optional[cProfile.Profile]:
+        """Profile of the reactor thread of the running CrawlWorker, when the message profiler can't see it."""
+        worker = self.get_crawl_worker()
+        # since Python 3.12 a profiler sees every thread and only one can be active at a time
+        if worker is None or sys.version_info >= (3, 12):
+            return None
+
+        from twisted.internet.threads import blockingCallFromThread
+
+        reactor_profiler = cProfile.Profile()
+        blockingCallFromThread(worker.reactor, reactor_profiler.enable)
+        return reactor_profiler
+
+    def stop_reactor_profiler(self, reactor_profiler: cProfile.Profile) -> None:
+        worker = self.get_crawl_worker()
+        if worker is None:
+            return
+
+        from twisted.internet.threads import blockingCallFromThread
+
+        blockingCallFromThread(worker.reactor, reactor_profiler.disable)
+
+    @staticmethod
+    def get_report_notes() -> list[str]:
+        notes = []
+        parse_executor = sys.modules.get("pricera.common.collectors.parse_executor")
+        if parse_executor is not None and parse_executor.ParseExecutor.is_running():
+            workers = parse_executor.ParseExecutor.get_instance().parse_workers
+            notes.append(f"Note: parsing ran on {workers} worker processes, the CPU profile only shows waiting for it")
+        return notes
+
+    def get_report_path(self, message: dict) -> Path:
+        payload_keys = "+".join(sorted(message.get("payload") or {})) or "empty"
+        tag = f"{time.strftime('%Y%m%dT%H%M%S')}_{payload_keys}_{get_message_id(message)}"
+        return Path(self.output_dir) / UNSAFE_FILE_NAME_CHARACTERS.sub("_", tag)
+
+    def write_reports(
+        self,
+        message: dict,
+        profiler: cProfile.Profile,
+        before: tracemalloc.Snapshot,
+        after: tracemalloc.Snapshot,
+        peak: int,
+        duration: float,
+        reactor_profiler: Optional[cProfile.Profile] = None,
+    ) -> None:
+        # a failed report must not fail the message
+        try:
+            report_path = self.get_report_path(message)
+            report_path.parent.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(f"{report_path}.pstats")
+            notes = self.get_report_notes()
+            if reactor_profiler is not None:
+                reactor_profiler.dump_stats(f"{report_path}.reactor.pstats")
+                notes.append(f"Note: the spiders ran on the reactor thread, see {report_path.name}.reactor.pstats")
+
+            filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+            differences = after.filter_traces(filters).compare_to(before.filter_traces(filters), "lineno")
+            lines = [f"Duration: {duration:.3f} s", f"Peak traced memory: {peak / 1024:.1f} KiB", *notes, ""]
+            lines += [str(difference) for difference in differences[: self.top_allocations]]
+            Path(f"{report_path}.allocations.txt").write_text("\n".join(lines) + "\n", encoding="utf-8")
+        except Exception as e:
+            logger.error("Failed to write the profiling reports", exc_info=e)
+            return
+
+        logger.info(f"Profiled message in {duration:.3f} s with {peak / 1024:.1f} KiB peak, reports: {report_path}.*")
@@ -1,5 +1,12 @@
-__all__ = ["S3Pipeline", "PriceraImpersonateDownloadHandler"]
+__all__ = [
+    "S3Pipeline",
+    "S3StreamingPipeline",
+    "PriceraImpersonateDownloadHandler",
+    "AdaptiveConcurrencyMiddleware",
+    "ProxyPoolMiddleware",
+]
 
-from .item_pipelines import S3Pipeline
+from .item_pipelines import S3Pipeline, S3StreamingPipeline
 from .download_handlers import PriceraImpersonateDownloadHandler
+from .downloader_middlewares import AdaptiveConcurrencyMiddleware, ProxyPoolMiddleware
 from .base_spider import BaseSpider
@@ -1,14 +1,29 @@
+from typing import Optional
+
 from scrapy.http import Response
+from pricera.common.proxy_pool import ProxyConfig
 from pricera.models import ResponseObject
 import scrapy
 from scrapy import Spider
 
 
 class BaseSpider(Spider):
-    def __init__(self, storage_bucket: str, storage_prefix: str, *args, **kwargs):
+    def __init__(
+        self,
+        storage_bucket: str,
+        storage_prefix: str,
+        known_content_hashes: Optional[dict[str, str]] = None,
+        proxy_config: Optional[ProxyConfig] = None,
+        *args,
+        **kwargs,
+    ):
         Spider.__init__(self, *args, **kwargs)
         self.storage_bucket: str = storage_bucket
         self.storage_prefix: str = storage_prefix
+        # content hashes of the already stored and parsed chains, keyed by the chain hash
+        self.known_content_hashes: dict[str, str] = known_content_hashes or {}
+        # the ProxyPoolMiddleware sends the requests through its proxies, None crawls without proxies
+        self.proxy_config: Optional[ProxyConfig] = proxy_config
 
     def collect_response(self, response: Response) -> ResponseObject:
         return ResponseObject(
@@ -18,6 +33,30 @@ class BaseSpider(Spider):
             object_hash=response.meta["object_hash"],
         )
 
+    def is_chain_complete(self, item: ResponseObject) -> bool:
+        """Spiders with multi-request chains return False until the last item of the chain."""
+        return True
+
+    def set_chain_status(self, object_hash: str, status: str) -> None:
+        """Record the crawl status of a chain that produced no items for the item pipeline."""
+        statuses = self.crawler.stats.get_value("custom_status", {})
+        statuses[object_hash] = status
+        self.crawler.stats.set_value("custom_status", statuses)
+
+    def is_content_unchanged(self, object_hash: str, content_hash: str) -> bool:
+        return self.known_content_hashes.get(object_hash) == content_hash
+
+    def set_chain_content_hash(self, object_hash: str, content_hash: str) -> None:
+        """Record the content hash of a chain, collectors store it next to the crawl status."""
+        content_hashes = self.crawler.stats.get_value("custom_content_hash", {})
+        content_hashes[object_hash] = content_hash
+        self.crawler.stats.set_value("custom_content_hash", content_hashes)
+
+    async def start(self):
+        # Scrapy >= 2.13 starts from here, its default ignores the start_requests of the spiders
+        for request in self.start_requests():
+            yield request
+
     def start_requests(self):
         """Generate initial requests with chain UUIDs"""
         if hasattr(self, "start_urls"):
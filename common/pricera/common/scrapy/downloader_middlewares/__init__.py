@@ -0,0 +1,4 @@
+__all__ = ["AdaptiveConcurrencyMiddleware", "ProxyPoolMiddleware"]
+
+from .adaptive_concurrency import AdaptiveConcurrencyMiddleware
+from .proxy_pool import ProxyPoolMiddleware
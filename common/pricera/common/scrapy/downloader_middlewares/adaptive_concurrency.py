@@ -0,0 +1,290 @@
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Optional
+
+from scrapy.exceptions import NotConfigured
+
+from pricera.common.scrapy.downloader_middlewares.proxy_pool import PROXY_KEY
+
+logger = logging.getLogger("adaptive_concurrency")
+
+STATS_PREFIX = "adaptive_concurrency"
+
+
+@dataclass
+class SlotState:
+    """Feedback state of one download slot, a domain unless the spider sets `download_slot`."""
+
+    concurrency: float
+    # delay between the requests of the slot outside of a pause, raised with every decrease of the concurrency
+    delay: float
+    # randomization of the delay by the downloader, turned off during a pause
+    jitter: Any = None
+    latency: Optional[float] = None
+    min_latency: Optional[float] = None
+    # pause of the last throttling, doubled when the slot is throttled again right after it
+    backoff: float = 0.0
+    paused_until: float = field(default_factory=lambda: float("-inf"))
+    last_decrease_at: float = field(default_factory=lambda: float("-inf"))
+
+    def is_paused(self, now: float) -> bool:
+        return now < self.paused_until
+
+
+class AdaptiveConcurrencyMiddleware:
+    """
+    Downloader middleware adjusting the concurrency and delay of every download slot with AIMD feedback.
+
+    Every response within the latency target adds `1 / concurrency` to the slot concurrency,
+    so it grows by about one request per round trip, and takes `DELAY_STEP` off the slot delay down to the
+    minimum delay. A throttled response (429 or 403), a server error, a download failure or a latency above
+    the target multiply the concurrency by the decrease factor and divide the delay by it, from at least
+    `DELAY_STEP` up to the maximum delay. As all the in-flight requests of a slot see the same congestion,
+    a slot is decreased at most once per round trip. Without a configured target the latency target is
+    a multiple of the lowest latency seen.
+
+    A throttled response also pauses the slot for the `Retry-After` of the response, or else for a backoff
+    doubled by every throttling right after a pause. The downloader counts a slot delay from the last request
+    it sent and randomizes it, so during a pause the delay is set to reach past its end from that request,
+    without randomization. A timer restores the delay when the pause ends, the first response after it
+    halves the backoff.
+
+    The throttling and download errors of a request sent through the proxy pool (`meta["proxy_pool_proxy"]`)
+    are a ban or a failure of its exit, not congestion of the slot: the ProxyPoolMiddleware (570) cools that
+    proxy down, for the `Retry-After` of a ban when it has one, and the slot keeps its pace through the others.
+
+    Every decision is counted in the crawler stats under `adaptive_concurrency/`, next to the current
+    concurrency and delay of every slot. Spiders opt in through their `custom_settings`, the middleware
+    has to run before the RetryMiddleware (550) sees the responses:
+
+        "DOWNLOADER_MIDDLEWARES": {"pricera.common.scrapy.AdaptiveConcurrencyMiddleware": 560}
+
+    Scrapy settings expected:
+      - ADAPTIVE_CONCURRENCY_ENABLED (optional, defaults to True)
+      - ADAPTIVE_CONCURRENCY_START (optional, defaults to CONCURRENT_REQUESTS_PER_DOMAIN)
+      - ADAPTIVE_CONCURRENCY_MAX (optional, defaults to CONCURRENT_REQUESTS)
+      - ADAPTIVE_CONCURRENCY_DECREASE_FACTOR (optional, defaults to 0.5)
+      - ADAPTIVE_CONCURRENCY_TARGET_LATENCY (optional, seconds)
+      - ADAPTIVE_CONCURRENCY_LATENCY_TOLERANCE (optional, defaults to 3 times the lowest latency)
+      - ADAPTIVE_CONCURRENCY_MIN_DELAY (optional, defaults to DOWNLOAD_DELAY)
+      - ADAPTIVE_CONCURRENCY_MAX_DELAY (optional, defaults to 60 seconds)
+      - ADAPTIVE_CONCURRENCY_THROTTLE_CODES (optional, defaults to [429, 403])
+    """
+
+    MIN_CONCURRENCY = 1
+    MIN_BACKOFF_DELAY = 0.25
+    DELAY_STEP = 0.1
+    LATENCY_SMOOTHING = 0.3
+    # the downloader's wake-up at the end of a pause comes after the timer restoring the delay
+    RESUME_MARGIN = 0.01
+
+    def __init__(
+        self,
+        crawler,
+        start_concurrency: int,
+        max_concurrency: int,
+        decrease_factor: float = 0.5,
+        target_latency: Optional[float] = None,
+        latency_tolerance: float = 3.0,
+        min_delay: float = 0.0,
+        max_delay: float = 60.0,
+        throttle_codes: tuple[int, ...] = (429, 403),
+    ):
+        if not 0 < decrease_factor < 1:
+            raise ValueError(f"Decrease factor must be between 0 and 1, got {decrease_factor}")
+
+        self.crawler = crawler
+        self.max_concurrency = max(self.MIN_CONCURRENCY, max_concurrency)
+        self.start_concurrency = min(max(self.MIN_CONCURRENCY, start_concurrency), self.max_concurrency)
+        self.decrease_factor = decrease_factor
+        self.target_latency = target_latency
+        self.latency_tolerance = latency_tolerance
+        self.min_delay = min_delay
+        self.max_delay = max(max_delay, min_delay)
+        self.throttle_codes = {int(code) for code in throttle_codes}
+        self.slot_states: dict[str, SlotState] = {}
+
+    @classmethod
+    def from_crawler(cls, crawler) -> "AdaptiveConcurrencyMiddleware":
+        settings = crawler.settings
+        if not settings.getbool("ADAPTIVE_CONCURRENCY_ENABLED", True):
+            raise NotConfigured
+        if settings.getbool("AUTOTHROTTLE_ENABLED"):
+            logger.warning("AutoThrottle also adjusts the slot delays, it should be disabled with adaptive concurrency")
+
+        target_latency = settings.getfloat("ADAPTIVE_CONCURRENCY_TARGET_LATENCY") or None
+        return cls(
+            crawler,
+            start_concurrency=settings.getint(
+                "ADAPTIVE_CONCURRENCY_START", settings.getint("CONCURRENT_REQUESTS_PER_DOMAIN")
+            ),
+            max_concurrency=settings.getint("ADAPTIVE_CONCURRENCY_MAX", settings.getint("CONCURRENT_REQUESTS")),
+            decrease_factor=settings.getfloat("ADAPTIVE_CONCURRENCY_DECREASE_FACTOR", 0.5),
+            target_latency=target_latency,
+            latency_tolerance=settings.getfloat("ADAPTIVE_CONCURRENCY_LATENCY_TOLERANCE", 3.0),
+            min_delay=settings.getfloat("ADAPTIVE_CONCURRENCY_MIN_DELAY", settings.getfloat("DOWNLOAD_DELAY")),
+            max_delay=settings.getfloat("ADAPTIVE_CONCURRENCY_MAX_DELAY", 60.0),
+            throttle_codes=tuple(settings.getlist("ADAPTIVE_CONCURRENCY_THROTTLE_CODES", [429, 403])),
+        )
+
+    def process_response(self, request, response, spider=None):
+        latency = request.meta.get("download_latency")
+        if response.status in self.throttle_codes and PROXY_KEY in request.meta:
+            self.inc_stat("proxy_ban")
+        elif response.status in self.throttle_codes:
+            retry_after = self.get_retry_after(response)
+            if retry_after is not None:
+                self.inc_stat("retry_after")
+            self.on_congestion(request, reason="throttled", retry_after=retry_after)
+        elif response.status >= 500:
+            self.on_congestion(request, reason="server_error")
+        else:
+            self.on_success(request, latency)
+        return response
+
+    def process_exception(self, request, exception, spider=None) -> None:
+        if PROXY_KEY in request.meta:
+            self.inc_stat("proxy_failure")
+        else:
+            self.on_congestion(request, reason="download_error")
+
+    def get_slot(self, request):
+        key = request.meta.get("download_slot")
+        if key is None or self.crawler.engine is None:
+            return None, None
+        return key, self.crawler.engine.downloader.slots.get(key)
+
+    def get_state(self, key: str, slot) -> SlotState:
+        state = self.slot_states.get(key)
+        if state is None:
+            state = SlotState(
+                concurrency=self.start_concurrency, delay=max(self.min_delay, slot.delay), jitter=self.get_jitter(slot)
+            )
+            self.slot_states[key] = state
+        return state
+
+    @staticmethod
+    def get_jitter(slot) -> Any:
+        # Scrapy < 2.14 randomizes the delay by a flag, later versions by a jitter magnitude
+        return slot.jitter if hasattr(slot, "jitter") else slot.randomize_delay
+
+    @staticmethod
+    def set_jitter(slot, jitter: Any) -> None:
+        if hasattr(slot, "jitter"):
+            slot.jitter = jitter
+        else:
+            slot.randomize_delay = jitter
+
+    def on_success(self, request, latency: Optional[float]) -> None:
+        key, slot = self.get_slot(request)
+        if slot is None:
+            return
+
+        state = self.get_state(key, slot)
+        if latency is not None:
+            state.min_latency = latency if state.min_latency is None else min(state.min_latency, latency)
+            state.latency = (
+                latency
+                if state.latency is None
+                else self.LATENCY_SMOOTHING * latency + (1 - self.LATENCY_SMOOTHING) * state.latency
+            )
+            if state.latency > self.get_target_latency(state):
+                self.decrease(key, slot, state, reason="latency")
+                return
+
+        if state.concurrency < self.max_concurrency:
+            state.concurrency = min(self.max_concurrency, state.concurrency + 1 / state.concurrency)
+            self.inc_stat("increase")
+        if state.delay > self.min_delay:
+            state.delay = max(self.min_delay, state.delay - self.DELAY_STEP)
+        if not state.is_paused(time.monotonic()):
+            state.backoff /= 2
+        self.apply(key, slot, state)
+
+    def on_congestion(self, request, reason: str, retry_after: Optional[float] = None) -> None:
+        key, slot = self.get_slot(request)
+        if slot is None:
+            return
+
+        state = self.get_state(key, slot)
+        now = time.monotonic()
+        # the requests sent before the pause are throttled too, they don't extend it
+        if reason == "throttled" and now >= state.paused_until:
+            state.backoff = min(self.max_delay, max(self.MIN_BACKOFF_DELAY, state.backoff * 2))
+            pause = min(self.max_delay, retry_after if retry_after is not None else state.backoff)
+            state.paused_until = now + pause
+            self.schedule_resume(key, pause)
+            self.inc_stat("pause")
+        self.decrease(key, slot, state, reason=reason)
+
+    def schedule_resume(self, key: str, pause: float) -> None:
+        from twisted.internet import reactor
+
+        reactor.callLater(pause, self.resume, key)
+
+    def resume(self, key: str) -> None:
+        """Restore the delay of a slot at the end of its pause, unless it was paused again meanwhile."""
+        state = self.slot_states.get(key)
+        slot = self.crawler.engine.downloader.slots.get(key) if self.crawler.engine is not None else None
+        if state is None or slot is None or state.is_paused(time.monotonic()):
+            return
+        self.apply(key, slot, state)
+
+    def get_target_latency(self, state: SlotState) -> float:
+        if self.target_latency is not None:
+            return self.target_latency
+        return state.min_latency * self.latency_tolerance
+
+    def decrease(self, key: str, slot, state: SlotState, reason: str) -> None:
+        now = time.monotonic()
+        # the responses already in flight saw the same congestion, one decrease per round trip is enough
+        if now - state.last_decrease_at >= (state.latency or 0):
+            state.concurrency = max(self.MIN_CONCURRENCY, state.concurrency * self.decrease_factor)
+            state.delay = min(self.max_delay, max(self.DELAY_STEP, state.delay) / self.decrease_factor)
+            state.last_decrease_at = now
+            self.inc_stat(f"decrease/{reason}")
+            logger.debug(f"Slot {key} {reason}: concurrency {state.concurrency:.1f}, delay {state.delay:.2f} s")
+        self.apply(key, slot, state)
+
+    def apply(self, key: str, slot, state: SlotState) -> None:
+        slot.concurrency = max(self.MIN_CONCURRENCY, int(state.concurrency))
+        if state.is_paused(time.monotonic()):
+            # the downloader waits the delay from the last request it sent
+            slot.delay = state.paused_until - slot.lastseen + self.RESUME_MARGIN
+            self.set_jitter(slot, 0)
+        else:
+            slot.delay = state.delay
+            self.set_jitter(slot, state.jitter)
+        stats = self.crawler.stats
+        stats.set_value(f"{STATS_PREFIX}/{key}/concurrency", slot.concurrency)
+        stats.set_value(f"{STATS_PREFIX}/{key}/delay", round(slot.delay, 3))
+        stats.max_value(f"{STATS_PREFIX}/{key}/max_delay", round(slot.delay, 3))
+        stats.min_value(f"{STATS_PREFIX}/{key}/min_concurrency", slot.concurrency)
+        stats.max_value(f"{STATS_PREFIX}/{key}/max_concurrency", slot.concurrency)
+
+    def inc_stat(self, name: str) -> None:
+        self.crawler.stats.inc_value(f"{STATS_PREFIX}/{name}")
+
+    @staticmethod
+    def get_retry_after(response) -> Optional[float]:
+        """Seconds to wait by the `Retry-After` header, given in seconds or as an HTTP date."""
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+
+        value = value.decode("latin-1").strip()
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
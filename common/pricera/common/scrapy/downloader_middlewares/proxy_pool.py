@@ -0,0 +1,125 @@
+import logging
+from typing import Optional
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+
+from pricera.common.proxy_pool import ProxyPool, get_proxy_label, get_proxy_pool
+
+logger = logging.getLogger("proxy_pool_middleware")
+
+STATS_PREFIX = "proxy_pool"
+# the pool proxy of the request, "proxy" loses its credentials to the HttpProxyMiddleware
+PROXY_KEY = "proxy_pool_proxy"
+FAILED_PROXY_KEY = "proxy_pool_failed_proxy"
+
+
+class ProxyPoolMiddleware:
+    """
+    Downloader middleware sending the requests through the proxy pool of the spider's `proxy_config`.
+
+    The proxy is set as `meta["proxy"]`, so the HttpProxyMiddleware (750) turns its credentials into
+    the Proxy-Authorization header the PriceraImpersonateDownloadHandler passes to curl. With sticky sessions
+    the requests of a chain (`meta["proxy_session"]`, else `meta["object_hash"]`) keep their proxy.
+
+    Ban responses, server errors (a 502, 503 or 504 often comes from the proxy itself) and download errors
+    are scored against the proxy before the RetryMiddleware (550) sees them, and release the session,
+    so the retry goes through another, healthy proxy. The `Retry-After` of a ban is the cooldown of its proxy.
+    Requests with a `meta["proxy"]` of their own and spiders without a proxy config are left alone.
+    Spiders opt in through their `custom_settings`:
+
+        "DOWNLOADER_MIDDLEWARES": {"pricera.common.scrapy.ProxyPoolMiddleware": 570}
+
+    Scrapy settings expected:
+      - PROXY_POOL_ENABLED (optional, defaults to True)
+    """
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+        self.pool: Optional[ProxyPool] = None
+        self.sessions: dict[str, str] = {}
+
+    @classmethod
+    def from_crawler(cls, crawler) -> "ProxyPoolMiddleware":
+        if not crawler.settings.getbool("PROXY_POOL_ENABLED", True):
+            raise NotConfigured
+
+        middleware = cls(crawler)
+        crawler.signals.connect(middleware.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        return middleware
+
+    def spider_opened(self, spider) -> None:
+        proxy_config = getattr(spider, "proxy_config", None)
+        if proxy_config is not None:
+            self.pool = get_proxy_pool(proxy_config)
+            logger.info(f"Crawling through a pool of {len(proxy_config.proxies)} proxies")
+
+    def spider_closed(self, spider) -> None:
+        if self.pool is None:
+            return
+        for label, health in self.pool.get_health().items():
+            self.crawler.stats.set_value(f"{STATS_PREFIX}/health/{label}", health)
+        self.sessions.clear()
+
+    def get_session_key(self, request) -> Optional[str]:
+        if not self.pool.config.sticky_sessions:
+            return None
+        return request.meta.get("proxy_session") or request.meta.get("object_hash")
+
+    def process_request(self, request, spider=None) -> None:
+        if self.pool is None or ("proxy" in request.meta and PROXY_KEY not in request.meta):
+            return None
+
+        session_key = self.get_session_key(request)
+        proxy = self.sessions.get(session_key) if session_key is not None else None
+        if proxy is None or not self.pool.is_available(proxy):
+            proxy = self.pool.choose(exclude=request.meta.get(FAILED_PROXY_KEY))
+            if session_key is not None:
+                self.sessions[session_key] = proxy
+
+        request.meta["proxy"] = proxy
+        request.meta[PROXY_KEY] = proxy
+        self.inc_stat("assigned")
+        return None
+
+    def process_response(self, request, response, spider=None):
+        proxy = request.meta.get(PROXY_KEY)
+        if self.pool is None or proxy is None:
+            return response
+
+        if response.status in self.pool.config.ban_codes:
+            # the adaptive concurrency middleware imports this module
+            from pricera.common.scrapy.downloader_middlewares.adaptive_concurrency import (
+                AdaptiveConcurrencyMiddleware,
+            )
+
+            self.pool.record_ban(proxy, retry_after=AdaptiveConcurrencyMiddleware.get_retry_after(response))
+            self.on_failure(request, proxy, reason="ban")
+        elif response.status >= 500:
+            self.pool.record_failure(proxy)
+            self.on_failure(request, proxy, reason="server_error")
+        else:
+            self.pool.record_success(proxy, latency=request.meta.get("download_latency"))
+        return response
+
+    def process_exception(self, request, exception, spider=None) -> None:
+        proxy = request.meta.get(PROXY_KEY)
+        if self.pool is None or proxy is None:
+            return None
+
+        self.pool.record_failure(proxy)
+        self.on_failure(request, proxy, reason="failure")
+        return None
+
+    def on_failure(self, request, proxy: str, reason: str) -> None:
+        # the retry copies the meta, it has to pick another proxy
+        request.meta[FAILED_PROXY_KEY] = proxy
+        session_key = self.get_session_key(request)
+        if session_key is not None and self.sessions.get(session_key) == proxy:
+            del self.sessions[session_key]
+        self.inc_stat(reason)
+        logger.debug(f"Proxy {get_proxy_label(proxy)} {reason} on {request.url}")
+
+    def inc_stat(self, name: str) -> None:
+        self.crawler.stats.inc_value(f"{STATS_PREFIX}/{name}")
@@ -1,3 +1,4 @@
-__all__ = ["S3Pipeline"]
+__all__ = ["S3Pipeline", "S3StreamingPipeline"]
 
 from .s3_pipeline import S3Pipeline
+from .s3_streaming_pipeline import S3StreamingPipeline
@@ -1,14 +1,15 @@
+import hashlib
 import io
 import json
 import logging
-import os
 from collections import defaultdict
+from pricera.common import metrics
+from pricera.common.object_store import ObjectStore, get_object_store
 from pricera.models import ResponseObject
 import gzip
-import boto3
 from scrapy import signals
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Dict, List, Any
+from typing import Any, Callable, Dict, List
 
 
 class S3Pipeline:
@@ -18,6 +19,8 @@ class S3Pipeline:
     Pipeline collects incoming items by `object_hash` and, when the spider closes,
     uploads each request chain to a separate file in S3 in JSON Lines format.
     Each item is expected to contain the `object_hash` field.
+    Chains whose content hash matches the one the spider already knows are not uploaded
+    and get the `unchanged` status.
     Scrapy settings expected:
       - S3_BUCKET_NAME
       - S3_PREFIX
@@ -25,28 +28,11 @@ class S3Pipeline:
 
     def __init__(self, bucket_name: str, prefix: str):
         self.logger = logging.getLogger(self.__class__.__name__)
-        self.s3 = boto3.client(
-            "s3",
-            aws_access_key_id=self.aws_access_key_id,
-            aws_secret_access_key=self.aws_secret_access_key,
-            region_name=self.aws_region_name,
-        )
+        self.object_store: ObjectStore = get_object_store()
         self.bucket: str = bucket_name
         self.prefix: str = prefix
         self.responses: defaultdict = defaultdict(list)
 
-    @property
-    def aws_access_key_id(self):
-        return os.environ.get("AWS_ACCESS_KEY_ID")
-
-    @property
-    def aws_secret_access_key(self):
-        return os.environ.get("AWS_SECRET_ACCESS_KEY")
-
-    @property
-    def aws_region_name(self):
-        return os.environ.get("AWS_REGION_NAME")
-
     @classmethod
     def from_crawler(cls, crawler):
         spider = crawler.spider
@@ -61,7 +47,7 @@ class S3Pipeline:
         crawler.signals.connect(pipeline.spider_closed, signals.spider_closed)
         return pipeline
 
-    def process_item(self, item: ResponseObject, spider):
+    def process_item(self, item: ResponseObject, spider=None):
         self.responses[item.object_hash].append(item.model_dump())
         return item
 
@@ -75,6 +61,7 @@ class S3Pipeline:
 
         try:
             self.collect_response_statuses(spider=spider, responses=self.responses)
+            self.skip_unchanged_chains(spider=spider, responses=self.responses)
             success_count, failure_count = self._upload_all_chains_parallel()
             self._log_upload_summary(success_count, failure_count)
         except Exception as e:
@@ -102,6 +89,33 @@ class S3Pipeline:
             statuses[object_hash] = response_status
             spider.crawler.stats.set_value("custom_status", statuses)
 
+    @staticmethod
+    def update_content_hash(content_hash, item: Dict[str, Any]) -> None:
+        """
+        Feed the part of a response the parsers depend on into the chain content hash.
+        The url and the chain hash are left out, so the same page crawled in another batch hashes the same.
+        """
+        text = item["text"].encode("utf-8")
+        content_hash.update(f"{item['status']}:{len(text)}:".encode())
+        content_hash.update(text)
+
+    @classmethod
+    def get_content_hash(cls, items: List[Dict[str, Any]]) -> str:
+        content_hash = hashlib.sha256()
+        for item in items:
+            cls.update_content_hash(content_hash, item)
+        return content_hash.hexdigest()
+
+    def skip_unchanged_chains(self, spider, responses: dict) -> None:
+        """Record the content hash of every chain and drop the successful chains that are already stored."""
+        for object_hash, items in list(responses.items()):
+            content_hash = self.get_content_hash(items)
+            spider.set_chain_content_hash(object_hash, content_hash)
+
+            if self.get_response_status(items) == "success" and spider.is_content_unchanged(object_hash, content_hash):
+                spider.set_chain_status(object_hash, "unchanged")
+                del responses[object_hash]
+
     def _upload_all_chains_parallel(self) -> tuple[int, int]:
         """
         Upload all chains in parallel using thread pool.
@@ -131,6 +145,9 @@ class S3Pipeline:
 
         return success_count, failure_count
 
+    def get_s3_key(self, object_hash: str) -> str:
+        return f"{self.prefix.rstrip('/')}/{object_hash}.jsonl.gz"
+
     def _upload_single_chain(self, object_hash: str, items: List[Dict[str, Any]]) -> None:
         """
         Upload a single chain to S3 with retry logic.
@@ -142,12 +159,28 @@ class S3Pipeline:
         Raises:
             Exception: If upload fails after all retry attempts
         """
-        s3_key = f"{self.prefix.rstrip('/')}/{object_hash}.jsonl.gz"
+        s3_key = self.get_s3_key(object_hash)
 
+        def upload() -> None:
+            bio = self._create_gzipped_stream(items, object_hash)
+            self._upload_to_s3(bio, s3_key, object_hash)
+
+        self._upload_with_retries(upload, object_hash)
+
+    def _upload_with_retries(self, upload: Callable[[], None], object_hash: str) -> None:
+        """
+        Call the upload function until it succeeds or the retry attempts are exhausted.
+
+        Args:
+            upload: Function performing a single upload attempt
+            object_hash: Unique identifier for the chain, used for logging
+
+        Raises:
+            Exception: If upload fails after all retry attempts
+        """
         for attempt in range(self.MAX_RETRY_ATTEMPTS + 1):
             try:
-                bio = self._create_gzipped_stream(items, object_hash)
-                self._upload_to_s3(bio, s3_key, object_hash)
+                upload()
                 return  # Success - exit method
 
             except Exception as e:
@@ -199,10 +232,11 @@ class S3Pipeline:
         Raises:
             Exception: If S3 upload fails
         """
-        extra_args = {"ContentType": "application/gzip"}
-
         try:
-            self.s3.upload_fileobj(bio, self.bucket, s3_key, ExtraArgs=extra_args)
+            size = bio.getbuffer().nbytes
+            with metrics.timer("pricera_s3_upload_seconds"):
+                self.object_store.upload_fileobj(bio, self.bucket, s3_key, content_type="application/gzip")
+            metrics.inc("pricera_s3_upload_bytes_total", size)
             self.logger.debug("Successfully uploaded chain %s to s3://%s/%s", object_hash, self.bucket, s3_key)
         finally:
             # Always close the buffer to free memory
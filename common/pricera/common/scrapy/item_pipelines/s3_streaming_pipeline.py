@@ -0,0 +1,208 @@
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from typing import Any, Dict, Optional
+
+from scrapy import signals
+from scrapy.utils.defer import maybe_deferred_to_future
+from twisted.internet.defer import Deferred, DeferredList
+from twisted.internet.threads import deferToThreadPool
+from twisted.python.threadpool import ThreadPool
+
+from pricera.common import metrics
+from pricera.common.scrapy.item_pipelines.s3_pipeline import S3Pipeline
+from pricera.models import ResponseObject
+
+
+class S3StreamingPipeline(S3Pipeline):
+    DEFAULT_SPOOL_DIR = os.path.join(tempfile.gettempdir(), "pricera_spool")
+    """
+    Streaming variant of S3Pipeline with bounded memory usage.
+    Each item is appended to an on-disk gzip spool file of its chain as soon as it arrives.
+    When the spider reports the chain as complete, the spool file is uploaded to S3 on a
+    background thread pool and the chain status is recorded right after the upload finishes.
+    When the number of in-flight uploads reaches the limit, items are held back until an
+    upload completes, so the crawl can't outrun S3.
+    Completed chains whose content hash matches the one the spider already knows are not uploaded
+    and get the `unchanged` status.
+    On spider close only not yet completed chains are uploaded and the in-flight uploads drained.
+    The spool directory belongs to the run and is removed on spider close, unless chains failed to upload.
+    Nothing recovers it after a crash, the chains of the run are crawled again with their message.
+    Scrapy settings expected:
+      - S3_SPOOL_DIR (optional, defaults to the system temp directory)
+      - S3_MAX_IN_FLIGHT_UPLOADS (optional, defaults to MAX_UPLOAD_WORKERS)
+    """
+
+    def __init__(self, bucket_name: str, prefix: str, spool_dir: str, max_in_flight_uploads: int):
+        super().__init__(bucket_name=bucket_name, prefix=prefix)
+        self.spool_root: str = spool_dir
+        self.spool_dir: str = ""
+        self.max_in_flight_uploads: int = max_in_flight_uploads
+        # chain status based on the response statuses collected so far
+        self.chain_statuses: Dict[str, str] = {}
+        self.content_hashes: Dict[str, Any] = {}
+        self.in_flight: Dict[str, Deferred] = {}
+        self.success_count: int = 0
+        self.failure_count: int = 0
+        self.thread_pool = ThreadPool(minthreads=0, maxthreads=self.MAX_UPLOAD_WORKERS, name="s3_upload")
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        spider = crawler.spider
+        settings = crawler.settings
+
+        pipeline = cls(
+            bucket_name=spider.storage_bucket,
+            prefix=spider.storage_prefix,
+            spool_dir=settings.get("S3_SPOOL_DIR") or cls.DEFAULT_SPOOL_DIR,
+            max_in_flight_uploads=settings.getint("S3_MAX_IN_FLIGHT_UPLOADS", cls.MAX_UPLOAD_WORKERS),
+        )
+        pipeline.crawler = crawler
+
+        crawler.signals.connect(pipeline.spider_closed, signals.spider_closed)
+        return pipeline
+
+    def open_spider(self, spider=None):
+        os.makedirs(self.spool_root, exist_ok=True)
+        self.spool_dir = tempfile.mkdtemp(prefix=f"{self.crawler.spider.name}_", dir=self.spool_root)
+        self.thread_pool.start()
+
+    async def process_item(self, item: ResponseObject, spider=None):
+        spider = self.crawler.spider
+        object_hash = item.object_hash
+        # a late item of a chain must not be appended while the spool file is being uploaded
+        while object_hash in self.in_flight:
+            await self._wait_for(self.in_flight[object_hash])
+
+        item_dict = item.model_dump()
+        self._append_to_spool(object_hash, item_dict)
+        self.update_content_hash(self.content_hashes.setdefault(object_hash, hashlib.sha256()), item_dict)
+
+        if item.status != 200 or self.chain_statuses.get(object_hash) == "failure":
+            self.chain_statuses[object_hash] = "failure"
+        else:
+            self.chain_statuses[object_hash] = "success"
+
+        if not spider.is_chain_complete(item):
+            return item
+
+        upload = self._complete_chain(spider, object_hash)
+        if upload is not None and len(self.in_flight) > self.max_in_flight_uploads:
+            # backpressure: hold the item until its own upload is done
+            await self._wait_for(upload)
+
+        return item
+
+    @staticmethod
+    async def _wait_for(upload: Deferred) -> None:
+        """Wait for an upload without consuming its result."""
+        waiter: Deferred = Deferred()
+
+        def release(result):
+            waiter.callback(None)
+            return result
+
+        upload.addBoth(release)
+        await maybe_deferred_to_future(waiter)
+
+    def get_spool_path(self, object_hash: str) -> str:
+        return os.path.join(self.spool_dir, f"{object_hash}.jsonl.gz")
+
+    def _append_to_spool(self, object_hash: str, item: Dict[str, Any]) -> None:
+        """
+        Append an item to the spool file of its chain.
+
+        Every append writes a separate gzip member, the concatenation is still a valid gzip file.
+        """
+        line = json.dumps(item, default=str, ensure_ascii=False) + "\n"
+        with gzip.open(self.get_spool_path(object_hash), mode="ab") as gz:
+            gz.write(line.encode("utf-8"))
+
+    def _complete_chain(self, spider, object_hash: str) -> Optional[Deferred]:
+        """Record the content hash of a chain and start its upload, unless the stored content is the same."""
+        content_hash = self.content_hashes.pop(object_hash).hexdigest()
+        spider.set_chain_content_hash(object_hash, content_hash)
+
+        if self.chain_statuses[object_hash] == "success" and spider.is_content_unchanged(object_hash, content_hash):
+            self.chain_statuses.pop(object_hash)
+            spider.set_chain_status(object_hash, "unchanged")
+            os.remove(self.get_spool_path(object_hash))
+            return None
+
+        return self._start_chain_upload(spider, object_hash)
+
+    def _start_chain_upload(self, spider, object_hash: str) -> Deferred:
+        from twisted.internet import reactor
+
+        upload = deferToThreadPool(reactor, self.thread_pool, self._upload_spooled_chain, object_hash)
+        upload.addCallbacks(
+            lambda _: self._handle_upload_success(spider, object_hash),
+            lambda failure: self._handle_upload_failure(spider, object_hash, failure),
+        )
+        upload.addBoth(self._remove_from_in_flight, object_hash)
+        self.in_flight[object_hash] = upload
+        return upload
+
+    def _remove_from_in_flight(self, _, object_hash: str) -> None:
+        # must not return the popped deferred, it would be chained to itself
+        self.in_flight.pop(object_hash, None)
+
+    def _upload_spooled_chain(self, object_hash: str) -> None:
+        """Upload the spool file of a chain to S3 with retry logic."""
+        spool_path = self.get_spool_path(object_hash)
+        s3_key = self.get_s3_key(object_hash)
+
+        def upload() -> None:
+            with metrics.timer("pricera_s3_upload_seconds"):
+                self.object_store.upload_file(spool_path, self.bucket, s3_key, content_type="application/gzip")
+            metrics.inc("pricera_s3_upload_bytes_total", os.path.getsize(spool_path) if metrics.is_enabled() else 0)
+            self.logger.debug("Successfully uploaded chain %s to s3://%s/%s", object_hash, self.bucket, s3_key)
+
+        self._upload_with_retries(upload, object_hash)
+
+    def _handle_upload_success(self, spider, object_hash: str) -> None:
+        self.success_count += 1
+        spider.set_chain_status(object_hash, self.chain_statuses.pop(object_hash, "failure"))
+
+    def _handle_upload_failure(self, spider, object_hash: str, failure) -> None:
+        self.failure_count += 1
+        self.chain_statuses.pop(object_hash, None)
+        self.logger.error("Chain %s failed to upload: %s", object_hash, failure.value)
+        spider.set_chain_status(object_hash, "failure")
+
+    async def spider_closed(self, spider, reason) -> None:
+        """
+        Called when the spider is closed — uploads chains that were never reported complete
+        and waits for every in-flight upload.
+        """
+        for object_hash in list(self.chain_statuses):
+            if object_hash not in self.in_flight:
+                self._complete_chain(spider, object_hash)
+
+        await maybe_deferred_to_future(DeferredList(list(self.in_flight.values()), consumeErrors=True))
+        self._finish()
+
+    def _finish(self) -> None:
+        self.thread_pool.stop()
+        self._log_upload_summary(self.success_count, self.failure_count)
+        # spool files of failed chains are kept for inspection
+        if self.failure_count == 0:
+            shutil.rmtree(self.spool_dir, ignore_errors=True)
+        else:
+            self.logger.warning("Spool files of failed chains are kept in %s", self.spool_dir)
+
+    def _log_upload_summary(self, success_count: int, failure_count: int) -> None:
+        total_chains = success_count + failure_count
+
+        if failure_count == 0:
+            self.logger.info("All %d chains successfully uploaded to S3", total_chains)
+        else:
+            self.logger.error(
+                "Upload completed: %d successful, %d failed out of %d total chains",
+                success_count,
+                failure_count,
+                total_chains,
+            )
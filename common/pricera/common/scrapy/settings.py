@@ -1,2 +1,3 @@
 ROBOTSTXT_OBEY = False
 TELNETCONSOLE_ENABLED = False
+STATS_CLASS = "pricera.common.scrapy.stats_collectors.MetricsStatsCollector"
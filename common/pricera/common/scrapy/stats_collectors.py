@@ -0,0 +1,17 @@
+__all__ = ["MetricsStatsCollector"]
+
+from scrapy.statscollectors import MemoryStatsCollector
+
+from pricera.common import metrics
+
+STATUS_COUNT_PREFIX = "downloader/response_status_count/"
+
+
+class MetricsStatsCollector(MemoryStatsCollector):
+    """Scrapy stats collector also counting the response status codes in the metrics, when they are enabled."""
+
+    def inc_value(self, key, count=1, start=0, spider=None) -> None:
+        super().inc_value(key, count, start)
+        if metrics.is_enabled() and key.startswith(STATUS_COUNT_PREFIX):
+            spider_name = getattr(self._crawler.spider, "name", None) if self._crawler else None
+            metrics.inc("pricera_responses_total", count, spider=spider_name, status=key[len(STATUS_COUNT_PREFIX) :])
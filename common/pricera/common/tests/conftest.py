@@ -0,0 +1,10 @@
+import pytest
+
+from pricera.common.collectors import CrawlWorker
+
+
+@pytest.fixture(scope="session", autouse=True)
+def crawl_worker():
+    """The reactor can't be restarted, so the test modules share one crawl worker, stopped after the last of them."""
+    yield
+    CrawlWorker.stop()
@@ -0,0 +1,165 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from scrapy import Spider
+from scrapy.core.downloader import Slot
+from scrapy.http import Request, Response
+from scrapy.utils.test import get_crawler
+
+from pricera.common.scrapy import AdaptiveConcurrencyMiddleware
+
+MODULE = "pricera.common.scrapy.downloader_middlewares.adaptive_concurrency"
+
+
+class TestAdaptiveConcurrencyMiddleware(unittest.TestCase):
+    def setUp(self):
+        self.crawler = get_crawler(
+            Spider,
+            settings_dict={"CONCURRENT_REQUESTS": 16, "CONCURRENT_REQUESTS_PER_DOMAIN": 4, "DOWNLOAD_DELAY": 0},
+        )
+        self.crawler.stats.open_spider()
+        self.slot = Slot(concurrency=4, delay=0)
+        self.slot.lastseen = 100.0
+        self.crawler.engine = MagicMock()
+        self.crawler.engine.downloader.slots = {"example.com": self.slot}
+        self.middleware = AdaptiveConcurrencyMiddleware.from_crawler(self.crawler)
+        self.now = 100.0
+        patcher = patch(f"{MODULE}.time.monotonic", side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch.object(self.middleware, "schedule_resume")
+        self.schedule_resume = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def respond(self, status: int = 200, latency: float = 0.1, headers: dict = None, meta: dict = None) -> Response:
+        meta = {"download_slot": "example.com", "download_latency": latency, **(meta or {})}
+        request = Request("https://example.com/", meta=meta)
+        response = Response(request.url, status=status, headers=headers, request=request)
+        return self.middleware.process_response(request, response)
+
+    def get_release_time(self) -> float:
+        """When the downloader sends the next request of the slot."""
+        return self.slot.lastseen + self.slot.download_delay()
+
+    def wait_pause(self) -> None:
+        self.now = self.middleware.slot_states["example.com"].paused_until
+        self.middleware.resume("example.com")
+
+    def test_concurrency_increases_additively(self):
+        for _ in range(12):
+            self.respond()
+
+        self.assertEqual(6, self.slot.concurrency)
+        self.assertEqual(12, self.crawler.stats.get_value("adaptive_concurrency/increase"))
+        self.assertEqual(6, self.crawler.stats.get_value("adaptive_concurrency/example.com/concurrency"))
+
+    def test_concurrency_is_bounded(self):
+        for _ in range(500):
+            self.respond()
+        self.assertEqual(16, self.slot.concurrency)
+
+        for _ in range(10):
+            self.now += 1
+            self.respond(status=503)
+        self.assertEqual(1, self.slot.concurrency)
+
+    def test_throttling_pauses_the_slot_for_retry_after(self):
+        self.respond()
+        response = self.respond(status=429, headers={"Retry-After": "5"})
+        # the requests sent before the pause are throttled too
+        self.respond(status=429, headers={"Retry-After": "5"})
+
+        self.assertEqual(429, response.status)
+        self.assertEqual(2, self.slot.concurrency)
+        self.assertAlmostEqual(105, self.get_release_time(), delta=0.1)
+        self.schedule_resume.assert_called_once_with("example.com", 5)
+        self.assertEqual(1, self.crawler.stats.get_value("adaptive_concurrency/pause"))
+        self.assertEqual(1, self.crawler.stats.get_value("adaptive_concurrency/decrease/throttled"))
+        self.assertEqual(2, self.crawler.stats.get_value("adaptive_concurrency/retry_after"))
+
+        self.now += 1
+        self.respond()
+        self.assertAlmostEqual(105, self.get_release_time(), delta=0.1)
+
+        # the decrease doubled the delay from its step, the response during the pause took a step off
+        self.wait_pause()
+        self.assertAlmostEqual(0.1, self.slot.delay)
+
+    def test_pause_is_not_released_early(self):
+        AdaptiveConcurrencyMiddleware.set_jitter(self.slot, 0.5)
+        self.slot.lastseen = 99.5
+        self.respond()
+        self.respond(status=429, headers={"Retry-After": "5"})
+
+        # neither the randomization of the delay nor the request sent before the pause release it early
+        for _ in range(100):
+            self.assertGreaterEqual(self.get_release_time(), 105)
+
+        self.wait_pause()
+        self.assertAlmostEqual(0.2, self.slot.delay)
+        self.assertEqual(0.5, AdaptiveConcurrencyMiddleware.get_jitter(self.slot))
+
+    def test_delay_increases_multiplicatively_and_decreases_additively(self):
+        delays = []
+        for _ in range(3):
+            self.now += 1
+            self.respond(status=503)
+            delays.append(self.slot.delay)
+        self.assertEqual([0.2, 0.4, 0.8], delays)
+
+        for _ in range(3):
+            self.respond()
+        self.assertAlmostEqual(0.5, self.slot.delay)
+
+        for _ in range(10):
+            self.respond()
+        self.assertEqual(0, self.slot.delay)
+
+        for _ in range(20):
+            self.now += 1
+            self.respond(status=503)
+        self.assertEqual(60, self.slot.delay)
+        self.assertEqual(60, self.crawler.stats.get_value("adaptive_concurrency/example.com/max_delay"))
+
+    def test_ban_of_a_pool_proxy_leaves_the_slot_alone(self):
+        meta = {"proxy_pool_proxy": "http://10.0.0.1:8080"}
+        self.respond()
+        self.respond(status=429, headers={"Retry-After": "5"}, meta=meta)
+        self.middleware.process_exception(Request("https://example.com/", meta=meta), TimeoutError())
+
+        self.assertEqual(4, self.slot.concurrency)
+        self.assertEqual(0, self.slot.delay)
+        self.schedule_resume.assert_not_called()
+        self.assertEqual(1, self.crawler.stats.get_value("adaptive_concurrency/proxy_ban"))
+        self.assertEqual(1, self.crawler.stats.get_value("adaptive_concurrency/proxy_failure"))
+        self.assertIsNone(self.crawler.stats.get_value("adaptive_concurrency/pause"))
+
+    def test_repeated_throttling_doubles_the_backoff(self):
+        pauses = []
+        for _ in range(3):
+            self.respond(status=403)
+            pauses.append(self.schedule_resume.call_args.args[1])
+            self.wait_pause()
+
+        self.assertEqual([0.25, 0.5, 1.0], pauses)
+
+    def test_high_latency_decreases_concurrency(self):
+        for _ in range(4):
+            self.respond(latency=0.1)
+        concurrency = self.slot.concurrency
+
+        self.now += 1
+        for _ in range(3):
+            self.respond(latency=2.0)
+
+        self.assertLess(self.slot.concurrency, concurrency)
+        self.assertEqual(1, self.crawler.stats.get_value("adaptive_concurrency/decrease/latency"))
+
+    def test_retry_after_as_http_date(self):
+        response = Response("https://example.com/", headers={"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})
+        self.assertEqual(0, AdaptiveConcurrencyMiddleware.get_retry_after(response))
+        self.assertIsNone(AdaptiveConcurrencyMiddleware.get_retry_after(Response("https://example.com/")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import json
+import unittest
+from unittest.mock import MagicMock
+
+from pika.spec import Basic
+
+from pricera.common.collectors import BatchPublisher
+from pricera.common.collectors.publisher import build_messages
+
+
+def confirmation(method_cls, delivery_tag: int, multiple: bool = False) -> MagicMock:
+    return MagicMock(method=method_cls(delivery_tag=delivery_tag, multiple=multiple))
+
+
+class TestBatchPublisher(unittest.TestCase):
+    def setUp(self):
+        self.publisher = BatchPublisher(
+            connection_parameters=MagicMock(), queue="crawler_queue", confirm_window=2, max_publish_attempts=2
+        )
+        self.publisher.connection = MagicMock()
+        self.channel = MagicMock()
+        self.publisher._on_channel_open(self.channel)
+
+    def published_payloads(self) -> list[list[str]]:
+        return [
+            json.loads(call.kwargs["body"])["payload"]["rozetka_product"]
+            for call in self.channel.basic_publish.call_args_list
+        ]
+
+    def test_build_messages_chunks_urls(self):
+        messages = build_messages(iter(["url_1", "url_2", "url_3"]), payload_key="rozetka_product", urls_per_message=2)
+
+        self.assertEqual(
+            [{"payload": {"rozetka_product": ["url_1", "url_2"]}}, {"payload": {"rozetka_product": ["url_3"]}}],
+            list(messages),
+        )
+
+    def test_outstanding_messages_are_bounded_by_confirm_window(self):
+        urls = (f"url_{index}" for index in range(1, 6))
+        self.publisher._messages = (
+            json.dumps(message).encode()
+            for message in build_messages(urls, payload_key="rozetka_product", urls_per_message=1)
+        )
+
+        self.channel.queue_declare.call_args.kwargs["callback"](None)
+        self.assertEqual([["url_1"], ["url_2"]], self.published_payloads())
+
+        # one multiple ack confirms both outstanding messages
+        self.publisher._on_delivery_confirmation(confirmation(Basic.Ack, delivery_tag=2, multiple=True))
+        self.assertEqual([["url_1"], ["url_2"], ["url_3"], ["url_4"]], self.published_payloads())
+
+        # a nacked message is retried before new ones, then given up after max_publish_attempts
+        self.publisher._on_delivery_confirmation(confirmation(Basic.Nack, delivery_tag=3))
+        self.publisher._on_delivery_confirmation(confirmation(Basic.Nack, delivery_tag=5))
+        self.assertEqual([["url_3"], ["url_5"]], self.published_payloads()[4:])
+
+        self.channel.close.assert_not_called()
+        self.publisher._on_delivery_confirmation(confirmation(Basic.Ack, delivery_tag=4))
+        self.publisher._on_delivery_confirmation(confirmation(Basic.Ack, delivery_tag=6))
+
+        self.assertEqual((4, 1), (self.publisher.result.published, self.publisher.result.failed))
+        self.assertEqual([{"payload": {"rozetka_product": ["url_3"]}}], self.publisher.result.failed_messages)
+        self.channel.close.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import sys
+import unittest
+from importlib.metadata import EntryPoint
+from unittest.mock import MagicMock, patch
+
+from pricera.common.collectors.registry import CollectorRegistry
+
+PARSER_SPEC = "pricera.rozetka.rozetka_product_parser:RozetkaProductBatchParser"
+
+
+class TestCollectorRegistry(unittest.TestCase):
+    def test_collectors_are_imported_on_first_use(self):
+        registry = CollectorRegistry("pricera.test", specs={"rozetka_product": PARSER_SPEC, "other": "missing:Missing"})
+        callback = MagicMock()
+        registry.add_load_callback(callback)
+
+        self.assertEqual(["rozetka_product", "other"], list(registry))
+        self.assertIsNone(registry.get("unknown"))
+        collector_cls = registry["rozetka_product"]
+
+        self.assertEqual("RozetkaProductBatchParser", collector_cls.__name__)
+        self.assertIs(collector_cls, registry.get("rozetka_product"))
+        self.assertIn("pricera.rozetka.rozetka_product_parser", sys.modules)
+        callback.assert_called_once_with(collector_cls)
+
+        registry.remove_load_callback(callback)
+        with self.assertRaises(ModuleNotFoundError):
+            registry["other"]
+
+    def test_collectors_are_declared_by_entry_points(self):
+        declared = [EntryPoint(name="rozetka_product", value=PARSER_SPEC, group="pricera.test")]
+        with patch("pricera.common.collectors.registry.entry_points", return_value=declared) as entry_points:
+            registry = CollectorRegistry("pricera.test")
+            self.assertEqual(["rozetka_product"], list(registry))
+            self.assertEqual(1, len(registry))
+
+        entry_points.assert_called_once_with(group="pricera.test")
+        self.assertEqual("RozetkaProductBatchParser", registry["rozetka_product"].__name__)
+
+    def test_loaded_collectors_are_passed_to_new_callbacks_once(self):
+        registry = CollectorRegistry("pricera.test", specs={"first": PARSER_SPEC, "second": PARSER_SPEC})
+        registry["first"], registry["second"]
+        callback = MagicMock()
+
+        registry.add_load_callback(callback)
+
+        callback.assert_called_once_with(registry["first"])
+
+
+if __name__ == "__main__":
+    unittest.main()
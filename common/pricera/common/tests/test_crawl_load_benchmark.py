@@ -0,0 +1,68 @@
+import json
+import tempfile
+import unittest
+import urllib.error
+import urllib.request
+
+from pricera.common.benchmarks.crawl_load_benchmark import (
+    SCRAPY_DOWNLOAD_HANDLERS,
+    get_load_test_cases,
+    run_load_test,
+    get_stand_in_server,
+)
+from pricera.common.benchmarks.stand_in_server import FaultConfig
+from pricera.common.object_store import LocalObjectStore, set_object_store
+
+
+class TestStandInServer(unittest.TestCase):
+    def test_recorded_responses_are_replayed(self):
+        with get_stand_in_server(FaultConfig()) as server:
+            with urllib.request.urlopen(f"{server.url}/v1/api/product/details?ids=1,2", timeout=5) as response:
+                products = json.load(response)["data"]
+            with urllib.request.urlopen(f"{server.url}/ua/any/item/", timeout=5) as response:
+                page = response.read().decode("utf-8")
+
+        self.assertEqual([1, 2], [product["id"] for product in products])
+        self.assertTrue(all("price" in product for product in products))
+        self.assertIn("<html", page.lower())
+
+    def test_throttled_responses_have_retry_after(self):
+        with get_stand_in_server(FaultConfig(throttle_rate=1, retry_after_seconds=3)) as server:
+            with self.assertRaises(urllib.error.HTTPError) as context:
+                urllib.request.urlopen(f"{server.url}/ua/any/item/", timeout=5)
+
+        self.assertEqual(429, context.exception.code)
+        self.assertEqual("3", context.exception.headers["Retry-After"])
+        self.assertEqual({429: 1}, dict(server.status_counts))
+
+
+class TestCrawlLoadBenchmark(unittest.TestCase):
+    def test_spider_is_load_tested(self):
+        with (
+            get_stand_in_server(FaultConfig(latency_ms=1)) as server,
+            tempfile.TemporaryDirectory() as object_store_dir,
+            tempfile.TemporaryDirectory() as spool_dir,
+        ):
+            set_object_store(LocalObjectStore(root_dir=object_store_dir))
+            self.addCleanup(set_object_store, None)
+            result = run_load_test(
+                get_load_test_cases()["rozetka_product"],
+                server.url,
+                concurrency=2,
+                urls=25,
+                spool_dir=spool_dir,
+                # the impersonating handler is covered by the real crawls, the test measures the harness
+                extra_settings={"DOWNLOAD_HANDLERS": SCRAPY_DOWNLOAD_HANDLERS},
+            )
+
+        self.assertEqual(3, result.requests)
+        self.assertEqual({"200": 3}, result.status_counts)
+        self.assertEqual(25, result.items)
+        self.assertGreater(result.requests_per_second, 0)
+        self.assertLessEqual(result.p50_ms, result.p99_ms)
+        self.assertGreater(result.peak_rss_mb, 0)
+        self.assertGreaterEqual(result.rss_increase_mb, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+from unittest.mock import patch
+
+from scrapy import Spider
+
+from pricera.common.collectors import CrawlWorker
+
+
+class EmptySpider(Spider):
+    name = "empty_spider"
+    start_urls = []
+
+    def closed(self, reason):
+        self.crawler.stats.set_value("custom_status", {self.object_hash: "success"})
+
+
+class TestCrawlWorker(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # the reactor can't be restarted, the worker is shared by the test modules and stopped by conftest.py
+        cls.worker = CrawlWorker.start()
+
+    def test_start_is_idempotent(self):
+        self.assertIs(self.worker, CrawlWorker.start())
+        self.assertTrue(CrawlWorker.is_running())
+
+    def test_stopped_worker_is_not_restarted(self):
+        with patch.object(CrawlWorker, "_instance", None), patch.object(CrawlWorker, "_stopped", True):
+            with self.assertRaises(RuntimeError):
+                CrawlWorker.start()
+
+    def test_reactor_is_reused_across_crawls(self):
+        for object_hash in ["hash_1", "hash_2", "hash_3"]:
+            result = self.worker.crawl(EmptySpider, object_hash=object_hash)
+
+            self.assertIsNone(result.error)
+            self.assertIsInstance(result.spider, EmptySpider)
+            self.assertEqual({object_hash: "success"}, result.custom_status)
+
+
+if __name__ == "__main__":
+    unittest.main()
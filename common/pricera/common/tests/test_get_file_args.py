@@ -1,3 +1,4 @@
+import subprocess
 import unittest
 from unittest.mock import patch
 import sys
@@ -71,6 +72,29 @@ class TestGetFileArgs(unittest.TestCase):
             with self.assertRaises(SystemExit):
                 get_launcher_args()
 
+    def test_prefetch_fits_a_batch_by_default(self):
+        test_args = ["prog", "--rabbitmq", "--pipeline_type", "parse", "--batch_urls", "50", "--consumer_workers", "2"]
+        with patch.object(sys, "argv", test_args):
+            self.assertEqual(100, get_launcher_args().prefetch_count)
+
+        with patch.object(sys, "argv", ["prog", "--rabbitmq", "--pipeline_type", "parse"]):
+            self.assertEqual(1, get_launcher_args().prefetch_count)
+
+    def test_prefetch_lower_than_batch_should_fail(self):
+        test_args = ["prog", "--rabbitmq", "--pipeline_type", "parse", "--batch_urls", "50", "--prefetch_count", "10"]
+        with patch.object(sys, "argv", test_args):
+            with self.assertRaises(SystemExit):
+                get_launcher_args()
+
+    def test_launcher_import_leaves_out_the_heavy_dependencies(self):
+        # a fresh interpreter, the test process has imported everything already
+        code = (
+            "import sys, pricera.common.pipelines.launcher; "
+            "print(sorted(m for m in ('boto3', 'pika', 'pydantic', 'pymongo', 'scrapy') if m in sys.modules))"
+        )
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        self.assertEqual("[]", result.stdout.strip())
+
 
 if __name__ == "__main__":
     unittest.main()
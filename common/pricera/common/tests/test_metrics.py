@@ -0,0 +1,83 @@
+import unittest
+import urllib.error
+import urllib.request
+from unittest.mock import patch
+
+from scrapy.utils.test import get_crawler
+
+from pricera.common import metrics
+from pricera.common.collectors.base_collector import measure_download
+from pricera.common.metrics import MetricsRegistry
+from pricera.common.scrapy.stats_collectors import MetricsStatsCollector
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    def test_counters_and_histograms_are_rendered(self):
+        registry = MetricsRegistry(buckets=(0.1, 1.0))
+        registry.inc("pricera_messages_consumed_total", pipeline="crawl")
+        registry.inc("pricera_messages_consumed_total", 2, pipeline="crawl")
+        registry.observe("pricera_parse_seconds", 0.05, collector="Parser")
+        registry.observe("pricera_parse_seconds", 5, collector="Parser")
+
+        lines = registry.render().splitlines()
+
+        self.assertIn("# TYPE pricera_messages_consumed_total counter", lines)
+        self.assertIn('pricera_messages_consumed_total{pipeline="crawl"} 3', lines)
+        self.assertIn('pricera_parse_seconds_bucket{collector="Parser",le="0.1"} 1', lines)
+        self.assertIn('pricera_parse_seconds_bucket{collector="Parser",le="1.0"} 1', lines)
+        self.assertIn('pricera_parse_seconds_bucket{collector="Parser",le="+Inf"} 2', lines)
+        self.assertIn('pricera_parse_seconds_sum{collector="Parser"} 5.05', lines)
+        self.assertIn('pricera_parse_seconds_count{collector="Parser"} 2', lines)
+
+    def test_unknown_metrics_are_rejected(self):
+        with self.assertRaises(KeyError):
+            MetricsRegistry().inc("unknown_total")
+
+
+class TestMetricsServer(unittest.TestCase):
+    def tearDown(self):
+        metrics.stop_metrics_server()
+
+    def test_disabled_metrics_are_no_ops(self):
+        self.assertFalse(metrics.is_enabled())
+        metrics.inc("unknown_total")
+        with metrics.timer("unknown_seconds"):
+            pass
+
+    def test_metrics_are_served(self):
+        metrics.start_metrics_server(port=0)
+        port = metrics._server.server_address[1]
+
+        with metrics.timer("pricera_mongo_bulk_write_seconds", collection="product"):
+            pass
+        stats = MetricsStatsCollector(get_crawler())
+        stats.inc_value("downloader/response_status_count/503")
+        stats.inc_value("item_scraped_count")
+
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+            body = response.read().decode("utf-8")
+
+        self.assertIn('pricera_mongo_bulk_write_seconds_count{collection="product"} 1', body)
+        self.assertIn('pricera_responses_total{spider="None",status="503"} 1', body)
+        self.assertEqual(1, stats.get_value("downloader/response_status_count/503"))
+        with self.assertRaises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/other", timeout=5)
+
+    def test_download_time_leaves_out_the_consumer(self):
+        registry = metrics.start_metrics_server(port=0)
+        self.now = 0.0
+
+        def read_lines():
+            for line in ["first", "second"]:
+                self.now += 1
+                yield line
+
+        with patch("pricera.common.collectors.base_collector.time.perf_counter", side_effect=lambda: self.now):
+            for _ in measure_download(read_lines(), open_seconds=0.5):
+                self.now += 10
+
+        self.assertIn("pricera_s3_download_seconds_sum 2.5", registry.render().splitlines())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import threading
+import unittest
+from unittest.mock import MagicMock
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from pricera.common.mongo_write_buffer import MongoWriteBuffer
+
+
+def get_operations(*urls: str) -> list[UpdateOne]:
+    return [UpdateOne(filter={"product_url": url}, update={"$set": {"price": 1}}, upsert=True) for url in urls]
+
+
+class TestMongoWriteBuffer(unittest.TestCase):
+    def setUp(self):
+        self.collection = MagicMock()
+
+    def tearDown(self):
+        MongoWriteBuffer.stop()
+
+    def test_concurrent_writes_are_flushed_together_by_size(self):
+        buffer = MongoWriteBuffer.start(max_batch_size=4, max_latency_ms=60_000)
+        threads = [
+            threading.Thread(target=buffer.write, args=(self.collection, get_operations(f"url_{i}_1", f"url_{i}_2")))
+            for i in range(2)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=5)
+
+        self.assertFalse(any(thread.is_alive() for thread in threads))
+        self.collection.bulk_write.assert_called_once()
+        (operations,) = self.collection.bulk_write.call_args.args
+        self.assertEqual(4, len(operations))
+        self.assertFalse(self.collection.bulk_write.call_args.kwargs["ordered"])
+
+    def test_writes_are_flushed_by_latency(self):
+        buffer = MongoWriteBuffer.start(max_batch_size=1000, max_latency_ms=10)
+
+        buffer.write(self.collection, get_operations("url_1"))
+
+        self.collection.bulk_write.assert_called_once()
+
+    def test_failed_flush_is_raised_to_every_writer(self):
+        self.collection.bulk_write.side_effect = BulkWriteError({"writeErrors": []})
+        buffer = MongoWriteBuffer.start(max_batch_size=2, max_latency_ms=60_000)
+
+        first_future = buffer.submit(self.collection, get_operations("url_1"))
+        second_future = buffer.submit(self.collection, get_operations("url_2"))
+
+        self.assertIsInstance(first_future.exception(timeout=5), BulkWriteError)
+        self.assertIsInstance(second_future.exception(timeout=5), BulkWriteError)
+
+    def test_pending_writes_are_flushed_on_stop(self):
+        buffer = MongoWriteBuffer.start(max_batch_size=1000, max_latency_ms=60_000)
+        future = buffer.submit(self.collection, get_operations("url_1"))
+
+        MongoWriteBuffer.stop()
+
+        self.assertIsNone(future.result(timeout=0))
+        self.collection.bulk_write.assert_called_once()
+        with self.assertRaises(RuntimeError):
+            buffer.submit(self.collection, get_operations("url_2"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+from typing import ClassVar
+from unittest.mock import MagicMock
+
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from pricera.common.collectors import BaseCollector
+from pricera.common.mongodb import ensure_indexes, find_unindexed_queries, get_collection_indexes
+
+
+class ProductMixin:
+    collection_name: ClassVar[str] = "product"
+    collector_name: ClassVar[str] = "product"
+    db_url_field: ClassVar[str] = "product_url"
+    indexes: ClassVar[dict[str, list[IndexModel]]] = {
+        "product": [IndexModel([("product_url", ASCENDING)], name="product_url")],
+    }
+
+
+class ProductCrawler(BaseCollector, ProductMixin):
+    ...
+
+
+class ProductParser(BaseCollector, ProductMixin):
+    ...
+
+
+class IndexlessCollector(BaseCollector):
+    ...
+
+
+def get_explain_output(stage: str) -> dict:
+    return {"queryPlanner": {"winningPlan": {"stage": "FETCH", "inputStage": {"stage": stage}}}}
+
+
+class TestMongoIndexes(unittest.TestCase):
+    def setUp(self):
+        self.mongo_client = MagicMock()
+        self.collection = self.mongo_client["pricera"]["product"]
+        self.collector_classes = [ProductCrawler, ProductParser, IndexlessCollector]
+
+    def test_indexes_are_grouped_by_collection(self):
+        ((collection_key, indexes),) = get_collection_indexes(self.collector_classes).items()
+
+        self.assertEqual(("pricera", "product"), collection_key)
+        self.assertEqual(["product_url"], [index.document["name"] for index in indexes])
+
+    def test_ensure_indexes_tolerates_failures(self):
+        self.collection.create_indexes.side_effect = OperationFailure("Index already exists with different options")
+
+        ensure_indexes(self.mongo_client, self.collector_classes)
+
+        self.collection.create_indexes.assert_called_once()
+
+    def test_collection_scans_are_reported(self):
+        self.collection.find.return_value.explain.side_effect = [
+            get_explain_output("IXSCAN"),
+            get_explain_output("COLLSCAN"),
+            get_explain_output("IXSCAN"),
+        ]
+
+        unindexed_queries = find_unindexed_queries(self.mongo_client, [ProductCrawler, IndexlessCollector])
+
+        self.assertEqual(["ProductCrawler urls with crawl status"], unindexed_queries)
+        self.assertEqual({"product_url": "https://example.com/"}, self.collection.find.call_args_list[0].args[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import gzip
+import io
+import tempfile
+import unittest
+from functools import partial
+from unittest.mock import patch
+
+from pricera.common.collectors import BaseCollector
+from pricera.common.object_store import LocalObjectStore, get_object_store, set_object_store
+from pricera.common.utilities import iter_stream_lines
+
+
+class TestLocalObjectStore(unittest.TestCase):
+    def setUp(self):
+        self.root_dir = tempfile.TemporaryDirectory()
+        self.object_store = LocalObjectStore(root_dir=self.root_dir.name)
+        set_object_store(self.object_store)
+
+    def tearDown(self):
+        set_object_store(None)
+        self.root_dir.cleanup()
+
+    def test_uploaded_object_is_loaded_by_collector(self):
+        self.object_store.upload_fileobj(
+            io.BytesIO(gzip.compress(b'{"status": 200}\n')), "bucket", "prefix/chain.jsonl.gz"
+        )
+
+        self.assertIs(self.object_store, get_object_store())
+        self.assertEqual(
+            '{"status": 200}\n',
+            BaseCollector.load_file_from_s3(bucket="bucket", prefix="prefix/", filename="chain.jsonl.gz"),
+        )
+
+    def test_lines_are_streamed_across_gzip_members_and_chunks(self):
+        first_member, second_member = gzip.compress(b'{"n": 1}\n{"n"'), gzip.compress(b': 2}\n\n{"n": 3}')
+        self.object_store.upload_fileobj(io.BytesIO(first_member + second_member), "bucket", "prefix/chain.jsonl.gz")
+
+        with patch(
+            "pricera.common.collectors.base_collector.iter_stream_lines", partial(iter_stream_lines, chunk_size=4)
+        ):
+            lines = list(BaseCollector.iter_lines_from_s3(bucket="bucket", prefix="prefix", filename="chain.jsonl.gz"))
+
+        self.assertEqual(['{"n": 1}', '{"n": 2}', '{"n": 3}'], lines)
+
+    def test_line_spanning_many_chunks(self):
+        long_line = "ї" * 1000
+        stream = io.BytesIO(f"{long_line}\n\nshort\n{long_line}".encode("utf-8"))
+
+        self.assertEqual([long_line, "short", long_line], list(iter_stream_lines(stream, chunk_size=7)))
+
+    def test_missing_object_raises_file_not_found(self):
+        with self.assertRaises(FileNotFoundError):
+            BaseCollector.load_file_from_s3(bucket="bucket", prefix="prefix", filename="missing.jsonl.gz")
+        with self.assertRaises(FileNotFoundError):
+            next(BaseCollector.iter_lines_from_s3(bucket="bucket", prefix="prefix", filename="missing.jsonl.gz"))
+
+
+if __name__ == "__main__":
+    unittest.main()
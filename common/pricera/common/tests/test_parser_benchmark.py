@@ -0,0 +1,61 @@
+import unittest
+
+from pricera.common.benchmarks.parser_benchmark import find_regressions, get_benchmark_cases, run_benchmark
+
+
+class TestParserBenchmark(unittest.TestCase):
+    def test_run_benchmark_on_fixtures(self):
+        result = run_benchmark(get_benchmark_cases()["rozetka_product"], size=5, memory_sample_size=2)
+
+        self.assertEqual(("rozetka_product", 5), (result.parser, result.documents))
+        self.assertGreater(result.docs_per_second, 0)
+        self.assertLessEqual(result.p50_ms, result.p99_ms)
+        self.assertGreater(result.peak_memory_mb, 0)
+
+    def test_find_regressions(self):
+        baseline = [
+            {
+                "parser": "hotline",
+                "documents": 10,
+                "docs_per_second": 100,
+                "p50_ms": 5,
+                "p99_ms": 9,
+                "peak_memory_mb": 2,
+            },
+            {
+                "parser": "rozetka",
+                "documents": 10,
+                "docs_per_second": 100,
+                "p50_ms": 5,
+                "p99_ms": 9,
+                "peak_memory_mb": 2,
+            },
+        ]
+        results = [
+            {
+                "parser": "hotline",
+                "documents": 10,
+                "docs_per_second": 95,
+                "p50_ms": 5.2,
+                "p99_ms": 9,
+                "peak_memory_mb": 2,
+            },
+            {
+                "parser": "rozetka",
+                "documents": 10,
+                "docs_per_second": 50,
+                "p50_ms": 5,
+                "p99_ms": 20,
+                "peak_memory_mb": 2,
+            },
+            {"parser": "rozetka", "documents": 99, "docs_per_second": 1, "p50_ms": 5, "p99_ms": 9, "peak_memory_mb": 2},
+        ]
+
+        regressions = find_regressions(results, baseline, tolerance=0.1)
+
+        self.assertEqual(2, len(regressions))
+        self.assertTrue(all(regression.startswith("rozetka (10 docs)") for regression in regressions))
+
+
+if __name__ == "__main__":
+    unittest.main()
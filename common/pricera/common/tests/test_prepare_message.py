@@ -0,0 +1,86 @@
+import threading
+import unittest
+
+from pricera.common.collectors import BaseCollector
+from pricera.common.pipelines.utilities import prepare_message, process_prepared_messages
+
+
+class SingleCollector(BaseCollector):
+    is_synchronous = True
+
+
+class BatchCollector(BaseCollector):
+    is_synchronous = False
+    max_batch_size = 2
+
+
+class UnboundedBatchCollector(BaseCollector):
+    is_synchronous = False
+
+
+class TestPrepareMessage(unittest.TestCase):
+    def setUp(self):
+        self.collector_mapping = {
+            "single": SingleCollector,
+            "batch": BatchCollector,
+            "unbounded": UnboundedBatchCollector,
+        }
+
+    def test_payload_is_split_by_collector_batch_size(self):
+        message = {
+            "source": {"name": "scheduler"},
+            "payload": {
+                "single": ["url_1", "url_2"],
+                "batch": ["url_3", "url_4", "url_5"],
+                "unbounded": ["url_6", "url_7", "url_8"],
+                "unknown": ["url_9"],
+            },
+        }
+
+        prepared = [
+            (collector_cls, prepared_message["payload"])
+            for collector_cls, prepared_message in prepare_message(self.collector_mapping, message)
+        ]
+
+        self.assertEqual(
+            [
+                (SingleCollector, {"single": "url_1"}),
+                (SingleCollector, {"single": "url_2"}),
+                (BatchCollector, {"batch": ["url_3", "url_4"]}),
+                (BatchCollector, {"batch": ["url_5"]}),
+                (UnboundedBatchCollector, {"unbounded": ["url_6", "url_7", "url_8"]}),
+            ],
+            prepared,
+        )
+
+    def test_prepared_messages_share_the_envelope(self):
+        message = {"source": {"name": "scheduler"}, "payload": {"batch": ["url_1", "url_2", "url_3"]}}
+
+        prepared_messages = [
+            prepared_message for _, prepared_message in prepare_message(self.collector_mapping, message)
+        ]
+
+        self.assertEqual(2, len(prepared_messages))
+        self.assertTrue(all(prepared["source"] is message["source"] for prepared in prepared_messages))
+        self.assertEqual(["url_1", "url_2", "url_3"], message["payload"]["batch"])
+
+    def test_chunks_are_processed_in_parallel_and_errors_reraised(self):
+        message = {"payload": {"batch": ["url_1", "url_2", "url_3", "url_4", "fail"]}}
+        barrier = threading.Barrier(3, timeout=5)
+        processed = []
+
+        def function(collector_cls, prepared_message):
+            # every chunk waits for the others, so this only passes when they run concurrently
+            barrier.wait()
+            if "fail" in prepared_message["payload"]["batch"]:
+                raise ValueError("chunk failed")
+            processed.extend(prepared_message["payload"]["batch"])
+
+        with self.assertRaises(ValueError):
+            process_prepared_messages(prepare_message(self.collector_mapping, message), function, max_parallel_chunks=3)
+
+        self.assertCountEqual(["url_1", "url_2", "url_3", "url_4"], processed)
+
+
+if __name__ == "__main__":
+    unittest.main()
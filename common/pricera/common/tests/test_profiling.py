@@ -0,0 +1,89 @@
+import os
+import pstats
+import tempfile
+import unittest
+from functools import partial
+from unittest.mock import MagicMock, patch
+
+from pricera.common.collectors import CrawlWorker, ParseExecutor
+from pricera.common.profiling import PROFILE_EVERY_ENV, MessageProfiler
+
+
+def build_payload(message: dict) -> None:
+    message["result"] = [str(value) * 10 for value in range(10_000)]
+
+
+class TestMessageProfiler(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.output_dir.cleanup)
+
+    def get_reports(self) -> list[str]:
+        # the reactor thread of a running crawl worker gets its own report before Python 3.12
+        return sorted(report for report in os.listdir(self.output_dir.name) if ".reactor." not in report)
+
+    def test_sampled_messages_are_profiled(self):
+        profiler = MessageProfiler(sample_every=2, output_dir=self.output_dir.name)
+        messages = [{"id": f"message-{index}", "payload": {"rozetka_product": ["url"]}} for index in range(3)]
+
+        for message in messages:
+            profiler.process(build_payload, message)
+
+        self.assertTrue(all("result" in message for message in messages))
+        reports = self.get_reports()
+        self.assertEqual(4, len(reports))
+        self.assertTrue(all("_rozetka_product_message-" in report for report in reports))
+        self.assertEqual({"message-0", "message-2"}, {report.split("_")[-1].split(".")[0] for report in reports})
+
+        pstats_report = os.path.join(self.output_dir.name, next(r for r in reports if r.endswith(".pstats")))
+        functions = {function_name for _, _, function_name in pstats.Stats(pstats_report).stats}
+        self.assertIn("build_payload", functions)
+
+        allocations_report = next(r for r in reports if r.endswith(".allocations.txt"))
+        with open(os.path.join(self.output_dir.name, allocations_report)) as file:
+            self.assertIn("test_profiling.py", file.read())
+
+    def test_failed_messages_are_profiled_and_re_raised(self):
+        profiler = MessageProfiler(sample_every=1, output_dir=self.output_dir.name)
+
+        with self.assertRaises(ZeroDivisionError):
+            profiler.process(lambda message: 1 / 0, {"payload": {"hotline_item_card": "url"}})
+
+        self.assertEqual(2, len(self.get_reports()))
+
+    def test_work_on_the_reactor_thread_is_profiled(self):
+        from twisted.internet.threads import blockingCallFromThread
+
+        # the reactor can't be restarted, the worker is shared by the test modules and stopped by conftest.py
+        worker = CrawlWorker.start()
+        profiler = MessageProfiler(sample_every=1, output_dir=self.output_dir.name)
+
+        profiler.process(partial(blockingCallFromThread, worker.reactor, build_payload), {"id": "crawl"})
+
+        functions = set()
+        for report in os.listdir(self.output_dir.name):
+            if report.endswith(".pstats"):
+                functions |= {name for _, _, name in pstats.Stats(os.path.join(self.output_dir.name, report)).stats}
+        self.assertIn("build_payload", functions)
+
+    def test_parse_workers_are_noted_in_the_report(self):
+        profiler = MessageProfiler(sample_every=1, output_dir=self.output_dir.name)
+
+        with patch.object(ParseExecutor, "_instance", MagicMock(parse_workers=4)):
+            profiler.process(build_payload, {"id": "parse"})
+
+        allocations_report = next(r for r in self.get_reports() if r.endswith(".allocations.txt"))
+        with open(os.path.join(self.output_dir.name, allocations_report)) as file:
+            self.assertIn("parsing ran on 4 worker processes", file.read())
+
+    def test_profiling_is_configured_by_the_environment(self):
+        with patch.dict(os.environ, {PROFILE_EVERY_ENV: "10"}):
+            self.assertEqual(10, MessageProfiler.from_env().sample_every)
+            self.assertEqual(5, MessageProfiler.from_env(sample_every=5).sample_every)
+
+        with patch.dict(os.environ, {PROFILE_EVERY_ENV: ""}):
+            self.assertIsNone(MessageProfiler.from_env())
+
+
+if __name__ == "__main__":
+    unittest.main()
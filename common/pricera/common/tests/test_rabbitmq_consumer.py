@@ -0,0 +1,153 @@
+import json
+import threading
+import unittest
+from unittest.mock import MagicMock
+
+from pricera.common.collectors import RabbitMQ
+
+
+class FakeConnection:
+    """Runs the thread-safe callbacks on the consuming thread, like BlockingConnection does."""
+
+    def __init__(self):
+        self.is_closed = False
+        self.is_open = True
+        self.callbacks = []
+        self.callback_threads = set()
+
+    def add_callback_threadsafe(self, callback):
+        self.callback_threads.add(threading.current_thread().name)
+        self.callbacks.append(callback)
+
+    def process_data_events(self, time_limit=None):
+        while self.callbacks:
+            self.callbacks.pop(0)()
+
+
+class TestRabbitMQConsumer(unittest.TestCase):
+    def setUp(self):
+        self.consumer = RabbitMQ(host="localhost", prefetch_count=4, max_workers=2)
+        self.consumer.connection = FakeConnection()
+        self.consumer.channel = MagicMock()
+        self.bodies = [
+            json.dumps({"payload": {"foo": ["bar_1"]}}).encode(),
+            json.dumps({"payload": {"fail": ["bar_2"]}}).encode(),
+            b"not a json",
+        ]
+
+        def start_consuming():
+            on_message = self.consumer.channel.basic_consume.call_args.kwargs["on_message_callback"]
+            for delivery_tag, body in enumerate(self.bodies, start=1):
+                method = MagicMock(delivery_tag=delivery_tag, redelivered=False)
+                on_message(self.consumer.channel, method, MagicMock(headers=None), body)
+
+        self.consumer.channel.start_consuming.side_effect = start_consuming
+
+    def test_messages_are_settled_on_the_connection_thread(self):
+        processed = []
+
+        def function(message: dict):
+            if "fail" in message["payload"]:
+                raise ValueError("processing failed")
+            processed.append(message)
+
+        self.consumer.consume(queue="parser_queue", function=function)
+
+        self.assertEqual([{"payload": {"foo": ["bar_1"]}}], processed)
+        self.assertTrue(all(name.startswith("rabbitmq_consumer") for name in self.consumer.connection.callback_threads))
+        self.consumer.channel.basic_ack.assert_called_once_with(delivery_tag=1)
+        self.assertCountEqual(
+            [((), {"delivery_tag": 2, "requeue": True}), ((), {"delivery_tag": 3, "requeue": False})],
+            self.consumer.channel.basic_nack.call_args_list,
+        )
+
+    def test_failing_message_is_requeued_up_to_max_deliveries(self):
+        first_delivery = MagicMock(redelivered=False)
+        redelivery = MagicMock(redelivered=True)
+
+        self.assertTrue(self.consumer.should_requeue(first_delivery, MagicMock(headers=None)))
+        self.assertFalse(self.consumer.should_requeue(redelivery, MagicMock(headers=None)))
+        self.assertTrue(self.consumer.should_requeue(redelivery, MagicMock(headers={"x-delivery-count": 1})))
+        self.assertFalse(self.consumer.should_requeue(redelivery, MagicMock(headers={"x-delivery-count": 2})))
+        self.assertFalse(RabbitMQ(host="localhost", max_deliveries=1).should_requeue(first_delivery, None))
+
+
+class TestRabbitMQBatchConsumer(unittest.TestCase):
+    def setUp(self):
+        self.consumer = RabbitMQ(host="localhost", prefetch_count=10, max_workers=1)
+        self.consumer.connection = FakeConnection()
+        self.consumer.channel = MagicMock()
+        self.deliveries = [
+            (MagicMock(delivery_tag=1), None, json.dumps({"payload": {"foo": ["bar_1", "bar_2"]}}).encode()),
+            (MagicMock(delivery_tag=2), None, json.dumps({"payload": {"foo": "bar_2", "baz": ["qux"]}}).encode()),
+            (MagicMock(delivery_tag=3), None, b"not a json"),
+            (None, None, None),
+            (MagicMock(delivery_tag=4), None, json.dumps({"payload": {"fail": ["bar_3"]}}).encode()),
+            (MagicMock(delivery_tag=5), None, json.dumps({"payload": {"foo": ["bar_4"]}}).encode()),
+            (MagicMock(delivery_tag=6), None, json.dumps({"payload": {"foo": ["bar_5"]}}).encode()),
+            (MagicMock(delivery_tag=7), None, json.dumps({"payload": {"foo": ["bar_6"]}}).encode()),
+        ]
+        self.consumer.channel.consume.return_value = iter(self.deliveries)
+
+    def test_messages_are_merged_into_batches(self):
+        processed = []
+
+        def function(message: dict):
+            if "fail" in message["payload"]:
+                raise ValueError("processing failed")
+            processed.append(message)
+
+        # the second batch fails as a whole and is retried message by message, the last message never fills a batch
+        self.consumer.consume_batches(
+            queue="crawler_queue", function=function, can_batch=bool, max_batch_urls=3, max_wait_ms=60_000
+        )
+
+        self.assertEqual(
+            [
+                {"payload": {"foo": ["bar_1", "bar_2"], "baz": ["qux"]}},
+                {"payload": {"foo": ["bar_4"]}},
+                {"payload": {"foo": ["bar_5"]}},
+            ],
+            processed,
+        )
+        self.assertEqual(
+            [1, 2, 5, 6], sorted(call.kwargs["delivery_tag"] for call in self.consumer.channel.basic_ack.call_args_list)
+        )
+        self.assertEqual(
+            [3, 4], sorted(call.kwargs["delivery_tag"] for call in self.consumer.channel.basic_nack.call_args_list)
+        )
+        self.consumer.channel.cancel.assert_called_once()
+
+    def test_batch_is_flushed_after_max_wait(self):
+        self.consumer.channel.consume.return_value = iter([self.deliveries[5], (None, None, None)])
+        processed = []
+
+        self.consumer.consume_batches(
+            queue="crawler_queue", function=processed.append, can_batch=bool, max_batch_urls=100, max_wait_ms=0
+        )
+
+        self.assertEqual([{"payload": {"foo": ["bar_4"]}}], processed)
+
+    def test_messages_of_single_collectors_are_not_batched(self):
+        single = (MagicMock(delivery_tag=8), None, json.dumps({"payload": {"single": "bar_7"}}).encode())
+        self.consumer.channel.consume.return_value = iter(
+            [self.deliveries[5], single, self.deliveries[6], (None, None, None)]
+        )
+        processed = []
+
+        self.consumer.consume_batches(
+            queue="crawler_queue",
+            function=processed.append,
+            can_batch=lambda payload_key: payload_key != "single",
+            max_batch_urls=2,
+            max_wait_ms=60_000,
+        )
+
+        self.assertEqual([{"payload": {"single": "bar_7"}}, {"payload": {"foo": ["bar_4", "bar_5"]}}], processed)
+        self.assertEqual(
+            [5, 6, 8], sorted(call.kwargs["delivery_tag"] for call in self.consumer.channel.basic_ack.call_args_list)
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
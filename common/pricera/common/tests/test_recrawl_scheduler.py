@@ -0,0 +1,191 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from typing import ClassVar
+from unittest.mock import MagicMock
+
+from pricera.common.collectors import BaseCollector, RecrawlScheduler
+from pricera.common.collectors.publisher import PublishResult
+from pricera.common.collectors.recrawl_scheduler import MongoRequestBudget, RecrawlPolicy, RequestBudget
+
+
+class ProductCrawler(BaseCollector):
+    payload_key: ClassVar[str] = "product"
+    collection_name: ClassVar[str] = "product"
+    collector_name: ClassVar[str] = "product"
+    db_url_field: ClassVar[str] = "product_url"
+    tracked_fields: ClassVar[list[str]] = ["price", "sell_status"]
+    ids_per_request: ClassVar[int] = 2
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeStateCollection:
+    """Single-document stand-in of a Mongo collection for the $set, $inc and $setOnInsert updates."""
+
+    def __init__(self):
+        self.documents: dict[str, dict] = {}
+
+    def find_one(self, filter: dict):
+        document = self.documents.get(filter["_id"])
+        return dict(document) if document is not None else None
+
+    def update_one(self, filter: dict, update: dict, upsert: bool = False):
+        document = self.documents.get(filter["_id"])
+        if document is None:
+            if upsert:
+                self.documents[filter["_id"]] = {"_id": filter["_id"]} | update.get("$setOnInsert", {})
+            return MagicMock(modified_count=0)
+        if any(document.get(key) != value for key, value in filter.items()):
+            return MagicMock(modified_count=0)
+
+        document.update(update.get("$set", {}))
+        for key, value in update.get("$inc", {}).items():
+            document[key] += value
+        return MagicMock(modified_count=1)
+
+
+class TestRecrawlPolicy(unittest.TestCase):
+    def test_interval_follows_observed_changes(self):
+        policy = RecrawlPolicy(
+            initial_interval=timedelta(hours=4), min_interval=timedelta(hours=1), max_interval=timedelta(hours=8)
+        )
+
+        self.assertEqual(4 * 3600, policy.get_next_interval(None, changed=None))
+        self.assertEqual(6 * 3600, policy.get_next_interval(4 * 3600, changed=False))
+        self.assertEqual(8 * 3600, policy.get_next_interval(7 * 3600, changed=False))
+        self.assertEqual(2 * 3600, policy.get_next_interval(4 * 3600, changed=True))
+        self.assertEqual(1 * 3600, policy.get_next_interval(1 * 3600, changed=True))
+
+
+class TestRequestBudget(unittest.TestCase):
+    def test_budget_refills_at_the_hourly_rate(self):
+        clock = FakeClock()
+        budget = RequestBudget(requests_per_hour=3600, burst_seconds=10, clock=clock)
+
+        self.assertEqual(10, budget.get_available())
+        budget.take(10)
+        self.assertEqual(0, budget.get_available())
+
+        clock.now = 4
+        self.assertEqual(4, budget.get_available())
+        clock.now = 100
+        self.assertEqual(10, budget.get_available())
+
+    def test_budget_is_shared_through_mongo(self):
+        now = datetime(2025, 12, 1, tzinfo=timezone.utc)
+        collection = FakeStateCollection()
+
+        def get_budget() -> MongoRequestBudget:
+            return MongoRequestBudget(collection, requests_per_hour=3600, burst_seconds=10, clock=lambda: now)
+
+        # every run of a cron-scheduled scheduler gets a new budget
+        self.assertEqual(10, get_budget().get_available())
+        get_budget().take(10)
+        self.assertEqual(0, get_budget().get_available())
+
+        now += timedelta(seconds=4)
+        first, second = get_budget(), get_budget()
+        self.assertEqual(4, first.get_available())
+        first.take(4)
+        self.assertEqual(0, second.get_available())
+
+        # an overspent budget is paid back before new requests are allowed
+        second.take(3)
+        now += timedelta(seconds=5)
+        self.assertEqual(2, get_budget().get_available())
+
+
+class TestRecrawlScheduler(unittest.TestCase):
+    def setUp(self):
+        self.now = datetime(2025, 12, 1, tzinfo=timezone.utc)
+        self.mongo_client = MagicMock()
+        self.collection = self.mongo_client["pricera"]["product"]
+        self.publish = MagicMock(return_value=PublishResult(published=1))
+        self.scheduler = RecrawlScheduler(
+            mongo_client=self.mongo_client,
+            collector_classes=[ProductCrawler],
+            publish=self.publish,
+            budget=RequestBudget(requests_per_hour=3600, burst_seconds=2, clock=FakeClock()),
+            policy=RecrawlPolicy(initial_interval=timedelta(hours=4)),
+        )
+
+    def get_document(self, url: str, price: int, **state) -> dict:
+        document = {"_id": url, "product_url": url, "price": price, "sell_status": "available"}
+        if state:
+            document["pricera"] = {"product": state}
+        return document
+
+    def test_due_urls_are_published_within_budget(self):
+        urls = ["url_1", "url_2", "url_3", "url_4"]
+        self.collection.find.return_value = [self.get_document(url, 1) for url in urls]
+
+        self.assertEqual(4, self.scheduler.run_once(now=self.now))
+
+        # 2 requests of 2 ids each are available
+        self.assertEqual(4, self.collection.find.call_args.kwargs["limit"])
+        (messages,) = self.publish.call_args.args
+        self.assertEqual([{"payload": {"product": urls}}], list(messages))
+
+        (bulk_requests,) = self.collection.bulk_write.call_args.args
+        update = bulk_requests[0]._doc["$set"]
+        self.assertEqual(4 * 3600, update["pricera.product.recrawl_interval"])
+        self.assertEqual(self.now + timedelta(hours=4), update["pricera.product.next_crawl_at"])
+        self.assertEqual(self.now, update["pricera.product.scheduled_at"])
+
+        self.collection.find.reset_mock()
+        self.assertEqual(0, self.scheduler.run_once(now=self.now))
+        self.collection.find.assert_not_called()
+
+    def test_partly_failed_publish_schedules_the_published_urls(self):
+        self.scheduler.urls_per_message = 2
+        self.collection.find.return_value = [self.get_document(f"url_{index}", 1) for index in range(4)]
+        self.publish.return_value = PublishResult(
+            published=1, failed=1, failed_messages=[{"payload": {"product": ["url_2", "url_3"]}}]
+        )
+
+        self.assertEqual(2, self.scheduler.run_once(now=self.now))
+
+        (bulk_requests,) = self.collection.bulk_write.call_args.args
+        self.assertEqual(["url_0", "url_1"], [request._filter["_id"] for request in bulk_requests])
+        # a request of 2 ids was spent
+        self.assertEqual(1, self.scheduler.budget.get_available())
+
+    def test_failed_publish_keeps_the_schedule(self):
+        self.collection.find.return_value = [self.get_document("url_1", 1)]
+        self.publish.return_value = PublishResult(failed=1, failed_messages=[{"payload": {"product": ["url_1"]}}])
+
+        self.assertEqual(0, self.scheduler.run_once(now=self.now))
+        self.collection.bulk_write.assert_not_called()
+
+    def test_changes_are_observed_from_the_snapshot(self):
+        scheduled_at = datetime(2025, 11, 30)
+        snapshot = RecrawlScheduler.get_tracked_snapshot(ProductCrawler, self.get_document("url_1", 1))
+        state = {"scheduled_at": scheduled_at, "tracked_snapshot": snapshot, "recrawl_interval": 4 * 3600}
+
+        crawled = dict(state, crawled_at=scheduled_at + timedelta(hours=1), crawl_status="success")
+        self.assertFalse(RecrawlScheduler.has_changed(ProductCrawler, self.get_document("url_1", 1, **crawled)))
+        self.assertTrue(RecrawlScheduler.has_changed(ProductCrawler, self.get_document("url_1", 2, **crawled)))
+
+        unchanged = dict(crawled, crawl_status="unchanged")
+        self.assertFalse(RecrawlScheduler.has_changed(ProductCrawler, self.get_document("url_1", 2, **unchanged)))
+
+        failed = dict(crawled, crawl_status="failure")
+        self.assertIsNone(RecrawlScheduler.has_changed(ProductCrawler, self.get_document("url_1", 2, **failed)))
+
+        not_crawled_since = dict(crawled, crawled_at=scheduled_at - timedelta(hours=1))
+        self.assertIsNone(
+            RecrawlScheduler.has_changed(ProductCrawler, self.get_document("url_1", 2, **not_crawled_since))
+        )
+
+        update = self.scheduler.get_schedule_update(ProductCrawler, self.get_document("url_1", 2, **crawled), self.now)
+        self.assertEqual(2 * 3600, update["pricera.product.recrawl_interval"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import gzip
+import json
+import os
+import tempfile
+import unittest
+
+from pricera.common.collectors import CrawlWorker
+from pricera.common.object_store import LocalObjectStore
+from pricera.common.scrapy import BaseSpider, S3StreamingPipeline
+from pricera.models import ResponseObject
+
+
+class FlakyLocalObjectStore(LocalObjectStore):
+    def upload_file(self, filename, bucket, key, content_type=None):
+        if "failing" in key:
+            raise IOError("S3 is not available")
+        super().upload_file(filename, bucket, key, content_type)
+
+
+class LocalS3StreamingPipeline(S3StreamingPipeline):
+    MAX_RETRY_ATTEMPTS = 0
+    object_store_dir = ""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.object_store = FlakyLocalObjectStore(root_dir=self.object_store_dir)
+
+
+class ChainSpider(BaseSpider):
+    """
+    Yields two chains of two responses, one single-response chain that fails to upload
+    and one single-response chain that is already stored.
+    """
+
+    name = "chain_spider"
+    custom_settings = {
+        "ITEM_PIPELINES": {LocalS3StreamingPipeline: 300},
+        "S3_MAX_IN_FLIGHT_UPLOADS": 1,
+    }
+
+    async def start(self):
+        for object_hash in ["chain_1", "chain_2"]:
+            for status in [200, 200 if object_hash == "chain_1" else 404]:
+                yield ResponseObject(
+                    url=f"https://example.com/{object_hash}", text="{}", status=status, object_hash=object_hash
+                )
+        yield ResponseObject(url="https://example.com/failing", text="{}", status=200, object_hash="failing_chain")
+        yield ResponseObject(url="https://example.com/unchanged", text="{}", status=200, object_hash="unchanged_chain")
+
+    def is_chain_complete(self, item: ResponseObject) -> bool:
+        self.seen = getattr(self, "seen", {})
+        self.seen[item.object_hash] = self.seen.get(item.object_hash, 0) + 1
+        return self.seen[item.object_hash] == (1 if item.object_hash == "unchanged_chain" else 2)
+
+
+class TestS3StreamingPipeline(unittest.TestCase):
+    @staticmethod
+    def read_chain(directory: str, name: str) -> list[dict]:
+        with gzip.open(os.path.join(directory, name), "rt", encoding="utf-8") as gz_file:
+            return [json.loads(line) for line in gz_file]
+
+    def test_chains_are_uploaded_with_statuses(self):
+        unchanged_content_hash = S3StreamingPipeline.get_content_hash([{"status": 200, "text": "{}"}])
+
+        with tempfile.TemporaryDirectory() as spool_dir, tempfile.TemporaryDirectory() as object_store_dir:
+            ChainSpider.custom_settings["S3_SPOOL_DIR"] = spool_dir
+            LocalS3StreamingPipeline.object_store_dir = object_store_dir
+            result = CrawlWorker.start().crawl(
+                ChainSpider,
+                storage_bucket="bucket",
+                storage_prefix="prefix/",
+                known_content_hashes={"unchanged_chain": unchanged_content_hash, "chain_1": "outdated"},
+            )
+
+            uploads = {
+                os.path.relpath(os.path.join(directory, name), object_store_dir): self.read_chain(directory, name)
+                for directory, _, names in os.walk(object_store_dir)
+                for name in names
+            }
+
+        chain_1 = os.path.join("bucket", "prefix", "chain_1.jsonl.gz")
+        chain_2 = os.path.join("bucket", "prefix", "chain_2.jsonl.gz")
+        self.assertEqual({chain_1, chain_2}, set(uploads))
+        self.assertEqual([200, 200], [item["status"] for item in uploads[chain_1]])
+        self.assertEqual([200, 404], [item["status"] for item in uploads[chain_2]])
+        self.assertEqual(
+            {"chain_1": "success", "chain_2": "failure", "failing_chain": "failure", "unchanged_chain": "unchanged"},
+            result.custom_status,
+        )
+        content_hashes = result.spider.crawler.stats.get_value("custom_content_hash")
+        self.assertEqual({"chain_1", "chain_2", "failing_chain", "unchanged_chain"}, set(content_hashes))
+        self.assertEqual(unchanged_content_hash, content_hashes["unchanged_chain"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,5 @@
-from pricera.models import HashedURL
+from pricera.models import HashedURL, InvalidURLError, canonicalize_url
+from pricera.models.url_canonicalization import get_url_hash
 import unittest
 import hashlib
 
@@ -29,6 +30,43 @@ class TestHashedURL(unittest.TestCase):
         self.assertEqual(url_with_hash, input_url)
         self.assertEqual(url_with_hash.hash, "customhashvalue")
 
+    def test_rozetka_urls_of_one_product_share_the_hash(self):
+        urls = HashedURL.from_values(
+            [
+                "https://rozetka.com.ua/ua/apple-iphone-16e-128gb-white/p484561224/",
+                "https://rozetka.com.ua/apple_iphone_16e_white/p484561224",
+                "https://www.rozetka.com.ua/ua/apple-iphone-16e-128gb-white/p484561224/?utm_source=feed",
+            ],
+            marketplace="rozetka",
+        )
+
+        self.assertEqual({"p484561224"}, {url.key for url in urls})
+        self.assertEqual({hashlib.sha256(b"p484561224").hexdigest()}, {url.hash for url in urls})
+        self.assertEqual("https://rozetka.com.ua/apple_iphone_16e_white/p484561224", urls[1])
+
+    def test_hotline_language_prefix_is_ignored(self):
+        self.assertEqual(
+            canonicalize_url("hotline", "https://hotline.ua/ua/mobile-mobilnye-telefony-i-smartfony/apple-iphone/"),
+            canonicalize_url("hotline", "https://hotline.ua/mobile-mobilnye-telefony-i-smartfony/apple-iphone"),
+        )
+
+    def test_invalid_urls_are_rejected(self):
+        for url in [
+            "https://rozetka.com.ua/ua/apple-iphone-16e-128gb-white/",
+            "https://hotline.ua/ua/apple-iphone-16e-128gb-white/p484561224/",
+            "not a url",
+        ]:
+            with self.subTest(url=url), self.assertRaises(InvalidURLError):
+                HashedURL.from_value(url, marketplace="rozetka")
+
+    def test_hashes_are_memoized(self):
+        input_url = "https://example.com/product/memoized"
+        HashedURL.from_value(input_url)
+        hits = get_url_hash.cache_info().hits
+
+        HashedURL.from_value(input_url)
+        self.assertEqual(hits + 1, get_url_hash.cache_info().hits)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,18 +1,11 @@
 import os
-from typing import Optional
-from pydantic import BaseModel
+from itertools import islice
+from typing import Any, BinaryIO, Iterable, Iterator, Optional, TypeVar
 import json
 
+T = TypeVar("T")
 
-class ParsedLine(BaseModel):
-    url: str
-    text: str
-    status: int
-    object_hash: str
-
-    @property
-    def raw_data(self):
-        return json.loads(self.text)
+READ_CHUNK_SIZE = 64 * 1024
 
 
 def get_env_value(env_name: str) -> Optional[str]:
@@ -32,6 +25,9 @@ def get_rabbitmq_password() -> Optional[str]:
 
 
 def parse_line(line: str):
+    # the pydantic models are only loaded by the parsers
+    from pricera.models import ParsedLine
+
     raw_data = json.loads(line)
     return ParsedLine(
         url=raw_data["url"], text=raw_data["text"], status=raw_data["status"], object_hash=raw_data["object_hash"]
@@ -42,3 +38,66 @@ def ensure_list(obj) -> list:
     if isinstance(obj, list):
         return obj
     return [obj]
+
+
+def count_message_urls(message: dict) -> int:
+    return sum(len(ensure_list(values)) for values in (message.get("payload") or {}).values())
+
+
+def merge_message_payloads(messages: list[dict]) -> dict:
+    """
+    Merge the payloads of several messages into one message, values are concatenated per payload key
+    with duplicates dropped. Other message fields are taken from the first message.
+    """
+    merged_payload: dict[str, list] = {}
+    for message in messages:
+        for payload_key, payload_values in (message.get("payload") or {}).items():
+            merged_payload.setdefault(payload_key, []).extend(ensure_list(payload_values))
+
+    merged_message = dict(messages[0]) if messages else {}
+    merged_message["payload"] = {key: list(dict.fromkeys(values)) for key, values in merged_payload.items()}
+    return merged_message
+
+
+def get_nested_value(document: dict, dotted_key: str, default: Any = None) -> Any:
+    """Value of a Mongo dotted field path, e.g. `pricera.rozetka_product.parse_status`, in a fetched document."""
+    value: Any = document
+    for key in dotted_key.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return default
+        value = value[key]
+    return value
+
+
+def iter_chunks(iterable: Iterable[T], size: int) -> Iterator[list[T]]:
+    if size < 1:
+        raise ValueError(f"Chunk size must be positive, got {size}")
+
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def iter_stream_lines(stream: BinaryIO, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[str]:
+    """
+    Lazily yield the non-empty lines of a utf-8 binary stream without the line break.
+
+    Only the current chunk and the incomplete line are kept in memory. The chunks of the incomplete line
+    are joined once its line break arrives, so a line spanning many chunks is copied once.
+    """
+    pending: list[bytes] = []
+    while chunk := stream.read(chunk_size):
+        if b"\n" not in chunk:
+            pending.append(chunk)
+            continue
+
+        lines = chunk.split(b"\n")
+        lines[0] = b"".join([*pending, lines[0]])
+        pending = [lines.pop()]
+        for line in lines:
+            if line.strip():
+                yield line.decode("utf-8")
+
+    line = b"".join(pending)
+    if line.strip():
+        yield line.decode("utf-8")
@@ -1,5 +1,7 @@
 from dataclasses import dataclass
+from typing import ClassVar
 from pricera.common.collectors import BaseCollector
+from pricera.common.proxy_pool import get_proxy_config
 from pricera.models import HashedURL
 
 
@@ -9,6 +11,7 @@ class HotlineItemCardCollector(BaseCollector):
     payload_key: str = "hotline_item_card"
     bucket: str = "pricera-crawled-data"
     path: str = "hotline_item_card/"
+    marketplace: ClassVar[str] = "hotline"
 
     def __post_init__(self):
         super().__init__()
@@ -22,7 +25,7 @@ class HotlineItemCardCollector(BaseCollector):
             storage_bucket=self.bucket,
             storage_prefix=self.path,
             start_urls=self.urls_with_hash,
-            proxy_config=None,
+            proxy_config=get_proxy_config(),
         )
 
     @classmethod
@@ -1,19 +1,76 @@
 from pricera.common.utilities import parse_line
 from pricera.models.hotline import HotlineItemCardModel, HotlineItemOfferModel
 from bs4 import BeautifulSoup, Tag
+from lxml import etree, html
+import logging
 import re
 
+logger = logging.getLogger("hotline_item_card_parser")
+
 
 class HotlineItemCardParser:
+    """
+    Item card page parser with two extraction engines producing the same model:
+    raw lxml with XPath expressions compiled once at class load, and BeautifulSoup
+    as a fallback for pages the XPath expressions don't match.
+    """
+
     base_url = "https://www.hotline.ua"
+    href_pattern = re.compile(r"^\/go\/price\/.+")
+    title_pattern = re.compile(r"^(.*?)\s*купити в інтернет-магазині")
+
+    # XPath counterparts of the BeautifulSoup lookups below
+    title_xpath = etree.XPath("(//title)[1]")
+    item_offers_list_xpath = etree.XPath("(//div[@id='productOffersListContainer'])[1]/div[not(@class)][1]")
+    item_offers_xpath = etree.XPath("div[@class]")
+    item_offer_path_xpath = etree.XPath(".//a[@data-eventcategory='Pages Product Prices']/@href")
+    item_offer_shop_url_xpath = etree.XPath("(.//div[@firm-website])[1]/@firm-website")
+    item_offer_name_xpath = etree.XPath(
+        "(.//div[contains(concat(' ', normalize-space(@class), ' '), ' text-wrapper ')])[1]"
+    )
 
     @classmethod
     def parse(cls, product_blob: dict) -> dict:
         parsed_line = parse_line(product_blob)
-        soup = BeautifulSoup(parsed_line.text, "lxml")
-        model = HotlineItemCardModel(title=cls.get_item_card_title(soup), offers=cls.parse_item_offers(soup))
+        try:
+            model = cls.parse_with_lxml(parsed_line.text)
+        except Exception as e:
+            logger.warning("lxml extraction failed, falling back to BeautifulSoup", exc_info=e)
+            model = cls.parse_with_soup(parsed_line.text)
         return model.model_dump()
 
+    @classmethod
+    def parse_with_lxml(cls, text: str) -> HotlineItemCardModel:
+        document = html.document_fromstring(text)
+        # unpacking fails like the soup lookups when the page doesn't have the expected element
+        (item_offers_list,) = cls.item_offers_list_xpath(document)
+        return HotlineItemCardModel(
+            title=cls.get_item_card_title_from_document(document),
+            offers=[cls.parse_item_offer_element(offer) for offer in cls.item_offers_xpath(item_offers_list)],
+        )
+
+    @classmethod
+    def parse_with_soup(cls, text: str) -> HotlineItemCardModel:
+        soup = BeautifulSoup(text, "lxml")
+        return HotlineItemCardModel(title=cls.get_item_card_title(soup), offers=cls.parse_item_offers(soup))
+
+    @classmethod
+    def get_item_card_title_from_document(cls, document: html.HtmlElement) -> str:
+        (title_element,) = cls.title_xpath(document)
+        return cls.parse_item_card_title(title_element.text_content().strip())
+
+    @classmethod
+    def parse_item_offer_element(cls, offer: html.HtmlElement) -> HotlineItemOfferModel:
+        item_path = next(path for path in cls.item_offer_path_xpath(offer) if cls.href_pattern.match(path))
+        (shop_url,) = cls.item_offer_shop_url_xpath(offer)
+        (item_name_element,) = cls.item_offer_name_xpath(offer)
+
+        return HotlineItemOfferModel(
+            shop_name=shop_url,
+            item_name=item_name_element.text_content().strip(),
+            item_url=f"{cls.base_url}{item_path}",
+        )
+
     @staticmethod
     def get_item_offers(soup: BeautifulSoup) -> list[Tag]:
         item_general_offer_tag = soup.find("div", attrs={"id": "productOffersListContainer"})
@@ -22,8 +79,9 @@ class HotlineItemCardParser:
 
     @classmethod
     def parse_item_offer_url(cls, offer_tag: Tag) -> str:
-        href_pattern = re.compile(r"^\/go\/price\/.+")
-        item_path_tag = offer_tag.find("a", attrs={"data-eventcategory": "Pages Product Prices", "href": href_pattern})
+        item_path_tag = offer_tag.find(
+            "a", attrs={"data-eventcategory": "Pages Product Prices", "href": cls.href_pattern}
+        )
         item_path = item_path_tag.get("href")
         return f"{cls.base_url}{item_path}"
 
@@ -50,11 +108,13 @@ class HotlineItemCardParser:
     def parse_item_offers(cls, soup: BeautifulSoup) -> list[HotlineItemOfferModel]:
         return list(map(cls.parse_item_offer, cls.get_item_offers(soup)))
 
-    @staticmethod
-    def get_item_card_title(soup: BeautifulSoup) -> str:
-        raw_title_text = soup.find("title").text.strip()
+    @classmethod
+    def get_item_card_title(cls, soup: BeautifulSoup) -> str:
+        return cls.parse_item_card_title(soup.find("title").text.strip())
 
-        card_title = re.match(pattern=r"^(.*?)\s*купити в інтернет-магазині", string=raw_title_text)
+    @classmethod
+    def parse_item_card_title(cls, raw_title_text: str) -> str:
+        card_title = cls.title_pattern.match(raw_title_text)
         if not card_title:
             raise ValueError(f"Cannot parse item card title from raw title: {raw_title_text}")
         return card_title.group(1).strip()
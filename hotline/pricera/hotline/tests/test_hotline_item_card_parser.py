@@ -1,6 +1,8 @@
 import unittest
 import os
+from unittest.mock import patch
 from pricera.common import load_file_from_sub_folder
+from pricera.common.utilities import parse_line
 from pricera.hotline.parsers import HotlineItemCardParser
 
 
@@ -296,6 +298,23 @@ class TestHotlineItemCardParser(unittest.TestCase):
         }
         self.assertEqual(expected_result, HotlineItemCardParser.parse(product_blob))
 
+    def test_lxml_and_soup_engines_are_equivalent(self):
+        product_blob = load_file_from_sub_folder(
+            test_file_path=os.path.abspath(__file__), filename="26-11-2025-hotline-item-card.jsonl.gz"
+        )
+        text = parse_line(product_blob).text
+
+        self.assertEqual(HotlineItemCardParser.parse_with_soup(text), HotlineItemCardParser.parse_with_lxml(text))
+
+    def test_parse_falls_back_to_soup(self):
+        product_blob = load_file_from_sub_folder(
+            test_file_path=os.path.abspath(__file__), filename="26-11-2025-hotline-item-card.jsonl.gz"
+        )
+        expected_result = HotlineItemCardParser.parse_with_soup(parse_line(product_blob).text).model_dump()
+
+        with patch.object(HotlineItemCardParser, "parse_with_lxml", side_effect=ValueError("unexpected markup")):
+            self.assertEqual(expected_result, HotlineItemCardParser.parse(product_blob))
+
 
 # Add this to run with standard unittest
 if __name__ == "__main__":
@@ -1,7 +1,18 @@
-__all__ = ["ResponseObject", "HashedURL"]
+__all__ = [
+    "ResponseObject",
+    "ParsedLine",
+    "HashedURL",
+    "InvalidURLError",
+    "register_canonicalizer",
+    "canonicalize_url",
+]
+
+import json
 
 from pydantic import BaseModel, Field, ConfigDict
-import hashlib
+from typing import Optional
+
+from .url_canonicalization import InvalidURLError, register_canonicalizer, canonicalize_url, get_url_hash
 
 
 class ResponseObject(BaseModel):
@@ -13,22 +24,39 @@ class ResponseObject(BaseModel):
     model_config = ConfigDict(extra="allow")
 
 
+class ParsedLine(BaseModel):
+    url: str
+    text: str
+    status: int
+    object_hash: str
+
+    @property
+    def raw_data(self):
+        return json.loads(self.text)
+
+
 class HashedURL(str):
-    hash: str
+    """
+    Url carrying the hash it is stored under. With a marketplace the hash is taken over the canonical key
+    of the url, so every url of the same entity shares one hash, otherwise over the url itself.
+    """
+
+    __slots__ = ("hash", "key")
 
-    def __new__(cls, value: str):
+    def __new__(cls, value: str, marketplace: Optional[str] = None):
         obj = super().__new__(cls, value)
-        obj.hash = cls.get_hash(value)
+        obj.key = canonicalize_url(marketplace, value) if marketplace else value
+        obj.hash = cls.get_hash(obj.key)
         return obj
 
     @staticmethod
     def get_hash(value: str) -> str:
-        return hashlib.sha256(value.encode()).hexdigest()
+        return get_url_hash(value)
 
     @classmethod
-    def from_value(cls, value: str) -> "HashedURL":
-        return cls(value)
+    def from_value(cls, value: str, marketplace: Optional[str] = None) -> "HashedURL":
+        return cls(value, marketplace=marketplace)
 
     @classmethod
-    def from_values(cls, values: list[str]) -> list["HashedURL"]:
-        return [cls(url) for url in values]
+    def from_values(cls, values: list[str], marketplace: Optional[str] = None) -> list["HashedURL"]:
+        return [cls(url, marketplace=marketplace) for url in values]
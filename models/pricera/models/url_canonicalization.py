@@ -0,0 +1,78 @@
+__all__ = ["InvalidURLError", "register_canonicalizer", "canonicalize_url", "get_url_hash"]
+
+from functools import lru_cache
+from typing import Callable
+from urllib.parse import urlsplit
+import hashlib
+import re
+
+# canonicalization and hashing results are cached, so a url seen again in the same process is not re-hashed
+URL_CACHE_SIZE = 65_536
+
+URL_CANONICALIZERS: dict[str, Callable[[str], str]] = {}
+
+
+class InvalidURLError(ValueError):
+    ...
+
+
+def register_canonicalizer(marketplace: str) -> Callable[[Callable[[str], str]], Callable[[str], str]]:
+    """
+    Register the function returning the canonical key of a marketplace url.
+    Urls pointing to the same entity must get the same key, invalid urls raise InvalidURLError.
+    """
+
+    def decorator(function: Callable[[str], str]) -> Callable[[str], str]:
+        URL_CANONICALIZERS[marketplace] = function
+        canonicalize_url.cache_clear()
+        return function
+
+    return decorator
+
+
+@lru_cache(maxsize=URL_CACHE_SIZE)
+def canonicalize_url(marketplace: str, url: str) -> str:
+    if marketplace not in URL_CANONICALIZERS:
+        raise KeyError(f"No url canonicalizer is registered for {marketplace}")
+    return URL_CANONICALIZERS[marketplace](url)
+
+
+@lru_cache(maxsize=URL_CACHE_SIZE)
+def get_url_hash(value: str) -> str:
+    return hashlib.sha256(value.encode()).hexdigest()
+
+
+def split_marketplace_url(url: str, hostname: str) -> str:
+    """Path of a marketplace url, raising InvalidURLError for urls of another host or scheme."""
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError as e:
+        raise InvalidURLError(f"Can't parse url: {url}") from e
+
+    host = (parts.hostname or "").removeprefix("www.")
+    if parts.scheme not in ("http", "https") or host != hostname:
+        raise InvalidURLError(f"Not a {hostname} url: {url}")
+    return parts.path
+
+
+ROZETKA_PRODUCT_ID_PATTERN = re.compile(r"/p(\d+)/?$")
+
+
+@register_canonicalizer("rozetka")
+def canonicalize_rozetka_url(url: str) -> str:
+    """Products are identified by the `p<id>` path segment, the slug and the language prefix don't matter."""
+    match = ROZETKA_PRODUCT_ID_PATTERN.search(split_marketplace_url(url, hostname="rozetka.com.ua"))
+    if not match:
+        raise InvalidURLError(f"Can't extract product id from url: {url}")
+    return f"p{match.group(1)}"
+
+
+@register_canonicalizer("hotline")
+def canonicalize_hotline_url(url: str) -> str:
+    """Item cards are identified by their path without the `/ua` language prefix, query and trailing slash."""
+    path = split_marketplace_url(url, hostname="hotline.ua").rstrip("/")
+    if path == "/ua" or path.startswith("/ua/"):
+        path = path[len("/ua") :]
+    if not path:
+        raise InvalidURLError(f"Not an item card url: {url}")
+    return f"hotline.ua{path.lower()}"
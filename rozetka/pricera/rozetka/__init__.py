@@ -1,4 +1,4 @@
-__all__ = ["RozetkaProductCrawler", "RozetkaProductParser"]
+__all__ = ["RozetkaProductCrawler", "RozetkaProductParser", "RozetkaProductBatchParser"]
 
 from .rozetka_product_crawler import RozetkaProductCrawler
-from .rozetka_product_parser import RozetkaProductParser
+from .rozetka_product_parser import RozetkaProductParser, RozetkaProductBatchParser
@@ -1,8 +1,29 @@
 from typing import ClassVar
 
+from pymongo import ASCENDING, IndexModel
+
 
 class RozetkaProductMixin:
     payload_key: ClassVar[str] = "rozetka_product"
     storage_prefix: ClassVar[str] = "rozetka_product"
     collection_name: ClassVar[str] = "rozetka_product"
     collector_name: ClassVar[str] = "rozetka_product"
+    marketplace: ClassVar[str] = "rozetka"
+    db_url_field: ClassVar[str] = "product_url"
+    # changes of these fields shorten the recrawl interval of a product, see RecrawlScheduler
+    tracked_fields: ClassVar[list[str]] = ["price", "sell_status"]
+    # changes of these fields are appended to the monthly price history of a product
+    history_fields: ClassVar[list[str]] = ["price", "old_price", "sell_status"]
+    history_collection_name: ClassVar[str] = "rozetka_product_price_history"
+    # every crawl status and parse write is an upsert filtering on the product url,
+    # the recrawl scheduler picks the due products by their next crawl time
+    # and history entries are pushed to the bucket of the product and month
+    indexes: ClassVar[dict[str, list[IndexModel]]] = {
+        "rozetka_product": [
+            IndexModel([("product_url", ASCENDING)], name="product_url"),
+            IndexModel([("pricera.rozetka_product.next_crawl_at", ASCENDING)], name="rozetka_product_next_crawl_at"),
+        ],
+        "rozetka_product_price_history": [
+            IndexModel([("product_url", ASCENDING), ("month", ASCENDING)], name="product_url_month", unique=True),
+        ],
+    }
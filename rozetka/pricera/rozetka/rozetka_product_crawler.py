@@ -1,5 +1,8 @@
 from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import ClassVar
 from pricera.common.collectors import BaseCollector
+from pricera.common.proxy_pool import get_proxy_config
 from pricera.models import HashedURL
 from pricera.rozetka.rozetka_mixins import RozetkaProductMixin
 import logging
@@ -13,54 +16,72 @@ class RozetkaProductCrawler(BaseCollector, RozetkaProductMixin):
     urls: list[str]
     mongo_client: MongoClient
     is_synchronous: bool = False
+    # the details endpoint accepts a list of ids, so several products share one request
+    ids_per_request: ClassVar[int] = 10
+    # bounds the responses one spider run keeps and the urls a failed run affects
+    max_batch_size: ClassVar[int] = 500
 
     def __post_init__(self):
         super().__init__()
-        self.urls_with_hash: list[HashedURL] = self.prepare_urls(self.urls)
+        # urls of the same product share one hash, the product is crawled once and its status set on every url
+        self.hash_to_urls, self.invalid_urls = self.group_urls(self.urls)
+        self.urls_with_hash: list[HashedURL] = [urls[0] for urls in self.hash_to_urls.values()]
         self.db_collection = self.mongo_client[self.db_name][self.collection_name]
 
     def crawl(self):
         from pricera.rozetka.spiders.rozetka_product_spider import RozetkaProductSpider
 
+        self.quarantine_invalid_urls(self.invalid_urls)
+        if not self.urls_with_hash:
+            return None
+
         return self.process_scrapy_spider(
             spider_cls=RozetkaProductSpider,
             storage_bucket=self.storage_bucket,
             storage_prefix=self.storage_prefix,
             start_urls=self.urls_with_hash,
-            proxy_config=None,
+            proxy_config=get_proxy_config(),
+            ids_per_request=self.ids_per_request,
+            known_content_hashes=self.find_known_content_hashes(self.urls_with_hash),
         )
 
     def update_crawl_status(self, spider):
+        if spider is None:
+            return
+
         statuses = spider.crawler.stats.get_value("custom_status")
         if not statuses:
             return
 
-        hash_to_url = {url_with_hash.hash: url_with_hash for url_with_hash in self.urls_with_hash}
+        content_hashes = spider.crawler.stats.get_value("custom_content_hash") or {}
+        # the recrawl scheduler tells from it whether a product was crawled since it was scheduled
+        crawled_at = datetime.now(timezone.utc)
 
         bulk_requests: list[UpdateOne] = []
         for url_hash, status in statuses.items():
-            url = hash_to_url[url_hash]
-            crawl_status = {f"pricera.{self.collector_name}.crawl_status": status}
-            object_key = {
-                f"object_key.{self.collector_name}": f"{self.storage_bucket}/{self.storage_prefix}/{url_hash}.jsonl.gz"
+            crawl_status = {
+                f"pricera.{self.collector_name}.crawl_status": status,
+                f"pricera.{self.collector_name}.crawled_at": crawled_at,
             }
+            if url_hash in content_hashes:
+                crawl_status[f"pricera.{self.collector_name}.content_hash"] = content_hashes[url_hash]
+            object_key = {f"object_key.{self.collector_name}": self.get_object_key(url_hash)}
 
-            bulk_requests.append(
-                UpdateOne(
-                    filter={"product_url": url},
-                    update={"$set": crawl_status | object_key},
-                    upsert=True,
-                )
+            bulk_requests.extend(
+                UpdateOne(filter={self.db_url_field: url}, update={"$set": crawl_status | object_key}, upsert=True)
+                for url in self.hash_to_urls[url_hash]
             )
 
         if not bulk_requests:
             return
 
         try:
-            self.db_collection.bulk_write(bulk_requests, ordered=False)
+            self.bulk_write(bulk_requests)
             logger.info("Finished updating crawl statuses")
         except Exception as e:
             logger.error("Failed during the bulk updating crawl statuses", exc_info=e)
+            # the message must not be acknowledged without its writes
+            raise
 
     @classmethod
     def get_crawler(cls, message: dict, mongo_client: MongoClient, **kwargs) -> "RozetkaProductCrawler":
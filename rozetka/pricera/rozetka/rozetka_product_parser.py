@@ -1,6 +1,11 @@
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, wait
+from contextlib import closing
 from dataclasses import dataclass
-from pricera.common.collectors import BaseCollector
+from typing import ClassVar, Iterator
+
+from pricera.common.collectors import BaseCollector, ParseExecutor
 import logging
+from pricera.models import HashedURL
 from pricera.rozetka.rozetka_mixins import RozetkaProductMixin
 from pymongo import MongoClient
 
@@ -16,29 +21,165 @@ class RozetkaProductParser(BaseCollector, RozetkaProductMixin):
         super().__init__()
         self.storage_file_name = self.get_storage_file_name_from_url(self.url)
         self.db_collection = self.mongo_client[self.db_name][self.collection_name]
-        self.db_filter = {"product_url": self.url}
+        self.db_filter = {self.db_url_field: self.url}
         self.object_key = f"{self.storage_bucket}/{self.storage_prefix}/{self.storage_file_name}"
 
     def parse(self):
-        from pricera.rozetka.parsers.rozetka_product_parser import RozetkaProductParser
+        if self.find_urls_with_crawl_status([self.url], crawl_status="unchanged"):
+            logger.info("Product is unchanged since the last parsing, skipping", extra={"url": self.url})
+            return
+
+        # the chain is closed before the write, it's only read up to its first response
+        with closing(self.iter_chain_lines_from_s3(self.url)) as lines:
+            parsed = self.parse_lines(lines)
+
+        self.write_parsed_updates({self.url: parsed})
+
+    @classmethod
+    def parse_lines(cls, lines: Iterator[str]) -> dict:
+        """
+        Parse a product chain streamed line by line. The product is taken from the first response,
+        so the rest of the chain is never downloaded nor decompressed.
+        Errors of loading the chain are propagated, an empty chain is a parsing failure.
+        """
+        return cls.parse_file(next(lines, ""))
 
-        file = self.load_file_from_s3(
-            bucket=self.storage_bucket,
-            prefix=self.storage_prefix,
-            filename=self.storage_file_name,
-        )
+    @classmethod
+    def parse_file(cls, file: str) -> dict:
+        """Parse a stored product chain into the fields to set on the product document, parse status included."""
+        from pricera.rozetka.parsers.rozetka_product_parser import RozetkaProductParser
 
         try:
             parsed_data = RozetkaProductParser.parse(file)
-            parsed_status = {f"pricera.{self.collector_name}.parse_status": "success"}
+            parsed_status = {f"pricera.{cls.collector_name}.parse_status": "success"}
             logger.info("Successfully parsed rozetka product")
         except Exception as e:
-            parsed_data, parsed_status = {}, {f"pricera.{self.collector_name}.parse_status": "failure"}
+            parsed_data, parsed_status = {}, {f"pricera.{cls.collector_name}.parse_status": "failure"}
             logger.error("Error during rozetka product parsing", exc_info=e)
 
-        self.db_collection.update_one(filter=self.db_filter, update={"$set": parsed_data | parsed_status}, upsert=True)
+        return parsed_data | parsed_status
 
     @classmethod
     def get_parser(cls, message: dict, mongo_client: MongoClient) -> "RozetkaProductParser":
         payload = message["payload"]
         return cls(url=payload[cls.payload_key], mongo_client=mongo_client)
+
+
+@dataclass
+class RozetkaProductBatchParser(BaseCollector, RozetkaProductMixin):
+    urls: list[str]
+    mongo_client: MongoClient
+    is_synchronous: bool = False
+    MAX_DOWNLOAD_WORKERS: ClassVar[int] = 10
+    max_batch_size: ClassVar[int] = 1000
+    # number of parsed products per bulk write when parsing on the ParseExecutor
+    WRITE_BATCH_SIZE: ClassVar[int] = 100
+
+    def __post_init__(self):
+        super().__init__()
+        # urls of the same product share one stored chain, it is parsed once and written to every url
+        self.hash_to_urls, self.invalid_urls = self.group_urls(self.urls)
+        self.urls_with_hash: list[HashedURL] = [urls[0] for urls in self.hash_to_urls.values()]
+        self.db_collection = self.mongo_client[self.db_name][self.collection_name]
+
+    def get_updates(self, url: HashedURL, update: dict) -> dict[str, dict]:
+        return {same_url: update for same_url in self.hash_to_urls[url.hash]}
+
+    def parse(self):
+        """
+        Stream all product chains concurrently, parse them as they arrive
+        and write the changed results with a single unordered bulk write.
+        """
+        unchanged_urls = self.find_urls_with_crawl_status(self.urls_with_hash, crawl_status="unchanged")
+        urls_to_parse = [url for url in self.urls_with_hash if url not in unchanged_urls]
+        if unchanged_urls:
+            logger.info("Skipping products unchanged since the last parsing", extra={"count": len(unchanged_urls)})
+
+        if ParseExecutor.is_running():
+            self.parse_in_executor(urls_to_parse, executor=ParseExecutor.get_instance())
+            return
+
+        url_to_update: dict[str, dict] = {}
+
+        with ThreadPoolExecutor(max_workers=self.MAX_DOWNLOAD_WORKERS, thread_name_prefix="s3_download") as executor:
+            future_to_url = {executor.submit(self.load_and_parse, url): url for url in urls_to_parse}
+
+            for future in as_completed(future_to_url):
+                url = future_to_url[future]
+                try:
+                    update = future.result()
+                except Exception as e:
+                    logger.error("Error during loading rozetka product", exc_info=e, extra={"url": url})
+                    update = {f"pricera.{self.collector_name}.parse_status": "failure"}
+
+                url_to_update |= self.get_updates(url, update)
+
+        self.write_updates(url_to_update)
+
+    def parse_in_executor(self, urls: list[HashedURL], executor: ParseExecutor) -> None:
+        """
+        Fetch the chains on the I/O pool, parse them on the process pool and hand every
+        WRITE_BATCH_SIZE parsed products to a bulk write on the I/O pool, so fetching, parsing
+        and writing overlap. Returns once every write is finished.
+        """
+        url_to_update: dict[str, dict] = {}
+        write_futures: list[Future] = []
+        load_futures = {executor.submit_io(self.load_first_line, url): url for url in urls}
+        parse_futures: dict[Future, HashedURL] = {}
+
+        for future in as_completed(load_futures):
+            url = load_futures[future]
+            try:
+                parse_futures[executor.submit_parse(RozetkaProductParser.parse_file, future.result())] = url
+            except Exception as e:
+                logger.error("Error during loading rozetka product", exc_info=e, extra={"url": url})
+                update = {f"pricera.{self.collector_name}.parse_status": "failure"}
+                url_to_update |= self.get_updates(url, update)
+
+        for future in as_completed(parse_futures):
+            url = parse_futures[future]
+            try:
+                update = future.result()
+            except Exception as e:
+                # parse_file handles parsing errors itself, this is a crashed or unpicklable worker call
+                logger.error("Error during rozetka product parsing in a worker process", exc_info=e, extra={"url": url})
+                update = {f"pricera.{self.collector_name}.parse_status": "failure"}
+
+            url_to_update |= self.get_updates(url, update)
+            if len(url_to_update) >= self.WRITE_BATCH_SIZE:
+                write_futures.append(executor.submit_io(self.write_updates, url_to_update))
+                url_to_update = {}
+
+        if url_to_update:
+            write_futures.append(executor.submit_io(self.write_updates, url_to_update))
+        wait(write_futures)
+        # a failed write fails the message, once every write is finished
+        for future in write_futures:
+            future.result()
+
+    def write_updates(self, url_to_update: dict[str, dict]) -> None:
+        if not url_to_update:
+            return
+
+        try:
+            self.write_parsed_updates(url_to_update)
+            logger.info("Finished updating parsed products")
+        except Exception as e:
+            logger.error("Failed during the bulk updating parsed products", exc_info=e)
+            # the message must not be acknowledged without its writes
+            raise
+
+    def load_first_line(self, url: str) -> str:
+        """Stream the chain of a product up to its first response, the one the product is parsed from."""
+        lines = self.iter_chain_lines_from_s3(url)
+        with closing(lines):
+            return next(lines, "")
+
+    def load_and_parse(self, url: str) -> dict:
+        """Stream the chain of a product and parse it, done on a download thread so parsing overlaps the downloads."""
+        return RozetkaProductParser.parse_file(self.load_first_line(url))
+
+    @classmethod
+    def get_parser(cls, message: dict, mongo_client: MongoClient) -> "RozetkaProductBatchParser":
+        payload = message["payload"]
+        return cls(urls=payload[cls.payload_key], mongo_client=mongo_client)
@@ -1,15 +1,20 @@
-from typing import Iterator
+import json
+from collections import defaultdict
+from typing import Iterator, Optional
 
 from scrapy.http import Response, Request
 
 from pricera.common.scrapy import BaseSpider
+from pricera.common.utilities import iter_chunks
 from pricera.models import ResponseObject
-from pricera.models import HashedURL
-from pricera.rozetka.parsers import RozetkaProductParser
+from pricera.models import HashedURL, canonicalize_url
+from pricera.rozetka.rozetka_mixins import RozetkaProductMixin
 
 
 class RozetkaProductSpider(BaseSpider):
     name = "rozetka_product_spider"
+    api_base_url = "https://common-api.rozetka.com.ua"
+    details_api_path = "/v1/api/product/details?country=UA&lang=ua&ids={ids}"
 
     custom_settings = {
         "DEFAULT_REQUEST_HEADERS": {
@@ -29,7 +34,11 @@ class RozetkaProductSpider(BaseSpider):
             "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36",
         },
         "ITEM_PIPELINES": {
-            "pricera.common.scrapy.S3Pipeline": 300,
+            "pricera.common.scrapy.S3StreamingPipeline": 300,
+        },
+        "DOWNLOADER_MIDDLEWARES": {
+            "pricera.common.scrapy.AdaptiveConcurrencyMiddleware": 560,
+            "pricera.common.scrapy.ProxyPoolMiddleware": 570,
         },
         "DOWNLOAD_HANDLERS": {
             "http": "pricera.common.scrapy.PriceraImpersonateDownloadHandler",
@@ -37,22 +46,83 @@ class RozetkaProductSpider(BaseSpider):
         },
     }
 
-    def __init__(self, start_urls: list[HashedURL], *args, **kwargs):
+    def __init__(
+        self, start_urls: list[HashedURL], ids_per_request: int = 1, api_base_url: Optional[str] = None, *args, **kwargs
+    ):
         super().__init__(*args, **kwargs)
         self.start_urls = start_urls
+        self.ids_per_request = int(ids_per_request)
+        # the load test points the spider to a local stand-in of the api
+        self.details_api_url = (api_base_url or self.api_base_url).rstrip("/") + self.details_api_path
 
     def start_requests(self):
-        for url in self.start_urls:
-            product_id = RozetkaProductParser.get_product_id_from_url(url)
-            api_url = f"https://common-api.rozetka.com.ua/v1/api/product/details?country=UA&lang=ua&ids={product_id}"
-
-            yield Request(
-                url=api_url,
-                callback=self.parse,
-                meta={
-                    "object_hash": url.hash,
-                },
-            )
+        for urls in iter_chunks(self.start_urls, self.ids_per_request):
+            # several urls may point to the same product, so each id keeps every chain it belongs to
+            product_id_to_hashes: dict[str, list[str]] = defaultdict(list)
+            for url in urls:
+                try:
+                    product_id = self.get_product_id(url)
+                except ValueError:
+                    # collectors quarantine invalid urls up front, one slipping through must not stop the rest
+                    self.logger.warning("Skipping url without a product id: %s", url)
+                    self.set_chain_status(url.hash, "invalid")
+                    continue
+                product_id_to_hashes[product_id].append(url.hash)
+
+            if not product_id_to_hashes:
+                continue
+
+            api_url = self.details_api_url.format(ids=",".join(product_id_to_hashes))
+            if len(urls) == 1:
+                meta = {"object_hash": urls[0].hash}
+            else:
+                meta = {"product_id_to_hashes": dict(product_id_to_hashes)}
+
+            yield Request(url=api_url, callback=self.parse, meta=meta)
+
+    @staticmethod
+    def get_product_id(url: str) -> str:
+        """Product id of the canonical key of the url, the one it is deduplicated by, so its query doesn't matter."""
+        return canonicalize_url(RozetkaProductMixin.marketplace, url).removeprefix("p")
 
     def parse(self, response: Response, *args, **kwargs) -> Iterator[ResponseObject]:
-        yield self.collect_response(response=response)
+        if "product_id_to_hashes" in response.meta:
+            yield from self.split_batch_response(response)
+        else:
+            yield self.collect_response(response=response)
+
+    def split_batch_response(self, response: Response) -> Iterator[ResponseObject]:
+        """
+        Split a multi-product details response into one response object per requested chain.
+
+        Every product keeps the same document shape as a single-product response, so the parser
+        and the storage layout stay unchanged.
+        """
+        product_id_to_hashes: dict[str, list[str]] = response.meta["product_id_to_hashes"]
+
+        try:
+            raw_data = json.loads(response.text) if response.status == 200 else None
+        except json.JSONDecodeError:
+            raw_data = None
+
+        # keep the original body for every chain, so failed batches are stored the same way as failed singles
+        if not raw_data or not isinstance(raw_data.get("data"), list):
+            for object_hashes in product_id_to_hashes.values():
+                for object_hash in object_hashes:
+                    yield ResponseObject(
+                        url=response.url, text=response.text, status=response.status, object_hash=object_hash
+                    )
+            return
+
+        id_to_product = {str(product["id"]): product for product in raw_data["data"] if "id" in product}
+        for product_id, object_hashes in product_id_to_hashes.items():
+            product = id_to_product.get(product_id)
+            if product is None:
+                self.logger.warning("Product is missing from the batched details response: %s", product_id)
+                for object_hash in object_hashes:
+                    self.set_chain_status(object_hash, "failure")
+                continue
+
+            text = json.dumps({"data": [product], "errors": raw_data.get("errors")}, ensure_ascii=False)
+            for object_hash in object_hashes:
+                yield ResponseObject(url=response.url, text=text, status=response.status, object_hash=object_hash)
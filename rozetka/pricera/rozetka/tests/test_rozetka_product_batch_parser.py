@@ -0,0 +1,197 @@
+import os
+import unittest
+from collections import defaultdict
+from typing import Iterator
+from unittest.mock import MagicMock, patch
+
+from pricera.common import load_file_from_sub_folder
+from pricera.common.collectors import ParseExecutor
+from pricera.rozetka import RozetkaProductBatchParser
+
+
+class TestRozetkaProductBatchParser(unittest.TestCase):
+    def setUp(self):
+        self.product_blob = load_file_from_sub_folder(
+            test_file_path=os.path.abspath(__file__), filename="20-11-2025-rozetka-product.jsonl.gz"
+        )
+        self.urls = [
+            "https://rozetka.com.ua/ua/apple-iphone-17-pro-max-256gb-cosmic-orange-mfyn4af-a/p543550585/",
+            "https://rozetka.com.ua/ua/apple-iphone-17-air-256gb-sky-blue-mg2p4af-a/p543536320/",
+            "https://rozetka.com.ua/ua/apple-iphone-16e-128gb-white/p484561224/",
+        ]
+        self.mongo_client = MagicMock()
+        self.collections = defaultdict(MagicMock)
+        self.mongo_client["pricera"].__getitem__.side_effect = self.collections.__getitem__
+        self.db_collection = self.collections["rozetka_product"]
+        self.history_collection = self.collections["rozetka_product_price_history"]
+
+    def iter_lines_from_s3(self, bucket: str, prefix: str, filename: str) -> Iterator[str]:
+        if filename in (
+            RozetkaProductBatchParser.get_storage_file_name_from_url(self.urls[1]),
+            RozetkaProductBatchParser.get_legacy_storage_file_name_from_url(self.urls[1]),
+        ):
+            raise FileNotFoundError(filename)
+        if filename == RozetkaProductBatchParser.get_storage_file_name_from_url(self.urls[2]):
+            yield "{}"
+            return
+        yield from self.product_blob.splitlines()
+
+    def test_parse_writes_all_products_with_one_bulk_write(self):
+        parser = RozetkaProductBatchParser.get_parser(
+            message={"payload": {"rozetka_product": self.urls}}, mongo_client=self.mongo_client
+        )
+
+        with patch.object(RozetkaProductBatchParser, "iter_lines_from_s3", side_effect=self.iter_lines_from_s3):
+            parser.parse()
+
+        self.db_collection.bulk_write.assert_called_once()
+        (bulk_requests,) = self.db_collection.bulk_write.call_args.args
+        self.assertFalse(self.db_collection.bulk_write.call_args.kwargs["ordered"])
+
+        url_to_update = {request._filter["product_url"]: request._doc["$set"] for request in bulk_requests}
+        self.assertEqual(set(self.urls), set(url_to_update))
+        self.assertEqual("success", url_to_update[self.urls[0]]["pricera.rozetka_product.parse_status"])
+        self.assertEqual(69999, url_to_update[self.urls[0]]["price"])
+        self.assertEqual({"pricera.rozetka_product.parse_status": "failure"}, url_to_update[self.urls[1]])
+        self.assertEqual({"pricera.rozetka_product.parse_status": "failure"}, url_to_update[self.urls[2]])
+
+    def test_parse_on_parse_executor_matches_in_process_parsing(self):
+        parser = RozetkaProductBatchParser.get_parser(
+            message={"payload": {"rozetka_product": self.urls}}, mongo_client=self.mongo_client
+        )
+        with patch.object(RozetkaProductBatchParser, "iter_lines_from_s3", side_effect=self.iter_lines_from_s3):
+            parser.parse()
+        (expected_requests,) = self.db_collection.bulk_write.call_args.args
+        self.db_collection.bulk_write.reset_mock()
+
+        ParseExecutor.start(parse_workers=1, io_workers=2)
+        try:
+            with patch.object(RozetkaProductBatchParser, "iter_lines_from_s3", side_effect=self.iter_lines_from_s3):
+                parser.parse()
+        finally:
+            ParseExecutor.stop()
+
+        self.db_collection.bulk_write.assert_called_once()
+        (bulk_requests,) = self.db_collection.bulk_write.call_args.args
+        self.assertCountEqual(
+            [(request._filter, request._doc) for request in expected_requests],
+            [(request._filter, request._doc) for request in bulk_requests],
+        )
+
+    def test_chain_stored_under_the_legacy_key_is_parsed(self):
+        legacy_file_name = RozetkaProductBatchParser.get_legacy_storage_file_name_from_url(self.urls[0])
+        self.assertNotEqual(RozetkaProductBatchParser.get_storage_file_name_from_url(self.urls[0]), legacy_file_name)
+
+        def iter_lines_from_s3(bucket: str, prefix: str, filename: str) -> Iterator[str]:
+            if filename != legacy_file_name:
+                raise FileNotFoundError(filename)
+            yield from self.product_blob.splitlines()
+
+        parser = RozetkaProductBatchParser.get_parser(
+            message={"payload": {"rozetka_product": self.urls[:1]}}, mongo_client=self.mongo_client
+        )
+        with patch.object(RozetkaProductBatchParser, "iter_lines_from_s3", side_effect=iter_lines_from_s3):
+            parser.parse()
+
+        (bulk_requests,) = self.db_collection.bulk_write.call_args.args
+        self.assertEqual(69999, bulk_requests[0]._doc["$set"]["price"])
+
+    def test_failed_write_fails_the_parse(self):
+        self.db_collection.bulk_write.side_effect = ConnectionError("mongo is down")
+        parser = RozetkaProductBatchParser.get_parser(
+            message={"payload": {"rozetka_product": self.urls}}, mongo_client=self.mongo_client
+        )
+
+        with patch.object(RozetkaProductBatchParser, "iter_lines_from_s3", side_effect=self.iter_lines_from_s3):
+            with self.assertRaises(ConnectionError):
+                parser.parse()
+
+        ParseExecutor.start(parse_workers=1, io_workers=2)
+        try:
+            with patch.object(RozetkaProductBatchParser, "iter_lines_from_s3", side_effect=self.iter_lines_from_s3):
+                with self.assertRaises(ConnectionError):
+                    parser.parse()
+        finally:
+            ParseExecutor.stop()
+
+    def test_parse_skips_unchanged_products(self):
+        self.db_collection.find.return_value = [{"product_url": self.urls[1]}, {"product_url": self.urls[2]}]
+        parser = RozetkaProductBatchParser.get_parser(
+            message={"payload": {"rozetka_product": self.urls}}, mongo_client=self.mongo_client
+        )
+
+        with patch.object(
+            RozetkaProductBatchParser, "iter_lines_from_s3", side_effect=self.iter_lines_from_s3
+        ) as iter_lines_from_s3:
+            parser.parse()
+
+        iter_lines_from_s3.assert_called_once()
+        (bulk_requests,) = self.db_collection.bulk_write.call_args.args
+        self.assertEqual([self.urls[0]], [request._filter["product_url"] for request in bulk_requests])
+
+    def test_parse_loads_each_product_once_and_skips_invalid_urls(self):
+        alias_url = "https://rozetka.com.ua/apple_iphone_17_pro_max/p543550585"
+        invalid_url = "https://rozetka.com.ua/ua/apple-iphone-17-pro-max/"
+        parser = RozetkaProductBatchParser.get_parser(
+            message={"payload": {"rozetka_product": [self.urls[0], alias_url, invalid_url]}},
+            mongo_client=self.mongo_client,
+        )
+
+        with patch.object(
+            RozetkaProductBatchParser, "iter_lines_from_s3", side_effect=self.iter_lines_from_s3
+        ) as iter_lines_from_s3:
+            parser.parse()
+
+        iter_lines_from_s3.assert_called_once()
+        (bulk_requests,) = self.db_collection.bulk_write.call_args.args
+        url_to_update = {request._filter["product_url"]: request._doc["$set"] for request in bulk_requests}
+        self.assertEqual({self.urls[0], alias_url}, set(url_to_update))
+        self.assertEqual(url_to_update[self.urls[0]], url_to_update[alias_url])
+        self.assertEqual([invalid_url], parser.invalid_urls)
+
+    def test_parse_writes_only_changed_fields_and_price_history(self):
+        parser = RozetkaProductBatchParser.get_parser(
+            message={"payload": {"rozetka_product": self.urls}}, mongo_client=self.mongo_client
+        )
+        with patch.object(RozetkaProductBatchParser, "iter_lines_from_s3", side_effect=self.iter_lines_from_s3):
+            parser.parse()
+
+        (first_requests,) = self.db_collection.bulk_write.call_args.args
+        url_to_update = {request._filter["product_url"]: request._doc["$set"] for request in first_requests}
+        (history_requests,) = self.history_collection.bulk_write.call_args.args
+        self.assertEqual([self.urls[0]], [request._filter["product_url"] for request in history_requests])
+        self.assertEqual(69999, history_requests[0]._doc["$push"]["changes"]["price"])
+
+        # the stored documents match the first parse, except for the price of the first product
+        stored_documents = []
+        for url, update in url_to_update.items():
+            parse_status = update.pop("pricera.rozetka_product.parse_status")
+            stored_documents.append(
+                {"product_url": url, "pricera": {"rozetka_product": {"parse_status": parse_status}}}
+            )
+            stored_documents[-1] |= update | ({"price": 1} if url == self.urls[0] else {})
+
+        def find(filter: dict, projection: dict) -> list[dict]:
+            return [] if "pricera.rozetka_product.crawl_status" in filter else stored_documents
+
+        self.db_collection.find.side_effect = find
+        self.db_collection.bulk_write.reset_mock()
+        self.history_collection.bulk_write.reset_mock()
+
+        with patch.object(RozetkaProductBatchParser, "iter_lines_from_s3", side_effect=self.iter_lines_from_s3):
+            parser.parse()
+
+        (bulk_requests,) = self.db_collection.bulk_write.call_args.args
+        self.assertEqual(
+            [({"product_url": self.urls[0]}, {"$set": {"price": 69999}})],
+            [(request._filter, request._doc) for request in bulk_requests],
+        )
+        (history_requests,) = self.history_collection.bulk_write.call_args.args
+        self.assertEqual(
+            {"product_url": self.urls[0], "month": history_requests[0]._filter["month"]}, history_requests[0]._filter
+        )
+        self.assertEqual(69999, history_requests[0]._doc["$push"]["changes"]["price"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+from unittest.mock import MagicMock
+
+from pricera.models import HashedURL
+from pricera.rozetka import RozetkaProductCrawler
+
+
+class TestRozetkaProductCrawler(unittest.TestCase):
+    def setUp(self):
+        self.urls = [
+            "https://rozetka.com.ua/ua/apple-iphone-17-pro-max-256gb-cosmic-orange-mfyn4af-a/p543550585/",
+            "https://rozetka.com.ua/ua/apple-iphone-17-air-256gb-sky-blue-mg2p4af-a/p543536320/",
+        ]
+        self.mongo_client = MagicMock()
+        self.db_collection = self.mongo_client["pricera"]["rozetka_product"]
+        self.crawler = RozetkaProductCrawler(urls=self.urls, mongo_client=self.mongo_client)
+
+    def test_content_hashes_of_chains_under_a_legacy_key_are_not_known(self):
+        current_hash = self.crawler.urls_with_hash[0].hash
+        legacy_hash = HashedURL.get_hash(self.urls[1])
+        self.db_collection.find.return_value = [
+            {
+                "product_url": self.urls[0],
+                "pricera": {"rozetka_product": {"content_hash": "current"}},
+                "object_key": {"rozetka_product": RozetkaProductCrawler.get_object_key(current_hash)},
+            },
+            {
+                "product_url": self.urls[1],
+                "pricera": {"rozetka_product": {"content_hash": "legacy"}},
+                "object_key": {"rozetka_product": RozetkaProductCrawler.get_object_key(legacy_hash)},
+            },
+        ]
+
+        self.assertEqual({current_hash: "current"}, self.crawler.find_known_content_hashes(self.crawler.urls_with_hash))
+        self.assertEqual(
+            "pricera-crawled-data/rozetka_product/" + current_hash + ".jsonl.gz",
+            RozetkaProductCrawler.get_object_key(current_hash),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import json
+import os
+import unittest
+
+from scrapy.http import Request, TextResponse
+from scrapy.utils.test import get_crawler
+
+from pricera.common import load_file_from_sub_folder
+from pricera.common.utilities import parse_line
+from pricera.models import HashedURL
+from pricera.rozetka.parsers import RozetkaProductParser
+from pricera.rozetka.spiders.rozetka_product_spider import RozetkaProductSpider
+
+
+class TestRozetkaProductSpider(unittest.TestCase):
+    def setUp(self):
+        product_blob = load_file_from_sub_folder(
+            test_file_path=os.path.abspath(__file__), filename="20-11-2025-rozetka-product.jsonl.gz"
+        )
+        self.raw_data = parse_line(product_blob).raw_data
+        self.urls = HashedURL.from_values(
+            [
+                "https://rozetka.com.ua/ua/apple-iphone-17-pro-max-256gb-cosmic-orange-mfyn4af-a/p543550585/",
+                "https://rozetka.com.ua/ua/apple-iphone-17-air-256gb-sky-blue-mg2p4af-a/p543536320/",
+                "https://rozetka.com.ua/ua/apple-iphone-16e-128gb-white/p484561224/",
+            ]
+        )
+
+    def get_spider(self, ids_per_request: int) -> RozetkaProductSpider:
+        crawler = get_crawler(RozetkaProductSpider)
+        return RozetkaProductSpider.from_crawler(
+            crawler,
+            start_urls=self.urls,
+            ids_per_request=ids_per_request,
+            storage_bucket="bucket",
+            storage_prefix="prefix",
+        )
+
+    def get_batch_response(self, request: Request, products: list[dict], status: int = 200) -> TextResponse:
+        body = json.dumps({"data": products, "errors": self.raw_data["errors"]})
+        return TextResponse(url=request.url, body=body, encoding="utf-8", status=status, request=request)
+
+    def test_start_requests_single_product(self):
+        requests = list(self.get_spider(ids_per_request=1).start_requests())
+
+        self.assertEqual(3, len(requests))
+        self.assertTrue(requests[0].url.endswith("&ids=543550585"))
+        self.assertEqual({"object_hash": self.urls[0].hash}, requests[0].meta)
+
+    def test_start_requests_batches_product_ids(self):
+        requests = list(self.get_spider(ids_per_request=2).start_requests())
+
+        self.assertEqual(2, len(requests))
+        self.assertTrue(requests[0].url.endswith("&ids=543550585,543536320"))
+        self.assertEqual(
+            {"543550585": [self.urls[0].hash], "543536320": [self.urls[1].hash]},
+            requests[0].meta["product_id_to_hashes"],
+        )
+        self.assertEqual({"object_hash": self.urls[2].hash}, requests[1].meta)
+
+    def test_start_requests_skip_urls_without_product_id(self):
+        self.urls.insert(1, HashedURL.from_value("https://rozetka.com.ua/ua/apple-iphone-16e-128gb-white/"))
+        spider = self.get_spider(ids_per_request=2)
+
+        requests = list(spider.start_requests())
+
+        self.assertEqual(2, len(requests))
+        self.assertTrue(requests[0].url.endswith("&ids=543550585"))
+        self.assertTrue(requests[1].url.endswith("&ids=543536320,484561224"))
+        self.assertEqual({self.urls[1].hash: "invalid"}, spider.crawler.stats.get_value("custom_status"))
+
+    def test_start_requests_ignore_query_and_fragment(self):
+        self.urls = HashedURL.from_values(
+            [
+                "https://rozetka.com.ua/ua/x/p543550585/?utm_source=x",
+                "https://rozetka.com.ua/ua/x/p543536320/#reviews",
+            ],
+            marketplace="rozetka",
+        )
+        spider = self.get_spider(ids_per_request=2)
+
+        requests = list(spider.start_requests())
+
+        self.assertEqual(1, len(requests))
+        self.assertTrue(requests[0].url.endswith("&ids=543550585,543536320"))
+        self.assertIsNone(spider.crawler.stats.get_value("custom_status"))
+
+    def test_batch_response_is_split_per_chain(self):
+        spider = self.get_spider(ids_per_request=3)
+        request = next(iter(spider.start_requests()))
+        first_product = self.raw_data["data"][0]
+        second_product = first_product | {"id": 543536320, "price": 1}
+
+        items = list(spider.parse(self.get_batch_response(request, [second_product, first_product])))
+
+        self.assertEqual([self.urls[0].hash, self.urls[1].hash], [item.object_hash for item in items])
+        self.assertEqual(69999, RozetkaProductParser.parse(json.dumps(items[0].model_dump()))["price"])
+        self.assertEqual(1, RozetkaProductParser.parse(json.dumps(items[1].model_dump()))["price"])
+        self.assertEqual({self.urls[2].hash: "failure"}, spider.crawler.stats.get_value("custom_status"))
+
+    def test_failed_batch_response_is_stored_for_every_chain(self):
+        spider = self.get_spider(ids_per_request=3)
+        request = next(iter(spider.start_requests()))
+
+        items = list(spider.parse(self.get_batch_response(request, [], status=503)))
+
+        self.assertEqual([url.hash for url in self.urls], [item.object_hash for item in items])
+        self.assertEqual({503}, {item.status for item in items})
+
+
+if __name__ == "__main__":
+    unittest.main()